@@ -0,0 +1,240 @@
+"""
+HTTP API
+
+挂载在 Dash 的 Flask 服务（app.server）上，为前端提供真实数据：
+
+    GET /api/opportunities                 当前排行快照（sort_by / order / limit / exchange 参数）
+    GET /api/symbols/<symbol>/candles      K线与 MA（timeframe / limit 参数，交易对可写作 BTC/USDT 或 BTC-USDT）
+    GET /api/exchanges/status              交易所连接状态
+    GET /api/stream                        Server-Sent Events：首次发送完整快照，之后每次扫描只推送变化的行
+
+JSON 响应带弱 ETag，支持 If-None-Match 返回 304；客户端接受 gzip 时压缩较大的响应。
+同一快照版本、同一参数的响应体只编码一次，放在共享缓存中供所有请求复用。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from flask import Blueprint, Response, request
+
+from batch_indicators import MA_WINDOWS, rolling_mean
+from cache import TTLCache, get_shared_cache
+from config import API_CONFIG, CACHE_CONFIG
+from request_scheduler import interactive
+from snapshot import SORT_KEYS, RankingSnapshot, SnapshotPublisher
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy 标量（np.bool_、np.int64 等）
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def encode_json(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+class _Encoded:
+    """编码后的响应体及其 gzip 版本（按需生成一次）"""
+
+    __slots__ = ('body', 'etag', '_gzipped')
+
+    def __init__(self, body: bytes, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag or hashlib.sha1(body).hexdigest()[:16]
+        self._gzipped: Optional[bytes] = None
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=int(API_CONFIG.get('gzip_level', 6)))
+        return self._gzipped
+
+
+def _respond(encoded: _Encoded, status: int = 200) -> Response:
+    """带 ETag / If-None-Match / gzip 的 JSON 响应"""
+    headers = {
+        'ETag': f'W/"{encoded.etag}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if status == 200 and request.if_none_match.contains_weak(encoded.etag):
+        return Response(status=304, headers=headers)
+
+    body = encoded.body
+    if len(body) >= int(API_CONFIG.get('gzip_min_bytes', 1024)) and 'gzip' in request.accept_encodings:
+        body = encoded.gzipped()
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+
+def _error(status: int, message: str) -> Response:
+    return Response(encode_json({'error': message}), status=status, mimetype='application/json')
+
+
+def _limit_arg(default: int) -> int:
+    max_limit = int(API_CONFIG.get('max_limit', 1000))
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, max_limit))
+
+
+def _sse(event: str, payload: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {encode_json(payload).decode('utf-8')}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def create_api(analyzer: Any, snapshots: SnapshotPublisher, cache: Optional[TTLCache] = None) -> Blueprint:
+    """
+    创建 API 蓝图，由 app.py 注册到 app.server
+
+    Args:
+        analyzer: CryptoAnalyzer 或 SyncCryptoAnalyzer
+        snapshots: 后台更新线程发布排行快照的 SnapshotPublisher
+        cache: 编码后响应体的缓存，默认使用共享缓存
+    """
+    cache = cache if cache is not None else get_shared_cache()
+    api = Blueprint('api', __name__, url_prefix=API_CONFIG.get('prefix', '/api'))
+
+    def cached(key: Tuple, loader: Callable[[], Optional[_Encoded]], ttl: Optional[float] = None) -> Optional[_Encoded]:
+        return cache.get_or_load(('api',) + key, loader, ttl, cache_if=lambda encoded: encoded is not None)
+
+    @api.after_request
+    def add_cors(response: Response) -> Response:
+        origin = API_CONFIG.get('cors_origin')
+        if origin:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Expose-Headers'] = 'ETag'
+        return response
+
+    @api.route('/opportunities')
+    def opportunities() -> Response:
+        snapshot = snapshots.current
+        sort_by = request.args.get('sort_by', 'volume_ratio')
+        if sort_by not in SORT_KEYS:
+            return _error(400, f"sort_by 仅支持 {', '.join(SORT_KEYS)}")
+        ascending = request.args.get('order', 'desc') == 'asc'
+        limit = _limit_arg(len(snapshot) or 1)
+        exchanges = tuple(sorted(set(request.args.getlist('exchange'))))
+
+        def load() -> _Encoded:
+            rows = snapshot.view(sort_by, limit, exchanges, ascending)
+            body = encode_json({
+                'version': snapshot.version,
+                'updated_at': snapshot.updated_at.isoformat() if snapshot.updated_at else None,
+                'total': len(snapshot),
+                'count': len(rows),
+                'rows': rows,
+            })
+            params = hashlib.sha1(repr((sort_by, ascending, limit, exchanges)).encode()).hexdigest()[:8]
+            return _Encoded(body, f"v{snapshot.version}-{params}")
+
+        # 快照不可变，同一版本同一参数的响应体相同
+        return _respond(cached(('opportunities', snapshot.version, sort_by, ascending, limit, exchanges), load))
+
+    @api.route('/symbols/<path:symbol>/candles')
+    def candles(symbol: str) -> Response:
+        symbol = _resolve_symbol(analyzer, symbol)
+        if symbol is None:
+            return _error(404, "未知的交易对")
+        timeframe = request.args.get('timeframe', '1h')
+        limit = _limit_arg(100)
+
+        def load() -> Optional[_Encoded]:
+            # 前端正在等待的请求，走交互式通道
+            with interactive():
+                bars = analyzer.get_ohlcv_bars(symbol, timeframe, limit)
+            if bars is None or not len(bars):
+                return None
+            return _Encoded(encode_json({
+                'symbol': symbol,
+                'exchange': analyzer.exchange_by_symbol.get(symbol, ''),
+                'timeframe': timeframe,
+                'candles': _candle_rows(bars),
+            }))
+
+        encoded = cached(('candles', symbol, timeframe, limit), load, CACHE_CONFIG.get('chart_ttl', 60))
+        if encoded is None:
+            return _error(502, f"获取 {symbol} K线失败")
+        return _respond(encoded)
+
+    @api.route('/exchanges/status')
+    def exchanges_status() -> Response:
+        # 各交易所状态来自健康监控的汇总，读取不发出请求
+        stats = analyzer.get_exchange_statistics()
+        return _respond(_Encoded(encode_json(stats)))
+
+    @api.route('/stream')
+    def stream() -> Response:
+        keepalive = float(API_CONFIG.get('sse_keepalive', 15))
+        retry_ms = int(API_CONFIG.get('sse_retry_ms', 3000))
+        try:
+            last_version = int(request.headers.get('Last-Event-ID') or request.args.get('since') or -1)
+        except ValueError:
+            last_version = -1
+
+        def events() -> Iterator[str]:
+            yield f"retry: {retry_ms}\n\n"
+            version = last_version
+            snapshot = snapshots.current
+            while True:
+                if snapshot.version != version:
+                    yield _snapshot_event(cache, snapshot, version)
+                    version = snapshot.version
+                else:
+                    yield ': keepalive\n\n'
+                snapshot = snapshots.wait_for_update(version, keepalive)
+
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        return Response(events(), mimetype='text/event-stream', headers=headers)
+
+    return api
+
+
+def _snapshot_event(cache: TTLCache, snapshot: RankingSnapshot, client_version: int) -> str:
+    """客户端正好落后一个版本时发送 delta，否则发送完整快照；事件文本按版本缓存"""
+    delta = snapshot.delta
+    if delta is not None and delta['base_version'] == client_version:
+        return cache.get_or_load(('api', 'sse', 'delta', snapshot.version),
+                                 lambda: _sse('delta', delta, snapshot.version))
+    return cache.get_or_load(('api', 'sse', 'snapshot', snapshot.version), lambda: _sse('snapshot', {
+        'version': snapshot.version,
+        'updated_at': snapshot.updated_at.isoformat() if snapshot.updated_at else None,
+        'rows': list(snapshot.rows),
+    }, snapshot.version))
+
+
+def _resolve_symbol(analyzer: Any, symbol: str) -> Optional[str]:
+    """接受 BTC/USDT、BTC-USDT、BTC_USDT 形式"""
+    known = analyzer.exchange_by_symbol
+    for candidate in (symbol, symbol.replace('-', '/'), symbol.replace('_', '/')):
+        if candidate in known:
+            return candidate
+    return None
+
+
+def _candle_rows(bars: np.ndarray) -> List[Dict[str, Any]]:
+    """(n, 6) K线 -> 带 MA 的行（与前端 KlineData 字段一致）"""
+    bars = np.asarray(bars, dtype=np.float64)
+    closes = bars[:, 4]
+    mas = {f'ma{w}': rolling_mean(closes, w) for w in MA_WINDOWS}
+    rows = []
+    for i, (ts, o, h, l, c, v) in enumerate(bars.tolist()):
+        row = {'timestamp': int(ts), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for name, values in mas.items():
+            value = values[i]
+            row[name] = float(value) if np.isfinite(value) else None
+        rows.append(row)
+    return rows
@@ -1,17 +1,19 @@
 import dash
-from dash import dcc, html, Input, Output, callback
+from dash import dcc, html, Input, Output, State, ClientsideFunction, callback, no_update
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime
-import threading
-import time
 import logging
-from typing import List, Dict, Any
 
-from crypto_analyzer import CryptoAnalyzer
-from config import EXCHANGES
+from api import create_api
+from cache import get_shared_cache
+from crypto_analyzer import create_analyzer
+from config import EXCHANGES, API_CONFIG, HEALTH_CONFIG, SCANNER_CONFIG
+from scanner_worker import ScanLoop
+from snapshot import SnapshotPublisher
+from snapshot_file import SnapshotFollower
 
 # 配置日志
 logging.basicConfig(
@@ -25,40 +27,27 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # 初始化分析器
-analyzer = CryptoAnalyzer()
+analyzer = create_analyzer()
 
 # 创建Dash应用
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "加密货币交易机会分析器"
+server = app.server  # 供 gunicorn 等 WSGI 服务器启动多个 Web 进程（配合 SCANNER_MODE=external）
 
-# 全局变量存储数据
-opportunities_data: List[Dict[str, Any]] = []
-last_update_time: datetime = None
-update_thread: threading.Thread = None
-stop_update: bool = False
+# 每次扫描/重新排序后发布的排行快照，界面回调只读取快照
+ranking_snapshots = SnapshotPublisher()
+TABLE_ROWS = 20  # 详细表格显示的行数（与 assets/ranking.js 一致）
 
-# 数据缓存
-data_cache: Dict[str, Any] = {}
-cache_timeout: int = 300  # 5分钟缓存
+# 与分析器共用的缓存（图表、ticker、交易所状态）
+data_cache = get_shared_cache()
 
-def get_cached_data(key: str) -> Any:
-    """获取缓存数据"""
-    if key not in data_cache:
-        return None
-    
-    cached_data = data_cache[key]
-    if time.time() - cached_data['timestamp'] > cache_timeout:
-        del data_cache[key]
-        return None
-    
-    return cached_data['data']
+# 前端使用的 HTTP API（/api/opportunities、/api/stream 等）
+if API_CONFIG.get('enabled', True):
+    app.server.register_blueprint(create_api(analyzer, ranking_snapshots, data_cache))
 
-def set_cached_data(key: str, data: Any) -> None:
-    """设置缓存数据"""
-    data_cache[key] = {
-        'data': data,
-        'timestamp': time.time()
-    }
+# 扫描：embedded 在本进程后台线程中运行；external 由 `python cli.py worker` 写入快照文件，本进程只跟踪文件
+scan_loop: ScanLoop = None
+snapshot_follower: SnapshotFollower = None
 
 def format_volume(volume: float) -> str:
     """智能格式化交易量显示"""
@@ -69,40 +58,26 @@ def format_volume(volume: float) -> str:
     else:
         return f"{volume:.0f}"
 
-def update_data_background():
-    """后台更新数据的线程函数"""
-    global opportunities_data, last_update_time, stop_update
-    
-    while not stop_update:
-        try:
-            logger.info("开始扫描交易机会...")
-            # 获取可交易交易对
-            symbols = analyzer.get_tradable_symbols()
-            if symbols:
-                # 扫描交易机会
-                opportunities = analyzer.get_top_opportunities(20, 'volume_ratio')  # 只获取前20个用于表格显示
-                opportunities_data = opportunities
-                last_update_time = datetime.now()
-                logger.info(f"找到 {len(opportunities)} 个交易机会")
-            else:
-                logger.warning("未找到符合条件的交易对，请检查网络连接")
-                opportunities_data = []
-            
-            # 等待3分钟再次更新
-            time.sleep(180)
-            
-        except Exception as e:
-            logger.error(f"更新数据时出错: {e}", exc_info=True)
-            logger.info("将在60秒后重试...")
-            time.sleep(60)
+def remember_symbols(snapshot) -> None:
+    """external 模式下本进程不扫描，从快照中补齐交易对所属交易所（K线图和 API 需要）"""
+    analyzer.exchange_by_symbol = {
+        **analyzer.exchange_by_symbol,
+        **{row['symbol']: row['exchange'] for row in snapshot.rows},
+    }
 
 def start_update_thread():
-    """启动更新线程"""
-    global update_thread, stop_update
-    if update_thread is None or not update_thread.is_alive():
-        stop_update = False
-        update_thread = threading.Thread(target=update_data_background, daemon=True)
-        update_thread.start()
+    """启动更新线程（external 模式下启动快照文件跟踪）"""
+    global scan_loop, snapshot_follower
+    if SCANNER_CONFIG.get('mode', 'embedded') == 'external':
+        if snapshot_follower is None:
+            snapshot_follower = SnapshotFollower(SCANNER_CONFIG['snapshot_path'], ranking_snapshots,
+                                                 SCANNER_CONFIG.get('poll_interval', 1.0))
+            snapshot_follower.add_listener(remember_symbols)
+        snapshot_follower.start()
+        return
+    if scan_loop is None:
+        scan_loop = ScanLoop(analyzer, ranking_snapshots.publish)
+    scan_loop.start()
 
 # 启动更新线程
 start_update_thread()
@@ -122,7 +97,7 @@ app.layout = dbc.Container([
             dbc.Card([
                 dbc.CardHeader([
                     html.H5("📊 交易量排行图表", className="mb-0"),
-                    html.Small(f"最后更新: {last_update_time.strftime('%Y-%m-%d %H:%M:%S') if last_update_time else '未更新'}", 
+                    html.Small(f"最后更新: {ranking_snapshots.current.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ranking_snapshots.current.updated_at else '未更新'}", 
                               className="text-muted")
                 ]),
                 dbc.CardBody([
@@ -171,7 +146,7 @@ app.layout = dbc.Container([
                             )
                         ], width=6)
                     ], className="mb-3"),
-                    html.Div(id="ranking-chart")
+                    dcc.Graph(id="ranking-chart")
                 ])
             ])
         ], width=12)
@@ -272,8 +247,10 @@ app.layout = dbc.Container([
         ], width=12)
     ]),
     
-    # 隐藏的存储组件
+    # 隐藏的存储组件：列式排行快照，筛选和排序在浏览器中完成（assets/ranking.js）
     dcc.Store(id="data-store"),
+    # 当前客户端已收到的快照版本，版本变化时才重新下发快照
+    dcc.Store(id="snapshot-version"),
     
     # 自动刷新间隔（Bolt.host优化）
     dcc.Interval(
@@ -285,173 +262,38 @@ app.layout = dbc.Container([
 ], fluid=True, className="py-4")
 
 @app.callback(
-    Output("ranking-chart", "children"),
+    Output("snapshot-version", "data"),
+    Output("data-store", "data"),
     Input("interval-component", "n_intervals"),
+    State("snapshot-version", "data")
+)
+def sync_snapshot(n, rendered_version):
+    """快照版本变化时下发列式快照，否则不触发任何更新"""
+    snapshot = ranking_snapshots.current
+    if snapshot.version == rendered_version:
+        return no_update, no_update
+    return snapshot.version, snapshot.to_columns()
+
+# 排行图表：排序字段、显示数量、交易所筛选均在客户端处理
+app.clientside_callback(
+    ClientsideFunction(namespace="ranking", function_name="renderChart"),
+    Output("ranking-chart", "figure"),
+    Input("data-store", "data"),
     Input("ranking-sort", "value"),
     Input("ranking-limit", "value"),
     Input("ranking-exchange-filter", "value")
 )
-def update_ranking_chart(n, sort_by, limit, exchange_filter):
-    """更新排行图表"""
-    global opportunities_data
-    
-    opps = opportunities_data or []
-    
-    # 过滤：按交易所
-    if exchange_filter:
-        opps = [o for o in opps if o.get('exchange') in set(exchange_filter)]
-    
-    if not opps:
-        return html.P("暂无数据，请等待更新...", className="text-muted text-center py-4")
-    
-    # 排序
-    try:
-        opps = sorted(opps, key=lambda o: o.get(sort_by, 0), reverse=True)
-    except Exception:
-        pass
-    
-    # 限制数量
-    opps = opps[:limit]
-    
-    # 准备图表数据
-    symbols = [o['symbol'] for o in opps]
-    values = [o.get(sort_by, 0) for o in opps]
-    
-    # 根据排序字段设置标签和颜色
-    if sort_by == 'volume_ratio':
-        title = f"交易量比率排行 (前{limit}名)"
-        y_label = "交易量比率"
-        colors = ['#ff4757' if v > 10 else '#ff6b6b' if v > 5 else '#4ecdc4' if v > 3 else '#45b7d1' for v in values]
-    elif sort_by == 'composite_score':
-        title = f"综合评分排行 (前{limit}名)"
-        y_label = "综合评分"
-        colors = ['#ff4757' if v > 80 else '#ff6b6b' if v > 60 else '#4ecdc4' if v > 40 else '#45b7d1' for v in values]
-    elif sort_by == 'current_volume':
-        title = f"24小时交易量排行 (前{limit}名)"
-        y_label = "交易量 (USDT)"
-        colors = ['#ff4757' if v > 5000000 else '#ff6b6b' if v > 1000000 else '#4ecdc4' if v > 500000 else '#45b7d1' for v in values]
-    elif sort_by == 'price_change_24h':
-        title = f"24小时涨跌排行 (前{limit}名)"
-        y_label = "涨跌幅 (%)"
-        values = [v * 100 for v in values]  # 转换为百分比
-        colors = ['#ff4757' if v > 20 else '#ff6b6b' if v > 10 else '#4ecdc4' if v > 0 else '#45b7d1' for v in values]
-    else:
-        title = f"当前价格排行 (前{limit}名)"
-        y_label = "价格 (USDT)"
-        colors = ['#ff4757' if v > 1000 else '#ff6b6b' if v > 100 else '#4ecdc4' if v > 10 else '#45b7d1' for v in values]
-    
-    # 创建条形图
-    fig = go.Figure(data=[
-        go.Bar(
-            x=symbols,
-            y=values,
-            marker_color=colors,
-            text=[f"{v:.2f}" if isinstance(v, float) else f"{v:,.0f}" for v in values],
-            textposition='auto',
-            hovertemplate='<b>%{x}</b><br>' + 
-                         f'{y_label}: %{{y}}<br>' +
-                         '交易所: %{customdata[0]}<br>' +
-                         '当前价格: $%{customdata[1]:.6f}<br>' +
-                         '24h涨跌: %{customdata[2]:.2f}%<br>' +
-                         '交易量比率: %{customdata[3]:.2f}x<br>' +
-                         '综合评分: %{customdata[4]:.1f}<br>' +
-                         '<extra></extra>',
-            customdata=[[
-                o.get('exchange', ''),
-                o.get('current_price', 0),
-                o.get('price_change_24h', 0) * 100,
-                o.get('volume_ratio', 0),
-                o.get('composite_score', 0)
-            ] for o in opps]
-        )
-    ])
-    
-    # 更新布局
-    fig.update_layout(
-        title=title,
-        xaxis_title="交易对",
-        yaxis_title=y_label,
-        height=500,
-        showlegend=False,
-        margin=dict(l=50, r=50, t=80, b=50),
-        xaxis=dict(tickangle=45),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # 添加网格线
-    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-    
-    return dcc.Graph(figure=fig)
 
-@app.callback(
+# 详细表格和交易对下拉选项
+app.clientside_callback(
+    ClientsideFunction(namespace="ranking", function_name="renderTable"),
     Output("opportunities-table", "children"),
     Output("symbol-dropdown", "options"),
-    Input("interval-component", "n_intervals"),
+    Input("data-store", "data"),
     Input("exchange-filter", "value"),
     Input("sort-by", "value"),
     Input("sort-order", "value")
 )
-def update_opportunities_table(n, exchange_filter, sort_by, sort_order):
-    """更新交易机会表格和交易对下拉选项（支持筛选与排序）"""
-    global opportunities_data, last_update_time
-
-    opps = opportunities_data or []
-
-    # 过滤：按交易所
-    if exchange_filter:
-        opps = [o for o in opps if o.get('exchange') in set(exchange_filter)]
-
-    # 排序
-    key_fn = lambda o: o.get(sort_by, 0)
-    reverse = (sort_order != 'asc')
-    try:
-        opps = sorted(opps, key=key_fn, reverse=reverse)
-    except Exception:
-        pass
-
-    # 创建表格
-    if not opps:
-        return html.P("暂无交易机会数据", className="text-muted"), []
-
-    table_rows = []
-    for i, opp in enumerate(opps):
-        signal_color = "success" if opp['signal'] == 'long' else "danger"
-        signal_text = "做多" if opp['signal'] == 'long' else "做空"
-        row = dbc.Row([
-            dbc.Col(f"{i+1}", width=1, className="text-center"),
-            dbc.Col(opp['symbol'], width=2, className="fw-bold"),
-            dbc.Col(opp.get('exchange', ''), width=1, className="text-muted"),
-            dbc.Col(f"${opp['current_price']:.6f}", width=2),
-            dbc.Col(f"{opp['volume_ratio']:.2f}x", width=1, className="text-warning"),
-            dbc.Col(f"{format_volume(opp.get('avg_volume_30', 0))}", width=1, className="text-info"),
-            dbc.Col(f"{format_volume(opp['current_volume'])}", width=1, className="text-success"),
-            dbc.Col([
-                dbc.Badge(signal_text, color=signal_color, className="fs-6")
-            ], width=1),
-            dbc.Col(f"{opp['price_change_24h']*100:.2f}%", 
-                    width=1, 
-                    className="text-success" if opp['price_change_24h'] > 0 else "text-danger")
-        ], className="mb-2 align-items-center")
-        table_rows.append(row)
-
-    header = dbc.Row([
-        dbc.Col("排名", width=1, className="fw-bold text-center"),
-        dbc.Col("交易对", width=2, className="fw-bold"),
-        dbc.Col("交易所", width=1, className="fw-bold"),
-        dbc.Col("当前价格", width=2, className="fw-bold"),
-        dbc.Col("交易量比率", width=1, className="fw-bold"),
-        dbc.Col("平均交易量", width=1, className="fw-bold"),
-        dbc.Col("当前交易量", width=1, className="fw-bold"),
-        dbc.Col("交易信号", width=1, className="fw-bold"),
-        dbc.Col("24h涨跌", width=1, className="fw-bold")
-    ], className="mb-3 fw-bold border-bottom pb-2")
-
-    # 下拉选项基于过滤后的机会
-    symbol_options = [{'label': o['symbol'], 'value': o['symbol']} for o in opps]
-
-    return [header] + table_rows, symbol_options
 
 @app.callback(
     Output("charts-container", "children"),
@@ -599,12 +441,18 @@ def update_exchange_status(n):
                 status_icon = "✅"
                 status_text = "正常"
                 
-                # 显示详细信息
+                # 显示详细信息（来自健康监控对真实请求的统计）
                 info_items = [
                     f"交易对: {status.get('market_count', 0)}",
-                    f"成功率: {status.get('ticker_success_rate', 0)*100:.1f}%",
+                    f"成功率: {status.get('success_rate', 0)*100:.1f}%（近{HEALTH_CONFIG.get('window', 300) // 60}分钟 "
+                    f"{status.get('requests', 0)} 次请求）",
                     f"最小交易量: ${status.get('min_volume_usd', 0):,.0f}"
                 ]
+                if status.get('latency_p50_ms') is not None:
+                    info_items.append(f"延迟: p50 {status['latency_p50_ms']:.0f}ms / "
+                                      f"p95 {status['latency_p95_ms']:.0f}ms / p99 {status['latency_p99_ms']:.0f}ms")
+                if status.get('last_success'):
+                    info_items.append(f"最近成功: {datetime.fromtimestamp(status['last_success']).strftime('%H:%M:%S')}")
             else:
                 # 连接失败
                 status_color = "danger"
@@ -0,0 +1,200 @@
+/*
+ * 排行图表与详细表格的客户端回调
+ *
+ * 服务器每个快照版本只向 dcc.Store(id="data-store") 推送一次列式 JSON（snapshot.RankingSnapshot.to_columns()），
+ * 之后切换排序字段、显示数量、交易所筛选和升降序都在浏览器内完成，不再请求服务器。
+ */
+(function () {
+    var TABLE_ROWS = 20;
+    var SIGNAL_BADGES = {
+        long: ['success', '做多'],
+        short: ['danger', '做空'],
+        hold: ['warning', '观望']
+    };
+    var CHART_STYLES = {
+        volume_ratio: {title: '交易量比率排行', label: '交易量比率', thresholds: [10, 5, 3]},
+        composite_score: {title: '综合评分排行', label: '综合评分', thresholds: [80, 60, 40]},
+        current_volume: {title: '24小时交易量排行', label: '交易量 (USDT)', thresholds: [5000000, 1000000, 500000]},
+        price_change_24h: {title: '24小时涨跌排行', label: '涨跌幅 (%)', thresholds: [20, 10, 0], percent: true},
+        current_price: {title: '当前价格排行', label: '价格 (USDT)', thresholds: [1000, 100, 10]}
+    };
+    var COLORS = ['#ff4757', '#ff6b6b', '#4ecdc4', '#45b7d1'];
+
+    function formatVolume(volume) {
+        if (volume >= 1000000) {
+            return (volume / 1000000).toFixed(1) + 'M';
+        }
+        if (volume >= 1000) {
+            return (volume / 1000).toFixed(1) + 'K';
+        }
+        return volume.toFixed(0);
+    }
+
+    /* 按交易所筛选后稳定排序，返回前 limit 行的下标 */
+    function selectRows(data, sortBy, limit, exchanges, ascending) {
+        var columns = data.columns;
+        var values = columns[sortBy] || columns.volume_ratio;
+        var rows = [];
+        var allowed = null;
+        if (exchanges && exchanges.length) {
+            allowed = {};
+            exchanges.forEach(function (name) {
+                var code = data.exchanges.indexOf(name);
+                if (code >= 0) {
+                    allowed[code] = true;
+                }
+            });
+        }
+        for (var i = 0; i < columns.symbol.length; i++) {
+            if (allowed === null || allowed[columns.exchange[i]]) {
+                rows.push(i);
+            }
+        }
+        // Array.prototype.sort 是稳定排序，相同值保持服务器给出的顺序
+        rows.sort(function (a, b) {
+            return ascending ? values[a] - values[b] : values[b] - values[a];
+        });
+        return limit ? rows.slice(0, limit) : rows;
+    }
+
+    function component(namespace, type, props) {
+        return {namespace: namespace, type: type, props: props};
+    }
+
+    function col(children, width, className) {
+        return component('dash_bootstrap_components', 'Col', {children: children, width: width, className: className});
+    }
+
+    function emptyFigure(message) {
+        return {
+            data: [],
+            layout: {
+                height: 200,
+                xaxis: {visible: false},
+                yaxis: {visible: false},
+                annotations: [{text: message, showarrow: false, font: {color: '#6c757d', size: 14}}],
+                plot_bgcolor: 'rgba(0,0,0,0)',
+                paper_bgcolor: 'rgba(0,0,0,0)'
+            }
+        };
+    }
+
+    function renderChart(data, sortBy, limit, exchanges) {
+        if (!data || !data.columns || !data.columns.symbol.length) {
+            return emptyFigure('暂无数据，请等待更新...');
+        }
+        var rows = selectRows(data, sortBy, limit, exchanges, false);
+        if (!rows.length) {
+            return emptyFigure('暂无数据，请等待更新...');
+        }
+        var columns = data.columns;
+        var style = CHART_STYLES[sortBy] || CHART_STYLES.current_price;
+        var values = rows.map(function (i) {
+            var v = (columns[sortBy] || columns.volume_ratio)[i];
+            return style.percent ? v * 100 : v;
+        });
+        var colors = values.map(function (v) {
+            for (var t = 0; t < style.thresholds.length; t++) {
+                if (v > style.thresholds[t]) {
+                    return COLORS[t];
+                }
+            }
+            return COLORS[COLORS.length - 1];
+        });
+        return {
+            data: [{
+                type: 'bar',
+                x: rows.map(function (i) { return columns.symbol[i]; }),
+                y: values,
+                marker: {color: colors},
+                text: values.map(function (v) { return v.toFixed(2); }),
+                textposition: 'auto',
+                hovertemplate: '<b>%{x}</b><br>' +
+                    style.label + ': %{y}<br>' +
+                    '交易所: %{customdata[0]}<br>' +
+                    '当前价格: $%{customdata[1]:.6f}<br>' +
+                    '24h涨跌: %{customdata[2]:.2f}%<br>' +
+                    '交易量比率: %{customdata[3]:.2f}x<br>' +
+                    '综合评分: %{customdata[4]:.1f}<br>' +
+                    '<extra></extra>',
+                customdata: rows.map(function (i) {
+                    return [
+                        data.exchanges[columns.exchange[i]],
+                        columns.current_price[i],
+                        columns.price_change_24h[i] * 100,
+                        columns.volume_ratio[i],
+                        columns.composite_score[i]
+                    ];
+                })
+            }],
+            layout: {
+                title: {text: style.title + ' (前' + limit + '名)'},
+                xaxis: {title: {text: '交易对'}, tickangle: 45, showgrid: true, gridwidth: 1, gridcolor: 'lightgray'},
+                yaxis: {title: {text: style.label}, showgrid: true, gridwidth: 1, gridcolor: 'lightgray'},
+                height: 500,
+                showlegend: false,
+                margin: {l: 50, r: 50, t: 80, b: 50},
+                plot_bgcolor: 'rgba(0,0,0,0)',
+                paper_bgcolor: 'rgba(0,0,0,0)'
+            }
+        };
+    }
+
+    function renderTable(data, exchanges, sortBy, sortOrder) {
+        if (!data || !data.columns) {
+            return [component('dash_html_components', 'P', {children: '暂无交易机会数据', className: 'text-muted'}), []];
+        }
+        var columns = data.columns;
+        var rows = selectRows(data, sortBy, TABLE_ROWS, exchanges, sortOrder === 'asc');
+        if (!rows.length) {
+            return [component('dash_html_components', 'P', {children: '暂无交易机会数据', className: 'text-muted'}), []];
+        }
+
+        var header = component('dash_bootstrap_components', 'Row', {
+            className: 'mb-3 fw-bold border-bottom pb-2',
+            children: [
+                col('排名', 1, 'fw-bold text-center'),
+                col('交易对', 2, 'fw-bold'),
+                col('交易所', 1, 'fw-bold'),
+                col('当前价格', 2, 'fw-bold'),
+                col('交易量比率', 1, 'fw-bold'),
+                col('平均交易量', 1, 'fw-bold'),
+                col('当前交易量', 1, 'fw-bold'),
+                col('交易信号', 1, 'fw-bold'),
+                col('24h涨跌', 1, 'fw-bold')
+            ]
+        });
+        var table = [header].concat(rows.map(function (i, rank) {
+            var badge = SIGNAL_BADGES[columns.signal[i]] || ['secondary', '无信号'];
+            var change = columns.price_change_24h[i];
+            return component('dash_bootstrap_components', 'Row', {
+                className: 'mb-2 align-items-center',
+                children: [
+                    col(String(rank + 1), 1, 'text-center'),
+                    col(columns.symbol[i], 2, 'fw-bold'),
+                    col(data.exchanges[columns.exchange[i]], 1, 'text-muted'),
+                    col('$' + columns.current_price[i].toFixed(6), 2),
+                    col(columns.volume_ratio[i].toFixed(2) + 'x', 1, 'text-warning'),
+                    col(formatVolume(columns.avg_volume_30[i]), 1, 'text-info'),
+                    col(formatVolume(columns.current_volume[i]), 1, 'text-success'),
+                    col([component('dash_bootstrap_components', 'Badge', {
+                        children: badge[1], color: badge[0], className: 'fs-6'
+                    })], 1),
+                    col((change * 100).toFixed(2) + '%', 1, change > 0 ? 'text-success' : 'text-danger')
+                ]
+            });
+        }));
+        // 下拉选项基于筛选后的交易对
+        var options = rows.map(function (i) {
+            return {label: columns.symbol[i], value: columns.symbol[i]};
+        });
+        return [table, options];
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        ranking: {
+            renderChart: renderChart,
+            renderTable: renderTable
+        }
+    });
+})();
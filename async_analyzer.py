@@ -0,0 +1,458 @@
+"""
+基于 ccxt.async_support 的异步分析器
+
+所有交易所共享同一个事件循环，每个交易所实例持有自己的 aiohttp 会话；
+一次完整扫描（交易对筛选、K线获取、指标计算）在事件循环内以 gather 并发完成。
+SyncCryptoAnalyzer 在后台线程中运行事件循环，对外提供与 CryptoAnalyzer 相同的同步接口。
+
+交易对筛选、ticker 缓存合并、指标计算与排序与同步后端共用 AnalyzerBase 的实现；
+K线获取只实现了逐个交易对并发请求，同步后端的以下功能在 async 后端中不可用：
+  - 增量K线存储与磁盘归档（DATA_CONFIG['candle_store']、ARCHIVE_CONFIG），每次扫描全量拉取K线
+  - 多交易对K线接口等获取策略（SCAN_CONFIG['candle_providers']）
+  - ticker 预筛选（SCAN_CONFIG['ticker_prefilter']，依赖K线存储）
+  - 多进程分片扫描（SCAN_CONFIG['processes']）
+  - 共享 HTTP 连接池统计（NETWORK_CONFIG['transport'] 只作用于同步 ccxt）
+实时推送（stream_ingest）通过 fetch_ohlcv_many 补齐，可以配合使用，但补齐结果不写入K线存储。
+"""
+
+import asyncio
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import ccxt.async_support as ccxt_async
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache, get_shared_cache
+from config import (CACHE_CONFIG, DATA_CONFIG, MARKET_CACHE_CONFIG, NETWORK_CONFIG, REQUEST_SCHEDULER_CONFIG,
+                    SCAN_CONFIG)
+from crypto_analyzer import AnalyzerBase
+from health_monitor import HealthMonitor, get_health_monitor
+from market_cache import MarketCache
+from opportunity_table import OpportunityTable
+from request_scheduler import RequestScheduler, get_scheduler, interactive
+from scan_engine import exchange_concurrency
+from single_flight import AsyncSingleFlight
+from streaming_indicators import StreamingIndicators
+from symbol_universe import SymbolUniverse
+
+logger = logging.getLogger(__name__)
+
+
+def unsupported_async_options() -> List[str]:
+    """当前配置中已显式启用、但 async 后端会忽略的选项"""
+    ignored = []
+    if SCAN_CONFIG.get('ticker_prefilter', False):
+        ignored.append("SCAN_CONFIG['ticker_prefilter']")
+    if int(SCAN_CONFIG.get('processes', 1)) > 1:
+        ignored.append("SCAN_CONFIG['processes']")
+    if DATA_CONFIG.get('candle_closed_only', False):
+        ignored.append("DATA_CONFIG['candle_closed_only']")
+    return ignored
+
+
+class AsyncCryptoAnalyzer(AnalyzerBase):
+    def __init__(self, exchange_name: str = 'binance', exchanges: Optional[List[Tuple[str, Dict, Any]]] = None,
+                 cache: Optional[TTLCache] = None):
+        """
+        初始化异步分析器（交易所实例在 start() 中创建）
+
+        Args:
+            exchange_name: 兼容旧参数，未启用任何交易所时使用
+            exchanges: 预先创建的 (name, conf, inst) 列表，inst 需提供 ccxt 异步接口
+            cache: 图表、ticker、交易所状态使用的缓存，默认使用 get_shared_cache()
+        """
+        self.exchange_name = exchange_name
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.exchanges: List[Tuple[str, Dict, Any]] = exchanges or []
+        self.symbols: List[str] = []
+        self.exchange_by_symbol: Dict[str, str] = {}
+        self.universe = SymbolUniverse()
+        self._started = exchanges is not None
+        self.market_cache = MarketCache() if MARKET_CACHE_CONFIG.get('enabled', True) else None
+        self._refresh_tasks: List[asyncio.Future] = []
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.health: HealthMonitor = get_health_monitor()
+        self.scheduler: Optional[RequestScheduler] = (
+            get_scheduler() if REQUEST_SCHEDULER_CONFIG.get('enabled', True) else None)
+        # 同一 (交易对, 周期, 数量) 的并发请求共享一次上游获取
+        self.ohlcv_flight = AsyncSingleFlight('ohlcv')
+        self.chart_flight = AsyncSingleFlight('chart')
+
+    async def __aenter__(self) -> 'AsyncCryptoAnalyzer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """在当前事件循环中初始化交易所，并向健康监控登记（探测在本事件循环中执行）"""
+        if not self._started:
+            self.exchanges = await self._init_exchanges()
+            self._started = True
+        loop = asyncio.get_running_loop()
+        for name, _, inst in self.exchanges:
+            self.health.register(name, lambda name=name, inst=inst: asyncio.run_coroutine_threadsafe(
+                self._ping(name, inst), loop).result(timeout=NETWORK_CONFIG.get('timeout', 10000) / 1000 * 2))
+
+    async def close(self) -> None:
+        """关闭所有交易所的 aiohttp 会话"""
+        for task in self._refresh_tasks:
+            task.cancel()
+        await asyncio.gather(
+            *(inst.close() for _, _, inst in self.exchanges if hasattr(inst, 'close')),
+            return_exceptions=True
+        )
+
+    async def _init_one(self, ex: Dict) -> Optional[Tuple[str, Dict, Any]]:
+        name = ex['name']
+        market_type = ex.get('options', {}).get('defaultType', 'spot')
+        logger.info(f"正在初始化交易所: {name} ({ex.get('description', '')}) [{market_type} 市场]")
+        try:
+            inst = getattr(ccxt_async, name)(self._exchange_params(ex))
+        except Exception as e:
+            logger.error(f"❌ 初始化交易所 {name} 失败: {e}")
+            return None
+
+        inst.timeout = 10000  # 10秒超时
+        if self.market_cache is not None:
+            fresh = self.market_cache.restore(name, ex, inst)
+            if fresh is not None:
+                logger.info(f"✅ {name} 从缓存恢复，支持 {len(inst.markets)} 个交易对")
+                if not fresh:
+                    self._refresh_tasks.append(asyncio.ensure_future(self._refresh_markets(name, ex, inst)))
+                return name, ex, inst
+
+        try:
+            markets = await inst.load_markets()
+            logger.info(f"✅ {name} 初始化成功，支持 {len(markets)} 个交易对")
+            if self.market_cache is not None:
+                self.market_cache.save(name, ex, inst)
+            return name, ex, inst
+        except Exception as test_err:
+            self._log_connect_error(name, test_err)
+            await inst.close()
+            return None
+
+    async def _refresh_markets(self, name: str, ex: Dict, inst: Any) -> None:
+        """后台刷新过期的市场缓存"""
+        try:
+            await inst.load_markets(reload=True)
+            self.market_cache.save(name, ex, inst)
+            logger.info(f"🔄 {name} 市场缓存已后台刷新，共 {len(inst.markets)} 个交易对")
+        except Exception as e:
+            logger.warning(f"后台刷新 {name} 市场数据失败: {e}")
+
+    async def _init_exchanges(self) -> List[Tuple[str, Dict, Any]]:
+        """并发初始化交易所实例，保持优先级顺序"""
+        enabled_exchanges = self._enabled_exchange_configs()
+        logger.info(f"初始化 {len(enabled_exchanges)} 个启用的交易所")
+
+        results = await asyncio.gather(*(self._init_one(ex) for ex in enabled_exchanges))
+        instances = [r for r in results if r is not None]
+
+        if not instances:
+            logger.warning("没有启用的交易所，使用默认配置")
+            try:
+                params, conf = self._default_exchange_params()
+                inst = getattr(ccxt_async, self.exchange_name)(params)
+                instances.append((self.exchange_name, conf, inst))
+                logger.info(f"✅ 默认交易所 {self.exchange_name} 初始化成功")
+            except Exception as e:
+                logger.error(f"❌ 初始化默认交易所失败: {e}")
+
+        logger.info(f"成功初始化 {len(instances)} 个交易所")
+        return instances
+
+    def _semaphore(self, name: str, inst: Any) -> asyncio.Semaphore:
+        """每个交易所一个信号量，并发度由 rateLimit 推算（节流由请求调度器负责）"""
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(exchange_concurrency(inst))
+            self._semaphores[name] = semaphore
+        return semaphore
+
+    async def _request(self, name: str, inst: Any, method: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """经请求调度器（令牌桶、优先通道、限速退避与重试）发出交易所请求，每次尝试都计入健康监控"""
+        fn = self.health.track_async(name, fn)
+        if self.scheduler is None:
+            return await fn()
+        return await self.scheduler.run_async(name, inst, method, fn)
+
+    async def _symbols_for_exchange(self, name: str, ex_conf: Dict, inst: Any,
+                                    quote_currency: str, min_volume: float) -> List[Tuple[str, float]]:
+        try:
+            markets = await inst.load_markets()
+            candidates = self._select_candidates(name, ex_conf, markets, quote_currency)
+
+            tickers_key = self._tickers_key(name, ex_conf, quote_currency)
+            entries, missing = self._ticker_entries(tickers_key, candidates)
+            fetched: Dict[str, Dict] = {}
+            bulk = bool(missing) and getattr(inst, 'has', {}).get('fetchTickers')
+            if bulk:
+                try:
+                    fetched = await self._request(name, inst, 'fetch_tickers', lambda: inst.fetch_tickers(missing))
+                    logger.info(f"{name} 批量获取 {len(missing)} 个tickers成功")
+                except Exception as bulk_err:
+                    logger.warning(f"{name} 批量fetchTickers失败: {bulk_err}")
+                    bulk = False
+
+            if missing and not bulk:
+                async def fetch_one(sym: str):
+                    cached = self.cache.get(('ticker', name, sym))
+                    if cached is not None:
+                        return sym, cached
+                    async with self._semaphore(name, inst):
+                        try:
+                            ticker = await self._request(name, inst, 'fetch_ticker', lambda: inst.fetch_ticker(sym))
+                            if ticker:
+                                self.cache.set(('ticker', name, sym), ticker, CACHE_CONFIG.get('ticker_ttl', 30))
+                            return sym, ticker
+                        except Exception as e:
+                            logger.debug(f"{name} 获取 {sym} ticker 失败: {e}")
+                            return sym, None
+                fetched = {s: t for s, t in await asyncio.gather(*(fetch_one(s) for s in missing)) if t}
+
+            return self._listed_symbols(name, ex_conf, candidates, tickers_key, entries, missing, fetched, min_volume)
+
+        except Exception as e:
+            logger.error(f"获取 {name} 交易对列表失败: {e}")
+            return []
+
+    async def get_tradable_symbols(self, quote_currency: str = 'USDT', min_volume: float = 1000000) -> List[str]:
+        """并发聚合所有交易所的可交易对"""
+        logger.info(f"开始获取交易对，最小交易量: ${min_volume:,.0f}")
+        per_exchange = await asyncio.gather(*(
+            self._symbols_for_exchange(name, ex_conf, inst, quote_currency, min_volume)
+            for name, ex_conf, inst in self.exchanges
+        ))
+        return self._collect_symbols((name, ex_conf, valid)
+                                     for (name, ex_conf, _), valid in zip(self.exchanges, per_exchange))
+
+    async def _ping(self, name: str, inst: Any) -> None:
+        method, fn = self._ping_request(inst)
+        await self._request(name, inst, method, fn)
+
+    async def get_exchange_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有交易所的状态信息（来自健康监控，不发出请求）"""
+        return self.get_exchange_status_snapshot()
+
+    async def get_exchange_statistics(self) -> Dict[str, Any]:
+        """获取交易所统计信息"""
+        return self._summarize_exchange_status(await self.get_exchange_status())
+
+    def _get_exchange_for_symbol(self, symbol: str) -> Optional[Tuple[str, Any]]:
+        name = self.exchange_by_symbol.get(symbol)
+        if not name:
+            # 回退：第一个实例
+            return (self.exchanges[0][0], self.exchanges[0][2]) if self.exchanges else None
+        for n, _, inst in self.exchanges:
+            if n == name:
+                return n, inst
+        return None
+
+    async def get_ohlcv_data(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> pd.DataFrame:
+        """获取K线数据"""
+        bars = await self.get_ohlcv_bars(symbol, timeframe, limit)
+        if bars is None:
+            return pd.DataFrame()
+        return self._ohlcv_to_dataframe(symbol, bars)
+
+    async def get_ohlcv_bars(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Optional[np.ndarray]:
+        """获取K线为 (n, 6) 数组，失败时返回 None。并发的相同请求共享一次获取"""
+        return await self.ohlcv_flight.do((symbol, timeframe, limit),
+                                          lambda: self._load_ohlcv_bars(symbol, timeframe, limit))
+
+    async def _load_ohlcv_bars(self, symbol: str, timeframe: str, limit: int) -> Optional[np.ndarray]:
+        found = self._get_exchange_for_symbol(symbol)
+        if not found:
+            logger.error(f"无法找到 {symbol} 对应的交易所实例")
+            return None
+        name, inst = found
+
+        try:
+            async with self._semaphore(name, inst):
+                ohlcv = await self._request(name, inst, 'fetch_ohlcv',
+                                            lambda: inst.fetch_ohlcv(symbol, timeframe, limit=limit))
+            return np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        except Exception as e:
+            logger.error(f"获取 {symbol} 的OHLCV数据失败: {e}")
+            return None
+
+    async def fetch_ohlcv_many(self, symbols: List[str], timeframe: str = '1h',
+                               limit: int = 100) -> List[Optional[np.ndarray]]:
+        """并发获取多个交易对的K线，结果顺序与 symbols 一致"""
+        return list(await asyncio.gather(*(self.get_ohlcv_bars(s, timeframe, limit) for s in symbols)))
+
+    async def identify_trading_opportunities(self, symbol: str) -> Dict:
+        """识别交易机会"""
+        try:
+            df = await self.get_ohlcv_data(symbol, '1h', 100)
+            return self._analyze_dataframe(symbol, df)
+        except Exception as e:
+            logger.error(f"识别交易机会失败 {symbol}: {e}")
+            return {}
+
+    async def get_top_opportunities(self, top_n: int = 20, sort_by: str = 'volume_ratio',
+                                    batch: Optional[bool] = None) -> List[Dict]:
+        """获取前N个交易机会，所有交易对在同一事件循环中并发分析"""
+        symbols = self.symbols or await self.get_tradable_symbols()
+        if not symbols:
+            logger.warning("没有可用的交易对")
+            return []
+
+        logger.info(f"开始分析 {len(symbols)} 个交易对...")
+        results = await self.analyze_symbols(symbols, batch)
+        return self._rank_opportunities(symbols, results, top_n, sort_by)
+
+    async def get_opportunity_table(self, top_n: Optional[int] = None,
+                                    sort_by: str = 'volume_ratio') -> OpportunityTable:
+        """全量扫描结果的列式版本，排序规则与 get_top_opportunities 一致"""
+        symbols = self.symbols or await self.get_tradable_symbols()
+        if not symbols:
+            logger.warning("没有可用的交易对")
+            return OpportunityTable.empty()
+
+        logger.info(f"开始分析 {len(symbols)} 个交易对...")
+        if SCAN_CONFIG.get('batch_indicators', True):
+            table = self._table_from_bars(symbols, await self.fetch_ohlcv_many(symbols, '1h', 100))
+        else:
+            table = OpportunityTable.from_records(await self.analyze_symbols(symbols, False))
+        return self._rank_table(table, top_n, sort_by)
+
+    async def analyze_symbols(self, symbols: List[str], batch: Optional[bool] = None) -> List[Optional[Dict]]:
+        """分析交易对（不排序），结果顺序与 symbols 一致"""
+        if batch is None:
+            batch = SCAN_CONFIG.get('batch_indicators', True)
+        if batch:
+            bars_list = await self.fetch_ohlcv_many(symbols, '1h', 100)
+            return self._analyze_bars_batch(symbols, bars_list)
+        return list(await asyncio.gather(*(self.identify_trading_opportunities(s) for s in symbols)))
+
+    async def get_symbol_data_for_chart(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Dict:
+        key = self._chart_cache_key(symbol, timeframe, limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # 图表请求走交互式通道，优先于后台扫描
+        with interactive():
+            return await self.chart_flight.do(key, lambda: self._load_chart_data(key, symbol, timeframe, limit))
+
+    async def _load_chart_data(self, key: Tuple, symbol: str, timeframe: str, limit: int) -> Dict:
+        try:
+            df = await self.get_ohlcv_data(symbol, timeframe, limit)
+            chart_data = self._build_chart_data(symbol, df)
+        except Exception as e:
+            logger.error(f"获取{symbol}图表数据失败: {e}")
+            return {}
+        if chart_data:
+            self.cache.set(key, chart_data, CACHE_CONFIG.get('chart_ttl', 60))
+        return chart_data
+
+
+class SyncCryptoAnalyzer:
+    """
+    AsyncCryptoAnalyzer 的同步包装，接口与 CryptoAnalyzer 一致
+
+    每个方法只把对应的协程提交到后台事件循环并等待结果，没有自己的扫描逻辑；
+    功能范围即 AsyncCryptoAnalyzer 的范围（见模块说明中 async 后端不支持的功能）。
+    """
+
+    def __init__(self, exchange_name: str = 'binance', exchanges: Optional[List[Tuple[str, Dict, Any]]] = None,
+                 cache: Optional[TTLCache] = None):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='async-analyzer', daemon=True)
+        self._thread.start()
+        self._analyzer = AsyncCryptoAnalyzer(exchange_name, exchanges, cache)
+        self._run(self._analyzer.start())
+
+    def _run(self, coro: Awaitable) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @property
+    def exchanges(self) -> List[Tuple[str, Dict, Any]]:
+        return self._analyzer.exchanges
+
+    @property
+    def cache(self) -> TTLCache:
+        return self._analyzer.cache
+
+    @property
+    def symbols(self) -> List[str]:
+        return self._analyzer.symbols
+
+    @symbols.setter
+    def symbols(self, value: List[str]) -> None:
+        self._analyzer.symbols = value
+
+    @property
+    def exchange_by_symbol(self) -> Dict[str, str]:
+        return self._analyzer.exchange_by_symbol
+
+    @exchange_by_symbol.setter
+    def exchange_by_symbol(self, value: Dict[str, str]) -> None:
+        self._analyzer.exchange_by_symbol = value
+
+    @property
+    def universe(self) -> SymbolUniverse:
+        return self._analyzer.universe
+
+    def get_tradable_symbols(self, quote_currency: str = 'USDT', min_volume: float = 1000000) -> List[str]:
+        return self._run(self._analyzer.get_tradable_symbols(quote_currency, min_volume))
+
+    def get_exchange_status(self) -> Dict[str, Dict[str, Any]]:
+        # 状态只读取健康监控的汇总，无需经过事件循环
+        return self._analyzer.get_exchange_status_snapshot()
+
+    def get_exchange_statistics(self) -> Dict[str, Any]:
+        return self._analyzer._summarize_exchange_status(self._analyzer.get_exchange_status_snapshot())
+
+    def get_ohlcv_data(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> pd.DataFrame:
+        return self._run(self._analyzer.get_ohlcv_data(symbol, timeframe, limit))
+
+    def get_ohlcv_bars(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Optional[np.ndarray]:
+        return self._run(self._analyzer.get_ohlcv_bars(symbol, timeframe, limit))
+
+    def fetch_ohlcv_many(self, symbols: List[str], timeframe: str = '1h', limit: int = 100,
+                         concurrent: Optional[bool] = None) -> List[Optional[np.ndarray]]:
+        return self._run(self._analyzer.fetch_ohlcv_many(symbols, timeframe, limit))
+
+    def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self._analyzer.calculate_indicators(df)
+
+    def identify_trading_opportunities(self, symbol: str) -> Dict:
+        return self._run(self._analyzer.identify_trading_opportunities(symbol))
+
+    def get_top_opportunities(self, top_n: int = 20, sort_by: str = 'volume_ratio',
+                              batch: Optional[bool] = None) -> List[Dict]:
+        return self._run(self._analyzer.get_top_opportunities(top_n, sort_by, batch))
+
+    def get_opportunity_table(self, top_n: Optional[int] = None, sort_by: str = 'volume_ratio',
+                              concurrent: Optional[bool] = None) -> OpportunityTable:
+        return self._run(self._analyzer.get_opportunity_table(top_n, sort_by))
+
+    def analyze_symbols(self, symbols: List[str], concurrent: Optional[bool] = None,
+                        batch: Optional[bool] = None) -> List[Optional[Dict]]:
+        return self._run(self._analyzer.analyze_symbols(symbols, batch))
+
+    def get_streaming_opportunities(self, states: Iterable[Tuple[str, StreamingIndicators]], top_n: int = 20,
+                                    sort_by: str = 'volume_ratio',
+                                    fallback: Optional[List[Dict]] = None) -> List[Dict]:
+        return self._analyzer.get_streaming_opportunities(states, top_n, sort_by, fallback)
+
+    def merge_streamed_tickers(self, name: str, tickers: Dict[str, Dict]) -> None:
+        self._analyzer.merge_streamed_tickers(name, tickers)
+
+    def get_coalescing_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self._analyzer.get_coalescing_stats()
+
+    def get_symbol_data_for_chart(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Dict:
+        return self._run(self._analyzer.get_symbol_data_for_chart(symbol, timeframe, limit))
+
+    def close(self) -> None:
+        """关闭交易所会话并停止事件循环"""
+        self._run(self._analyzer.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
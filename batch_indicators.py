@@ -0,0 +1,178 @@
+"""
+批量指标计算
+
+把全部交易对的K线右对齐堆叠为 (交易对 × K线) 的二维数组，用累加和求滑动窗口，
+一次性计算 MA5/MA10/MA20、前30根均量、交易量倍数和波动率，避免逐个构造 DataFrame。
+长度不足的交易对在左侧以 NaN 补齐；窗口内含 NaN 时结果为 NaN，与 pandas rolling 一致。
+"""
+
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import INDICATOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+MA_WINDOWS = (5, 10, 20)
+VOLUME_AVG_WINDOW = 30
+PRICE_CHANGE_24H_BARS = 24
+
+
+def stack_bars(bars_list: Sequence[Optional[np.ndarray]],
+               length: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    将各交易对的 (n, 6) K线右对齐堆叠
+
+    Returns:
+        (closes, volumes, lengths)：closes/volumes 形状为 (交易对数, length)，lengths 为各交易对的有效K线数
+    """
+    arrays = [np.asarray(bars, dtype=np.float64).reshape(-1, 6) if bars is not None and len(bars) else None
+              for bars in bars_list]
+    if length is None:
+        length = max((len(a) for a in arrays if a is not None), default=0)
+
+    closes = np.full((len(arrays), length), np.nan)
+    volumes = np.full((len(arrays), length), np.nan)
+    lengths = np.zeros(len(arrays), dtype=np.int64)
+    for row, bars in enumerate(arrays):
+        if bars is None or length == 0:
+            continue
+        bars = bars[-length:]
+        n = len(bars)
+        closes[row, length - n:] = bars[:, 4]
+        volumes[row, length - n:] = bars[:, 5]
+        lengths[row] = n
+    return closes, volumes, lengths
+
+
+def rolling_sum(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    沿最后一维的滑动窗口和（累加和相减），NaN 按 0 计入
+
+    Returns:
+        (sums, counts)：counts 为窗口内非 NaN 的数量；不足一个窗口的位置 sums 为 NaN
+    """
+    finite = np.isfinite(values)
+    shape = values.shape[:-1] + (values.shape[-1] + 1,)
+    csum = np.zeros(shape)
+    ccount = np.zeros(shape)
+    np.cumsum(np.where(finite, values, 0.0), axis=-1, out=csum[..., 1:])
+    np.cumsum(finite, axis=-1, out=ccount[..., 1:])
+
+    sums = np.full(values.shape, np.nan)
+    counts = np.zeros(values.shape)
+    if values.shape[-1] >= window:
+        sums[..., window - 1:] = csum[..., window:] - csum[..., :-window]
+        counts[..., window - 1:] = ccount[..., window:] - ccount[..., :-window]
+    return sums, counts
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """滑动均值，窗口内有 NaN 时为 NaN（等价于 rolling(window).mean()）"""
+    sums, counts = rolling_sum(values, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts == window, sums / window, np.nan)
+
+
+def rolling_std(values: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """滑动标准差（等价于 rolling(window).std()）"""
+    # 先减去每行均值，降低平方和相减时的精度损失
+    with np.errstate(invalid='ignore'):
+        finite = np.isfinite(values)
+        counts = finite.sum(axis=-1, keepdims=True)
+        offset = np.where(counts > 0, np.where(finite, values, 0.0).sum(axis=-1, keepdims=True)
+                          / np.maximum(counts, 1), 0.0)
+    shifted = values - offset
+    sums, counts = rolling_sum(shifted, window)
+    squares, _ = rolling_sum(shifted * shifted, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (squares - sums * sums / window) / (window - ddof)
+        std = np.sqrt(np.maximum(variance, 0.0))
+    return np.where(counts == window, std, np.nan)
+
+
+def pct_change(values: np.ndarray) -> np.ndarray:
+    """沿最后一维的涨跌幅，首列为 NaN（等价于 pct_change()，不填充缺失值）"""
+    changes = np.full(values.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        changes[..., 1:] = values[..., 1:] / values[..., :-1] - 1.0
+    return changes
+
+
+def compute_indicators(closes: np.ndarray, volumes: np.ndarray,
+                       volatility_period: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    计算完整的指标序列，每个值的形状与 closes 相同
+
+    Returns:
+        MA5/MA10/MA20、avg_volume_30（不含当前K线的前30根均量）、volume_ratio、
+        price_change、price_volatility
+    """
+    period = int(volatility_period or INDICATOR_CONFIG.get('price_volatility_period', 10))
+    indicators = {f'MA{w}': rolling_mean(closes, w) for w in MA_WINDOWS}
+
+    # 前30根均量：与 Series.mean() 一致跳过 NaN
+    sums, counts = rolling_sum(volumes, VOLUME_AVG_WINDOW)
+    avg_volume = np.full(volumes.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_volume[..., 1:] = np.where(counts[..., :-1] > 0, sums[..., :-1] / counts[..., :-1], np.nan)
+        indicators['avg_volume_30'] = avg_volume
+        indicators['volume_ratio'] = volumes / avg_volume
+
+    indicators['price_change'] = pct_change(closes)
+    indicators['price_volatility'] = rolling_std(indicators['price_change'], period)
+    return indicators
+
+
+def latest_indicators(closes: np.ndarray, volumes: np.ndarray, lengths: np.ndarray,
+                      volatility_period: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    计算每个交易对最新一根K线的指标
+
+    Returns:
+        各指标的一维数组，以及 valid 掩码（与逐个 DataFrame 分析时的跳过条件一致）
+    """
+    period = int(volatility_period or INDICATOR_CONFIG.get('price_volatility_period', 10))
+    length = closes.shape[1]
+    if length == 0:
+        empty = np.zeros(len(closes))
+        return {'valid': np.zeros(len(closes), dtype=bool), 'close': empty, 'volume': empty,
+                'avg_volume_30': empty, 'volume_ratio': empty, 'ma5': empty, 'ma10': empty,
+                'ma20': empty, 'price_change_24h': empty, 'volatility': empty}
+
+    # 只需最后一列时截取尾部窗口，避免对整段历史求累加和
+    tail = max(max(MA_WINDOWS), VOLUME_AVG_WINDOW + 1, period + 1, PRICE_CHANGE_24H_BARS)
+    closes_tail = closes[:, -tail:]
+    volumes_tail = volumes[:, -tail:]
+    series = compute_indicators(closes_tail, volumes_tail, period)
+
+    close = closes_tail[:, -1]
+    volume = volumes_tail[:, -1]
+    avg_volume = series['avg_volume_30'][:, -1]
+
+    with np.errstate(invalid='ignore'):
+        valid = ((lengths > VOLUME_AVG_WINDOW)
+                 & (np.nansum(volumes, axis=1) != 0)
+                 & np.isfinite(close) & (close > 0)
+                 & np.isfinite(volume) & (volume > 0)
+                 & np.isfinite(avg_volume) & (avg_volume > 0))
+
+        price_24h_ago = closes_tail[:, -PRICE_CHANGE_24H_BARS] if closes_tail.shape[1] >= PRICE_CHANGE_24H_BARS \
+            else np.full(len(closes), np.nan)
+        has_24h = np.isfinite(price_24h_ago) & (price_24h_ago > 0)
+        price_change_24h = np.where(has_24h, (close - price_24h_ago) / np.where(has_24h, price_24h_ago, 1.0), 0.0)
+
+    result = {
+        'valid': valid,
+        'close': close,
+        'volume': volume,
+        'avg_volume_30': avg_volume,
+        'volume_ratio': series['volume_ratio'][:, -1],
+        'price_change_24h': price_change_24h,
+        'volatility': np.nan_to_num(series['price_volatility'][:, -1], nan=0.0),
+    }
+    for w in MA_WINDOWS:
+        result[f'ma{w}'] = np.nan_to_num(series[f'MA{w}'][:, -1], nan=0.0)
+    return result
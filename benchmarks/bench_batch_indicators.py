@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量指标计算基准测试
+
+对同一批随机K线分别使用逐个 DataFrame 的分析路径（_ohlcv_to_dataframe + _analyze_dataframe）
+和批量向量化路径（_analyze_bars_batch）计算结果，比较耗时并校验结果一致。
+不涉及网络请求，只衡量指标计算本身。
+
+用法:
+    python benchmarks/bench_batch_indicators.py --sizes 100,1000,10000
+"""
+
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+
+
+def make_bars(count: int, length: int, seed: int = 0):
+    """生成 count 个交易对的随机K线，部分交易对长度不足或含放量K线"""
+    rng = np.random.default_rng(seed)
+    bars_list = []
+    start = 1_700_000_000_000
+    for i in range(count):
+        n = length if i % 17 else int(rng.integers(10, length))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+        volume = rng.lognormal(10, 0.5, n)
+        if i % 7 == 0:
+            volume[-1] *= rng.uniform(3, 8)
+        bars = np.empty((n, 6))
+        bars[:, 0] = start + np.arange(n) * 3_600_000
+        bars[:, 1] = close
+        bars[:, 2] = close * 1.01
+        bars[:, 3] = close * 0.99
+        bars[:, 4] = close
+        bars[:, 5] = volume
+        bars_list.append(bars)
+    return bars_list
+
+
+def same_results(left, right) -> bool:
+    if len(left) != len(right):
+        return False
+    for a, b in zip(left, right):
+        if a.keys() != b.keys():
+            return False
+        for key, value in a.items():
+            other = b[key]
+            if isinstance(value, float):
+                if not math.isclose(value, other, rel_tol=1e-9, abs_tol=1e-12):
+                    return False
+            elif value != other:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量指标计算基准测试")
+    parser.add_argument('--sizes', default='100,1000,10000', help='交易对数量，逗号分隔')
+    parser.add_argument('--length', type=int, default=100, help='每个交易对的K线数量')
+    parser.add_argument('--repeat', type=int, default=3, help='批量路径重复次数（取最快）')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    analyzer = CryptoAnalyzer(exchanges=make_fake_exchanges(1, 1, latency=0))
+    analyzer.candle_archive = None
+
+    print(f"{'交易对':>8} {'DataFrame(s)':>13} {'批量(s)':>10} {'加速':>8} {'一致':>4}")
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        symbols = [f"S{i}/USDT" for i in range(size)]
+        bars_list = make_bars(size, args.length)
+        analyzer.exchange_by_symbol = {symbol: 'fake0' for symbol in symbols}
+
+        start = time.perf_counter()
+        per_frame = [analyzer._analyze_dataframe(symbol, analyzer._ohlcv_to_dataframe(symbol, bars))
+                     for symbol, bars in zip(symbols, bars_list)]
+        frame_time = time.perf_counter() - start
+
+        batch_time = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            batch = analyzer._analyze_bars_batch(symbols, bars_list)
+            batch_time = min(batch_time, time.perf_counter() - start)
+
+        match = same_results(per_frame, batch)
+        print(f"{size:>8} {frame_time:>13.3f} {batch_time:>10.4f} {frame_time / batch_time:>7.1f}x "
+              f"{'是' if match else '否':>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量K线提供者基准测试
+
+对同一组模拟交易所（每次请求有固定延迟）分别只启用一种获取策略，首次全量获取全部交易对的K线，
+比较请求数、耗时和平均请求耗时，并校验取回的K线与逐个顺序获取完全一致。
+“自动选择”把一半交易所设为支持多交易对K线接口，其余按并发策略获取。
+
+用法:
+    python benchmarks/bench_candle_providers.py --symbols 400 --latency 0.02
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import TTLCache
+from config import REQUEST_SCHEDULER_CONFIG, SCAN_CONFIG
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+
+NOW_MS = 1_700_000_000_000
+
+
+def run(symbols: int, exchanges: int, latency: float, providers, combined_exchanges: int):
+    SCAN_CONFIG['candle_providers'] = providers
+    fakes = make_fake_exchanges(exchanges, max(1, symbols // exchanges), latency=latency, now_ms=NOW_MS)
+    for i, (_, _, inst) in enumerate(fakes):
+        inst.rateLimit = 0
+        inst.has['fetchOHLCVs'] = i < combined_exchanges
+    analyzer = CryptoAnalyzer(exchanges=fakes, cache=TTLCache())
+    analyzer.candle_archive = None
+    analyzer.get_tradable_symbols(min_volume=0)
+    start = time.perf_counter()
+    bars = analyzer.fetch_ohlcv_many(analyzer.symbols, '1h', 100)
+    elapsed = time.perf_counter() - start
+    return bars, elapsed, analyzer.get_candle_provider_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量K线提供者基准测试")
+    parser.add_argument('--symbols', type=int, default=400, help='交易对总数')
+    parser.add_argument('--exchanges', type=int, default=4, help='模拟交易所数量')
+    parser.add_argument('--latency', type=float, default=0.02, help='单次请求延迟（秒）')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    REQUEST_SCHEDULER_CONFIG['enabled'] = False
+    scenarios = [
+        ('逐个顺序', ['serial'], 0),
+        ('并发', ['concurrent', 'serial'], 0),
+        ('多交易对接口', ['combined', 'serial'], args.exchanges),
+        ('自动选择', ['combined', 'concurrent', 'serial'], args.exchanges // 2),
+    ]
+
+    baseline = None
+    print(f"交易对: {args.symbols} | 模拟交易所: {args.exchanges} | 单次请求延迟: {args.latency * 1000:.0f}ms")
+    print(f"{'策略':<10} {'耗时(s)':>8} {'请求数':>6} {'平均请求(ms)':>12} {'结果一致':>8}  各提供者")
+    for label, providers, combined in scenarios:
+        bars, elapsed, stats = run(args.symbols, args.exchanges, args.latency, providers, combined)
+        if baseline is None:
+            baseline = bars
+        same = all(a is not None and b is not None and np.array_equal(a, b) for a, b in zip(bars, baseline))
+        requests = sum(s['requests'] for per in stats.values() for s in per.values())
+        request_ms = [s['avg_request_ms'] for per in stats.values() for s in per.values() if s['avg_request_ms']]
+        avg_ms = sum(request_ms) / len(request_ms) if request_ms else 0.0
+        detail = ', '.join(f"{name}: {sum(s['requests'] for s in per.values())} 次请求" for name, per in stats.items())
+        print(f"{label:<10} {elapsed:>8.2f} {requests:>6} {avg_ms:>12.1f} {'是' if same else '否':>8}  {detail}")
+
+
+if __name__ == '__main__':
+    main()
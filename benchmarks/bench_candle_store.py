@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量K线存储基准测试
+
+模拟 app.py 的后台更新循环：每个周期推进 update_interval 秒后重新扫描全部交易对，
+统计关闭K线存储、启用K线存储、启用 closed_only 时每个周期的请求数与下载的K线数量：
+  - 默认存储每个交易对每周期仍请求一次，只减少下载量，扫描结果必须与不使用存储时一致
+  - closed_only 只在周期边界请求，已收盘K线必须与 REST 全量数据一致（形成中的K线没有推送时会滞后）
+
+用法:
+    python benchmarks/bench_candle_store.py --symbols 200 --cycles 10
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import DATA_CONFIG, SCAN_CONFIG
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+
+
+def run(symbols: int, cycles: int, interval: float, use_store: bool, closed_only: bool = False):
+    exchanges = make_fake_exchanges(4, max(1, symbols // 4), latency=0, now_ms=1_700_000_000_000)
+    analyzer = CryptoAnalyzer(exchanges=exchanges)
+    # 只比较内存K线存储，不读写磁盘归档
+    analyzer.candle_archive = None
+    if not use_store:
+        analyzer.candle_store = None
+    else:
+        # 模拟时间不经过真实时钟，关闭按墙钟判断的复用
+        analyzer.candle_store.fresh_seconds = 0
+        analyzer.candle_store.closed_only = closed_only
+    analyzer.get_tradable_symbols(min_volume=0)
+
+    per_cycle = []
+    results = []
+    closed_mismatches = 0
+    for _ in range(cycles):
+        before = [(inst.ohlcv_requests, inst.candles_returned) for _, _, inst in exchanges]
+        results.append(analyzer.get_top_opportunities(10 ** 6))
+        after = [(inst.ohlcv_requests, inst.candles_returned) for _, _, inst in exchanges]
+        per_cycle.append((
+            sum(a[0] - b[0] for a, b in zip(after, before)),
+            sum(a[1] - b[1] for a, b in zip(after, before)),
+        ))
+        if closed_only:
+            closed_mismatches += count_closed_mismatches(analyzer)
+        for _, _, inst in exchanges:
+            inst.advance(interval)
+    return per_cycle, results, closed_mismatches
+
+
+def count_closed_mismatches(analyzer: CryptoAnalyzer) -> int:
+    """已存的已收盘K线（除最后一根外）与 REST 全量数据不一致的交易对数量"""
+    mismatches = 0
+    instances = {name: inst for name, _, inst in analyzer.exchanges}
+    for symbol, name in analyzer.exchange_by_symbol.items():
+        stored = analyzer.candle_store.tail((name, symbol, '1h'), 100)
+        fresh = np.asarray(instances[name].fetch_ohlcv(symbol, '1h', limit=100), dtype=np.float64)
+        if stored is None or not np.array_equal(stored[:-1], fresh[:-1]):
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量K线存储基准测试")
+    parser.add_argument('--symbols', type=int, default=200, help='交易对数量')
+    parser.add_argument('--cycles', type=int, default=10, help='更新周期数')
+    parser.add_argument('--interval', type=float, default=DATA_CONFIG.get('update_interval', 180), help='周期间隔（秒）')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # 只比较K线存储本身：关闭 ticker 预筛选，两次运行扫描相同的交易对
+    SCAN_CONFIG['ticker_prefilter'] = False
+
+    plain, plain_results, _ = run(args.symbols, args.cycles, args.interval, use_store=False)
+    stored, stored_results, _ = run(args.symbols, args.cycles, args.interval, use_store=True)
+    closed, _, closed_mismatches = run(args.symbols, args.cycles, args.interval, use_store=True, closed_only=True)
+
+    print(f"交易对: {args.symbols} | 周期: {args.cycles} x {args.interval:.0f}s")
+    print(f"{'周期':>4} {'请求(无存储)':>12} {'K线(无存储)':>12} {'请求(存储)':>10} {'K线(存储)':>10} "
+          f"{'请求(closed_only)':>17} {'K线(closed_only)':>16}")
+    for i, ((pr, pc), (sr, sc), (cr, cc)) in enumerate(zip(plain, stored, closed), 1):
+        print(f"{i:>4} {pr:>12} {pc:>12} {sr:>10} {sc:>10} {cr:>17} {cc:>16}")
+
+    def ratio(base, value):
+        return f"{base / value:.1f} 倍" if value else "全部"
+
+    steady = slice(1, None)
+    for label, runs in (('存储', stored), ('closed_only', closed)):
+        requests = sum(r for r, _ in runs[steady])
+        candles = sum(c for _, c in runs[steady])
+        print(f"首个周期之后（{label}）: 请求数减少 {ratio(sum(r for r, _ in plain[steady]), requests)}，"
+              f"K线下载量减少 {ratio(sum(c for _, c in plain[steady]), candles)}")
+    print(f"扫描结果一致（存储）: {'是' if plain_results == stored_results else '否'}")
+    print(f"已收盘K线一致（closed_only）: {'是' if closed_mismatches == 0 else f'否（{closed_mismatches}）'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发扫描基准测试
+
+使用本地模拟交易所（注入固定网络延迟），对比串行扫描与并发扫描
+在不同交易对数量下的耗时，并校验两种方式的结果完全一致。
+
+用法:
+    python benchmarks/bench_concurrent_scan.py
+    python benchmarks/bench_concurrent_scan.py --sizes 50 100 200 400 --latency 0.1
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import TTLCache
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+
+
+def run_scan(analyzer: CryptoAnalyzer, concurrent: bool):
+    start = time.perf_counter()
+    result = analyzer.get_top_opportunities(top_n=10 ** 6, concurrent=concurrent)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发扫描基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[40, 80, 160, 320, 640], help='交易对总数')
+    parser.add_argument('--exchanges', type=int, default=4, help='模拟交易所数量')
+    parser.add_argument('--latency', type=float, default=0.2, help='单次请求延迟（秒）')
+    parser.add_argument('--skip-serial-above', type=int, default=160, help='超过该规模时跳过串行扫描')
+    args = parser.parse_args()
+    uneven = [size for size in args.sizes if size % args.exchanges]
+    if uneven:
+        parser.error(f"--sizes 需为交易所数量 {args.exchanges} 的整数倍: {uneven}")
+
+    logging.disable(logging.INFO)
+
+    print(f"模拟交易所: {args.exchanges} 个 | 单次请求延迟: {args.latency * 1000:.0f}ms")
+    print(f"{'交易对数':>8} {'串行(s)':>10} {'并发(s)':>10} {'加速比':>8} {'结果一致':>8}")
+
+    for size in args.sizes:
+        per_exchange = max(1, size // args.exchanges)
+
+        def build() -> CryptoAnalyzer:
+            # 每种模式使用独立的分析器和缓存，避免K线存储或上一个规模的 ticker 缓存影响结果
+            exchanges = make_fake_exchanges(args.exchanges, per_exchange, latency=args.latency,
+                                            now_ms=1_700_000_000_000)
+            analyzer = CryptoAnalyzer(exchanges=exchanges, cache=TTLCache())
+            analyzer.candle_archive = None
+            symbols = analyzer.get_tradable_symbols(min_volume=0)
+            assert len(symbols) == size, f"交易对数量 {len(symbols)} 与 --sizes 的 {size} 不一致"
+            return analyzer
+
+        concurrent_result, concurrent_time = run_scan(build(), True)
+        count = size
+        if size <= args.skip_serial_above:
+            serial_result, serial_time = run_scan(build(), False)
+            identical = serial_result == concurrent_result
+            print(f"{count:>8} {serial_time:>10.2f} {concurrent_time:>10.2f} "
+                  f"{serial_time / concurrent_time:>7.1f}x {'是' if identical else '否':>8}")
+        else:
+            print(f"{count:>8} {'-':>10} {concurrent_time:>10.2f} {'-':>8} {'-':>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式交易机会结果基准测试
+
+对同一批随机K线分别使用逐行字典路径（_analyze_bars_batch + _rank_opportunities）和列式路径
+（_table_from_bars + _rank_table）生成排好序的前N个结果，比较耗时并校验两者逐行一致；
+另外比较全量结果导出为 JSON 与直接写入 .npy 的耗时。不涉及网络请求。
+
+用法:
+    python benchmarks/bench_opportunity_table.py --sizes 1000,10000,50000 --top 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batch_indicators import make_bars, same_results
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+
+
+def best_of(repeat: int, fn):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列式交易机会结果基准测试")
+    parser.add_argument('--sizes', default='1000,10000,50000', help='交易对数量，逗号分隔')
+    parser.add_argument('--top', type=int, default=20, help='返回前N个')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最快）')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    analyzer = CryptoAnalyzer(exchanges=make_fake_exchanges(1, 1, latency=0))
+    analyzer.candle_archive = None
+
+    print(f"{'交易对':>8} {'排序':>16} {'字典(s)':>9} {'列式(s)':>9} {'加速':>7} {'一致':>4} "
+          f"{'导出JSON(s)':>11} {'导出npy(s)':>10}")
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        symbols = [f"SYM{i:06d}/USDT" for i in range(size)]
+        analyzer.exchange_by_symbol = {symbol: 'fake0' for symbol in symbols}
+        bars_list = make_bars(size, 100)
+
+        for sort_by in ('volume_ratio', 'price_change_24h'):
+            dict_time, ranked = best_of(args.repeat, lambda: analyzer._rank_opportunities(
+                symbols, analyzer._analyze_bars_batch(symbols, bars_list), args.top, sort_by))
+            table_time, table = best_of(args.repeat, lambda: analyzer._rank_table(
+                analyzer._table_from_bars(symbols, bars_list), args.top, sort_by))
+            same = same_results(ranked, table.to_records())
+            print(f"{size:>8} {sort_by:>16} {dict_time:>9.3f} {table_time:>9.3f} {dict_time / table_time:>6.1f}x "
+                  f"{'是' if same else '否':>4}", end='')
+            if sort_by != 'volume_ratio':
+                print()
+                continue
+
+            records = analyzer._rank_opportunities(symbols, analyzer._analyze_bars_batch(symbols, bars_list),
+                                                   size, sort_by)
+            full = analyzer._rank_table(analyzer._table_from_bars(symbols, bars_list), None, sort_by)
+            with tempfile.TemporaryDirectory() as tmp:
+                json_time, _ = best_of(args.repeat, lambda: json.dump(
+                    records, open(os.path.join(tmp, 'results.json'), 'w', encoding='utf-8')))
+                npy_time, _ = best_of(args.repeat, lambda: full.save(os.path.join(tmp, 'results.npy')))
+            print(f" {json_time:>11.3f} {npy_time:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
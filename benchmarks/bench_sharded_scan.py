@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程分片扫描基准测试
+
+使用本地模拟交易所（默认无网络延迟，扫描耗时主要是指标计算），对比单进程扫描与
+1/2/4/... 个工作进程分片扫描的耗时，并校验结果与单进程扫描完全一致。
+每种配置先预热一次（启动进程、初始化交易所、填充K线存储），再计时多次取中位数。
+
+用法:
+    python benchmarks/bench_sharded_scan.py
+    python benchmarks/bench_sharded_scan.py --symbols 4000 --processes 1 2 4 8 --no-batch
+"""
+
+import argparse
+import functools
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import SCAN_CONFIG
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+from sharded_scan import ShardedScanner
+
+NOW_MS = 1_700_000_000_000
+
+
+def build_analyzer(exchanges: int, per_exchange: int, latency: float) -> CryptoAnalyzer:
+    """主进程和工作进程使用的模拟分析器（交易对和K线确定性生成，各进程一致）"""
+    logging.disable(logging.INFO)
+    # 重复扫描时 ticker 预筛选会跳过大部分交易对，关闭后计时反映完整扫描（工作进程中同样生效）
+    SCAN_CONFIG['ticker_prefilter'] = False
+    analyzer = CryptoAnalyzer(exchanges=make_fake_exchanges(exchanges, per_exchange, latency=latency,
+                                                            now_ms=NOW_MS))
+    analyzer.candle_archive = None
+    # 不模拟交易所限速：计时只反映请求延迟和指标计算，便于观察多核扩展
+    for _, _, inst in analyzer.exchanges:
+        inst.rateLimit = 0
+    return analyzer
+
+
+def timed_scan(analyzer: CryptoAnalyzer, batch: bool, repeat: int):
+    analyzer.get_top_opportunities(top_n=10 ** 6, batch=batch)  # 预热
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = analyzer.get_top_opportunities(top_n=10 ** 6, batch=batch)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程分片扫描基准测试")
+    parser.add_argument('--symbols', type=int, default=2000, help='交易对总数')
+    parser.add_argument('--exchanges', type=int, default=4, help='模拟交易所数量')
+    parser.add_argument('--processes', type=int, nargs='+', default=[2, 4], help='工作进程数（大于 1）')
+    parser.add_argument('--latency', type=float, default=0.0, help='单次请求延迟（秒）')
+    parser.add_argument('--shard-by', default='auto', choices=['auto', 'exchange', 'hash'], help='分片方式')
+    parser.add_argument('--no-batch', action='store_true', help='逐个交易对计算指标（CPU 开销更大）')
+    parser.add_argument('--repeat', type=int, default=3, help='计时次数')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    per_exchange = max(1, args.symbols // args.exchanges)
+    batch = not args.no_batch
+    factory = functools.partial(build_analyzer, args.exchanges, per_exchange, args.latency)
+
+    analyzer = factory()
+    analyzer.get_tradable_symbols(min_volume=0)
+    SCAN_CONFIG['processes'] = 1
+    baseline, baseline_time = timed_scan(analyzer, batch, args.repeat)
+
+    print(f"交易对: {len(analyzer.symbols)} | 模拟交易所: {args.exchanges} | CPU 核心: {os.cpu_count()} | "
+          f"指标计算: {'批量' if batch else '逐个'} | 分片方式: {args.shard_by}")
+    print(f"{'进程数':>6} {'耗时(s)':>10} {'加速比':>8} {'并行效率':>8} {'结果一致':>8}")
+    print(f"{'单进程':>6} {baseline_time:>10.2f} {1.0:>7.2f}x {'-':>8} {'-':>8}")
+
+    for processes in args.processes:
+        SCAN_CONFIG['processes'] = processes
+        analyzer._sharded = ShardedScanner(processes, args.shard_by, factory)
+        try:
+            result, elapsed = timed_scan(analyzer, batch, args.repeat)
+        finally:
+            analyzer._sharded.close()
+            analyzer._sharded = None
+        speedup = baseline_time / elapsed
+        print(f"{processes:>6} {elapsed:>10.2f} {speedup:>7.2f}x {speedup / processes:>8.0%} "
+              f"{'是' if result == baseline else '否':>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表请求合并基准测试
+
+模拟多个浏览器会话（Dash threaded 服务器的多个线程）在同一时刻请求同一交易对的图表，
+统计实际发往交易所的K线请求数、合并节省的请求数与每个会话的等待时间。
+每轮开始前清空缓存，只衡量在途请求的合并效果。
+
+用法:
+    python benchmarks/bench_single_flight.py --sessions 10 --rounds 20
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import TTLCache
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import FakeExchange
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图表请求合并基准测试")
+    parser.add_argument('--sessions', type=int, default=10, help='同时请求的会话数')
+    parser.add_argument('--rounds', type=int, default=20, help='请求轮数')
+    parser.add_argument('--latency', type=float, default=0.1, help='交易所请求耗时（秒）')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    inst = FakeExchange('fake0', num_symbols=5, latency=args.latency)
+    conf = {'name': 'fake0', 'enabled': True, 'quote_currency': 'USDT', 'min_volume_usd': 0, 'priority': 1}
+    analyzer = CryptoAnalyzer(exchanges=[('fake0', conf, inst)], cache=TTLCache(name='bench'))
+    analyzer.candle_archive = None
+    analyzer.candle_store = None
+    symbol = analyzer.get_tradable_symbols(min_volume=0)[0]
+
+    waits = []
+    wait_lock = threading.Lock()
+    failures = 0
+    for _ in range(args.rounds):
+        analyzer.cache.clear()
+        barrier = threading.Barrier(args.sessions)
+
+        def session():
+            nonlocal failures
+            barrier.wait()
+            start = time.perf_counter()
+            data = analyzer.get_symbol_data_for_chart(symbol, '1h', 100)
+            with wait_lock:
+                waits.append(time.perf_counter() - start)
+                failures += 0 if data else 1
+
+        threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    requests = args.sessions * args.rounds
+    stats = analyzer.get_coalescing_stats()
+    waits_ms = np.array(waits) * 1000
+    print(f"会话: {args.sessions} | 轮数: {args.rounds} | 图表请求: {requests} | 失败: {failures}")
+    print(f"交易所K线请求: {inst.ohlcv_requests}（不合并时为 {requests}）")
+    for name, s in stats.items():
+        print(f"{name}: 调用 {s['calls']} | 实际执行 {s['executions']} | 合并节省 {s['coalesced']} "
+              f"({s['saved_ratio']:.1%})")
+    print(f"会话等待: p50 {np.percentile(waits_ms, 50):.1f}ms | p99 {np.percentile(waits_ms, 99):.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
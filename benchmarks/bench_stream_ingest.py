@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时推送接入基准测试
+
+启动本地回放服务器（ws_replay_server）按倍速回放币安格式的K线/ticker 推送，中途主动断开连接，
+验证 StreamIngestor 的订阅、重连退避与 REST 缺口补齐：
+回放结束后每个交易对的流式指标必须与同一时刻 REST 全量K线的分析结果一致。
+同时统计推送帧从计划发送时刻到指标更新、信号告警完成的延迟，对比 REST 轮询间隔。
+
+用法:
+    python benchmarks/bench_stream_ingest.py --symbols 50 --bars 12 --bar-seconds 1.5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batch_indicators import same_results
+from config import DATA_CONFIG
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import FakeExchange
+from signal_detector import SignalDetector
+from stream_ingest import BinanceStreamAdapter, StreamIngestor
+from ws_replay_server import ReplayServer, record_frames
+
+
+class ClockedFakeExchange(FakeExchange):
+    """模拟时间跟随回放服务器时钟的交易所，保证 REST 数据与推送帧一致"""
+
+    def __init__(self, *args, clock=None, **kwargs):
+        self._clock = clock
+        super().__init__(*args, **kwargs)
+
+    @property
+    def now_ms(self) -> int:
+        offset = int(self._clock() * 1000) if self._clock else 0
+        return self._start_ms + offset
+
+    @now_ms.setter
+    def now_ms(self, value: int) -> None:
+        self._start_ms = int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实时推送接入基准测试")
+    parser.add_argument('--symbols', type=int, default=50, help='交易对数量')
+    parser.add_argument('--bars', type=int, default=12, help='回放的K线数量')
+    parser.add_argument('--ticks', type=int, default=10, help='每根K线的推送次数')
+    parser.add_argument('--bar-seconds', type=float, default=1.5, help='每根1h K线的回放耗时（真实秒）')
+    parser.add_argument('--drop-bar', type=float, default=4.95, help='在第几根K线处断开连接（可跨越K线边界）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    timeframe = '1h'
+    tf_ms = 3_600_000
+    start_ms = 1_700_000_000_000 // tf_ms * tf_ms
+    speed = 3600 / args.bar_seconds
+
+    recorder = FakeExchange('fake0', num_symbols=args.symbols, latency=0, now_ms=start_ms)
+    frames = record_frames(recorder, recorder.symbols, timeframe, start_ms, args.bars, args.ticks)
+    server = ReplayServer(frames, speed=speed, drop_at=[args.drop_bar * 3600])
+    url = server.start()
+
+    inst = ClockedFakeExchange('fake0', num_symbols=args.symbols, latency=0.01, rate_limit=20,
+                               now_ms=start_ms, clock=server.elapsed)
+    conf = {'name': 'fake0', 'enabled': True, 'quote_currency': 'USDT', 'min_volume_usd': 0, 'priority': 1}
+    analyzer = CryptoAnalyzer(exchanges=[('fake0', conf, inst)])
+    analyzer.candle_archive = None
+    symbols = analyzer.get_tradable_symbols(min_volume=0)
+
+    ingestor = StreamIngestor(analyzer, timeframe, adapters={'fake0': BinanceStreamAdapter(url, timeframe)})
+    ingestor.reconnect_min_delay = 0.3
+    latencies = []
+    latency_lock = threading.Lock()
+
+    def on_event(event):
+        if event['type'] != 'kline' or event.get('event_time') is None:
+            return
+        sent = server.wall_time((event['event_time'] - start_ms) / 1000.0)
+        with latency_lock:
+            latencies.append(time.monotonic() - sent)
+
+    ingestor.add_listener(on_event)
+
+    detector = SignalDetector()
+    detections = []
+
+    def on_signal(alert):
+        if alert.get('event_time') is not None:
+            detections.append(time.monotonic() - server.wall_time((alert['event_time'] - start_ms) / 1000.0))
+
+    ingestor.add_listener(detector.on_stream_event)
+    detector.add_listener(on_signal)
+    ingestor.start(symbols)
+    time.sleep(server.duration - (time.monotonic() - server.started_at) + 1.0)
+
+    stats = ingestor.stats()
+    streamed = ingestor.get_top_opportunities(len(symbols))
+    expected_results = [analyzer._analyze_dataframe(s, analyzer._ohlcv_to_dataframe(
+        s, inst.fetch_ohlcv(s, timeframe, limit=100))) for s in symbols]
+    expected = analyzer._rank_opportunities(symbols, expected_results, len(symbols), 'volume_ratio')
+    for opp in streamed + expected:
+        opp.pop('composite_score', None)
+    ingestor.stop()
+    server.stop()
+
+    lat = np.array(latencies) * 1000
+    interval = DATA_CONFIG.get('update_interval', 180)
+    print(f"交易对: {len(symbols)} | K线: {args.bars} | 推送帧: {server.frames_sent} | 服务器连接: {server.connections}")
+    print(f"重连: {stats['reconnects']} | K线缺口: {stats['gaps']} | REST 补齐交易对次数: {stats['backfilled_symbols']}")
+    if len(lat):
+        print(f"推送到指标更新延迟: p50 {np.percentile(lat, 50):.1f}ms | p99 {np.percentile(lat, 99):.1f}ms "
+              f"| 最大 {lat.max():.1f}ms（REST 轮询间隔 {interval}s，平均发现延迟约 {interval / 2:.0f}s）")
+    detector_stats = detector.stats()
+    print(f"信号告警: {detector_stats['signals']}（同一K线重复告警被抑制 {detector_stats['duplicates']} 次）")
+    if detections:
+        print(f"推送到信号告警延迟: p50 {np.percentile(np.array(detections) * 1000, 50):.1f}ms")
+    print(f"流式结果与 REST 全量分析一致: {'是' if same_results(streamed, expected) else '否'}")
+
+
+if __name__ == '__main__':
+    main()
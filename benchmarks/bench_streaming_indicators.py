@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式指标基准测试
+
+1. 校验：流式状态经过开盘（push）与多次跳动（tick）后，结果与对完整K线逐个 DataFrame 分析一致；
+2. 单次更新耗时：流式 O(1) 更新 vs 每次重新构造 DataFrame 计算指标；
+3. 内存：大量交易对的流式状态总内存占用。
+
+用法:
+    python benchmarks/bench_streaming_indicators.py --symbols 200 --memory-symbols 50000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batch_indicators import make_bars, same_results
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+from streaming_indicators import StreamingIndicators
+
+
+def replay(bars: np.ndarray, warmup: int, ticks: int, rng) -> StreamingIndicators:
+    """用前 warmup 根初始化，其余K线逐根开盘并在收盘前跳动 ticks 次"""
+    state = StreamingIndicators.from_bars(bars[:warmup])
+    for ts, _, _, _, close, volume in bars[warmup:]:
+        for _ in range(ticks):
+            state.update(ts, close * rng.uniform(0.98, 1.02), volume * rng.uniform(0.2, 1.0))
+        state.update(ts, close, volume)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式指标基准测试")
+    parser.add_argument('--symbols', type=int, default=200, help='校验与计时使用的交易对数量')
+    parser.add_argument('--length', type=int, default=100, help='每个交易对的K线数量')
+    parser.add_argument('--ticks', type=int, default=5, help='每根K线收盘前的跳动次数')
+    parser.add_argument('--memory-symbols', type=int, default=50000, help='内存测试的交易对数量')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    analyzer = CryptoAnalyzer(exchanges=make_fake_exchanges(1, 1, latency=0))
+    analyzer.candle_archive = None
+    rng = np.random.default_rng(1)
+
+    symbols = [f"S{i}/USDT" for i in range(args.symbols)]
+    bars_list = make_bars(args.symbols, args.length)
+    analyzer.exchange_by_symbol = {symbol: 'fake0' for symbol in symbols}
+
+    expected = [analyzer._analyze_dataframe(symbol, analyzer._ohlcv_to_dataframe(symbol, bars))
+                for symbol, bars in zip(symbols, bars_list)]
+    states = [replay(bars, len(bars) // 2, args.ticks, rng) for bars in bars_list]
+    streamed = [analyzer._analyze_streaming(symbol, state) for symbol, state in zip(symbols, states)]
+    print(f"结果一致: {'是' if same_results(expected, streamed) else '否'}")
+
+    # 单次更新耗时
+    updates = 0
+    start = time.perf_counter()
+    for state, bars in zip(states, bars_list):
+        ts, close, volume = bars[-1, 0], bars[-1, 4], bars[-1, 5]
+        for i in range(50):
+            state.update(ts + 3_600_000 * (i % 2), close, volume)
+            updates += 1
+    stream_cost = (time.perf_counter() - start) / updates
+
+    start = time.perf_counter()
+    for symbol, bars in zip(symbols, bars_list):
+        analyzer.calculate_indicators(analyzer._ohlcv_to_dataframe(symbol, bars))
+    frame_cost = (time.perf_counter() - start) / len(symbols)
+    print(f"单次更新: 流式 {stream_cost * 1e6:.2f}µs | DataFrame 重算 {frame_cost * 1e6:.0f}µs "
+          f"({frame_cost / stream_cost:.0f}x)")
+
+    # 内存占用
+    sample = make_bars(1, args.length)[0].tolist()
+    book = {f"S{i}/USDT": StreamingIndicators.from_bars(sample) for i in range(args.memory_symbols)}
+    # 每个状态只持有对象本身和一个 array('d')
+    used = sum(sys.getsizeof(state) + sys.getsizeof(state._buf) for state in book.values())
+    print(f"{len(book)} 个交易对状态占用 {used / 1024 / 1024:.1f} MiB（约 {used / len(book):.0f} 字节/交易对）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ticker 预筛选基准测试
+
+模拟后台更新循环：每个周期推进 update_interval 秒后扫描全部交易对，对比启用/关闭
+SCAN_CONFIG['ticker_prefilter'] 时每个周期的K线请求数与下载的K线数量（两者都启用K线存储），并校验：
+  - 每个周期两者排行中的交易对完全相同（所有排序字段都对同一组行排序，被跳过的交易对不会消失），
+    列式结果 get_opportunity_table 也一样
+  - 每一行都与不筛选时本周期的结果相同；被跳过的交易对（带 stale_since）除按 ticker 更新的价格、
+    24小时涨跌和综合评分外，与不筛选时它最近一次被重新计算的周期相同，价格与本周期一致
+  - 没有漏掉任何交易量比率达到阈值的交易对
+任一校验失败时以非零状态退出。
+
+用法:
+    python benchmarks/bench_ticker_prefilter.py --symbols 1000 --cycles 20
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import TTLCache
+from config import DATA_CONFIG, INDICATOR_CONFIG, SCAN_CONFIG
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import make_fake_exchanges
+
+
+REFRESHED_FIELDS = ('current_price', 'price_change_24h', 'composite_score', 'stale_since')
+
+
+def run(symbols: int, cycles: int, interval: float, prefilter: bool):
+    SCAN_CONFIG['ticker_prefilter'] = prefilter
+    exchanges = make_fake_exchanges(4, max(1, symbols // 4), latency=0, now_ms=1_700_000_000_000)
+    analyzer = CryptoAnalyzer(exchanges=exchanges, cache=TTLCache())
+    analyzer.candle_archive = None
+    # 模拟时间不经过真实时钟，关闭按墙钟判断的复用
+    analyzer.candle_store.fresh_seconds = 0
+    analyzer.get_tradable_symbols(min_volume=0)
+
+    per_cycle = []
+    results = []
+    for _ in range(cycles):
+        # ticker 缓存按墙钟过期，模拟时间推进后需要重新获取
+        analyzer.cache.clear()
+        before = [(inst.ohlcv_requests, inst.candles_returned, inst.request_count) for _, _, inst in exchanges]
+        results.append(analyzer.get_top_opportunities(10 ** 6))
+        after = [(inst.ohlcv_requests, inst.candles_returned, inst.request_count) for _, _, inst in exchanges]
+        per_cycle.append(tuple(sum(a[i] - b[i] for a, b in zip(after, before)) for i in range(3)))
+        for _, _, inst in exchanges:
+            inst.advance(interval)
+    table_symbols = {opp['symbol'] for opp in analyzer.get_opportunity_table()}
+    return per_cycle, results, analyzer.prefilter_stats, table_symbols
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ticker 预筛选基准测试")
+    parser.add_argument('--symbols', type=int, default=1000, help='交易对数量')
+    parser.add_argument('--cycles', type=int, default=20, help='更新周期数')
+    parser.add_argument('--interval', type=float, default=DATA_CONFIG.get('update_interval', 180), help='周期间隔（秒）')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    threshold = INDICATOR_CONFIG.get('volume_ratio_threshold', 3.0)
+
+    plain, plain_results, _, plain_table = run(args.symbols, args.cycles, args.interval, prefilter=False)
+    filtered, filtered_results, stats, filtered_table = run(args.symbols, args.cycles, args.interval, prefilter=True)
+
+    print(f"交易对: {args.symbols} | 周期: {args.cycles} x {args.interval:.0f}s | 阈值: {threshold}x")
+    print(f"{'周期':>4} {'K线请求(不筛选)':>14} {'K线(不筛选)':>11} {'K线请求(预筛选)':>14} {'K线(预筛选)':>11} "
+          f"{'总请求(预筛选)':>13}")
+    for i, ((pr, pc, _), (fr, fc, ft)) in enumerate(zip(plain, filtered), 1):
+        print(f"{i:>4} {pr:>14} {pc:>11} {fr:>14} {fc:>11} {ft:>13}")
+
+    steady_plain = [sum(c[i] for c in plain[1:]) for i in range(3)]
+    steady_filtered = [sum(c[i] for c in filtered[1:]) for i in range(3)]
+    if steady_plain[0]:
+        print(f"首个周期之后: K线请求减少 {1 - steady_filtered[0] / steady_plain[0]:.1%}，"
+              f"下载K线减少 {1 - steady_filtered[1] / max(steady_plain[1], 1):.1%}，"
+              f"总请求（含批量 ticker）减少 {1 - steady_filtered[2] / max(steady_plain[2], 1):.1%}")
+    print(f"预筛选累计检查 {stats['checked']} 个交易对，跳过 {stats['skipped']} 个")
+
+    def indicators(row):
+        # 沿用的行按 ticker 更新价格、24小时涨跌（综合评分随之重算），其余字段应与当时算出的结果相同
+        return {k: v for k, v in row.items() if k not in REFRESHED_FIELDS}
+
+    missed = 0
+    vanished = 0
+    mismatched = 0
+    reused = 0
+    stale_prices = 0
+    history = [{opp['symbol']: opp for opp in cycle} for cycle in plain_results]
+    for cycle, filtered_cycle in enumerate(filtered_results):
+        rows = {opp['symbol']: opp for opp in filtered_cycle}
+        vanished += len(history[cycle].keys() ^ rows.keys())
+        for symbol, row in rows.items():
+            plain_row = history[cycle].get(symbol)
+            if 'stale_since' not in row:
+                mismatched += row != plain_row
+                continue
+            if any(history[earlier].get(symbol) and indicators(history[earlier][symbol]) == indicators(row)
+                   for earlier in range(cycle - 1, -1, -1)):
+                reused += 1
+                missed += plain_row is not None and plain_row['volume_ratio'] >= threshold
+                stale_prices += plain_row is not None and row['current_price'] != plain_row['current_price']
+            else:
+                mismatched += 1
+    vanished += len(plain_table ^ filtered_table)
+    print(f"沿用上次结果的行: {reused}（价格未按 ticker 更新: {stale_prices}） | 消失或多出的行: {vanished} | "
+          f"结果不一致: {mismatched} | 漏掉的信号: {missed}")
+    if vanished or mismatched or missed or stale_prices:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
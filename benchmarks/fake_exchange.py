@@ -0,0 +1,230 @@
+"""
+本地模拟交易所
+
+实现 CryptoAnalyzer 用到的 ccxt 同步接口子集（load_markets / fetch_tickers /
+fetch_ticker / fetch_ohlcv），数据由交易对和K线序号确定性生成，
+每次请求按 latency 休眠以模拟网络往返，可用于基准测试和离线调试。
+"""
+
+import asyncio
+import math
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TIMEFRAME_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def _hash01(index: np.ndarray, phase: float) -> np.ndarray:
+    """确定性伪随机数，取值 [0, 1)"""
+    x = np.sin(index * 12.9898 + phase) * 43758.5453
+    return x - np.floor(x)
+
+
+class FakeExchange:
+    """模拟 ccxt 同步交易所"""
+
+    def __init__(self, name: str = 'fake', num_symbols: int = 100, quote: str = 'USDT',
+                 latency: float = 0.05, rate_limit: float = 50, market_type: str = 'spot',
+                 symbols: Optional[List[str]] = None, now_ms: Optional[int] = None,
+                 spike_probability: float = 0.03, combined_ohlcv: bool = False):
+        """
+        Args:
+            name: 交易所名称
+            num_symbols: 自动生成的交易对数量（未指定 symbols 时使用）
+            latency: 每次请求的模拟耗时（秒）
+            rate_limit: 对应 ccxt 的 rateLimit（毫秒）
+            market_type: 市场类型 'spot' / 'future'
+            symbols: 指定交易对列表
+            now_ms: 模拟的当前时间（毫秒），默认取真实时间
+            spike_probability: 单根K线出现交易量放大的概率
+            combined_ohlcv: 是否提供一次获取多个交易对K线的 fetch_ohlcvs
+        """
+        self.id = name
+        self.name = name
+        self.rateLimit = rate_limit
+        self.latency = latency
+        self.has = {'fetchTickers': True, 'fetchOHLCV': True, 'fetchTicker': True, 'fetchOHLCVs': combined_ohlcv}
+        self.symbols = symbols or [f"{name.upper()}{i:04d}/{quote}" for i in range(num_symbols)]
+        self.markets = {
+            s: {'id': s.replace('/', ''), 'symbol': s, 'base': s.split('/')[0], 'quote': quote,
+                'type': market_type, 'spot': market_type == 'spot', 'active': True}
+            for s in self.symbols
+        }
+        self.now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+        self.spike_probability = spike_probability
+
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.ohlcv_requests = 0
+        self.candles_returned = 0
+
+    @staticmethod
+    def parse_timeframe(timeframe: str) -> int:
+        return int(timeframe[:-1]) * _TIMEFRAME_SECONDS[timeframe[-1]]
+
+    def milliseconds(self) -> int:
+        return self.now_ms
+
+    def advance(self, seconds: float) -> None:
+        """推进模拟时间"""
+        self.now_ms += int(seconds * 1000)
+
+    def _request(self, candles: int = 0) -> None:
+        with self._lock:
+            self.request_count += 1
+            self.candles_returned += candles
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _symbol_params(self, symbol: str) -> Tuple[float, float, float]:
+        crc = zlib.crc32(f"{self.id}:{symbol}".encode())
+        base_price = 0.01 * (1 + crc % 100000)
+        base_volume = 1000.0 * (1 + (crc >> 8) % 5000)
+        phase = (crc % 6283) / 1000.0
+        return base_price, base_volume, phase
+
+    def _bars(self, symbol: str, timeframe: str, first: int, last: int) -> List[List[float]]:
+        """生成序号 [first, last] 的K线，最后一根（当前K线）按已过时间比例给出交易量"""
+        if last < first:
+            return []
+        tf_ms = self.parse_timeframe(timeframe) * 1000
+        base_price, base_volume, phase = self._symbol_params(symbol)
+        index = np.arange(first, last + 1, dtype=np.float64)
+
+        trend = 1 + 0.08 * np.sin(index / 37.0 + phase) + 0.03 * np.sin(index / 7.0 + phase * 2)
+        noise = _hash01(index, phase) - 0.5
+        close = base_price * (trend + 0.01 * noise)
+        open_ = base_price * (1 + 0.08 * np.sin((index - 1) / 37.0 + phase)
+                              + 0.03 * np.sin((index - 1) / 7.0 + phase * 2)
+                              + 0.01 * (_hash01(index - 1, phase) - 0.5))
+        spread = base_price * 0.004 * (1 + _hash01(index, phase + 1.0))
+        high = np.maximum(open_, close) + spread
+        low = np.minimum(open_, close) - spread
+        volume = base_volume * (0.5 + _hash01(index, phase + 2.0))
+        spikes = _hash01(index, phase + 3.0) < self.spike_probability
+        volume = np.where(spikes, volume * 6.0, volume)
+
+        current = self.now_ms // tf_ms
+        if last == current:
+            elapsed = (self.now_ms - current * tf_ms) / tf_ms
+            volume[-1] *= max(elapsed, 0.01)
+
+        timestamps = (index * tf_ms).astype(np.int64)
+        return [
+            [int(ts), float(o), float(h), float(l), float(c), float(v)]
+            for ts, o, h, l, c, v in zip(timestamps, open_, high, low, close, volume)
+        ]
+
+    def load_markets(self, reload: bool = False, params: Dict = {}) -> Dict[str, Dict]:
+        self._request()
+        return self.markets
+
+    def _ohlcv(self, symbol: str, timeframe: str, since: Optional[int], limit: Optional[int]) -> List[List[float]]:
+        if symbol not in self.markets:
+            raise ValueError(f"{self.id} does not have market symbol {symbol}")
+        limit = limit or 500
+        tf_ms = self.parse_timeframe(timeframe) * 1000
+        current = self.now_ms // tf_ms
+        if since is not None:
+            first = math.ceil(since / tf_ms)
+            last = min(first + limit - 1, current)
+        else:
+            first = current - limit + 1
+            last = current
+        bars = self._bars(symbol, timeframe, first, last)
+        with self._lock:
+            self.ohlcv_requests += 1
+        return bars
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1h', since: Optional[int] = None,
+                    limit: Optional[int] = None, params: Dict = {}) -> List[List[float]]:
+        bars = self._ohlcv(symbol, timeframe, since, limit)
+        self._request(len(bars))
+        return bars
+
+    def fetch_ohlcvs(self, symbols: List[str], timeframe: str = '1h', since: Optional[int] = None,
+                     limit: Optional[int] = None, params: Dict = {}) -> Dict[str, List[List[float]]]:
+        """一次请求返回多个交易对的K线（combined_ohlcv=True 时通过 has['fetchOHLCVs'] 声明）"""
+        result = {s: self._ohlcv(s, timeframe, since, limit) for s in symbols}
+        self._request(sum(len(bars) for bars in result.values()))
+        return result
+
+    def _ticker(self, symbol: str) -> Dict[str, Any]:
+        bars = self._bars(symbol, '1h', self.now_ms // 3_600_000 - 23, self.now_ms // 3_600_000)
+        base_volume = sum(b[5] for b in bars)
+        last = bars[-1][4]
+        return {
+            'symbol': symbol,
+            'timestamp': self.now_ms,
+            'last': last,
+            'close': last,
+            'open': bars[0][1],
+            'baseVolume': base_volume,
+            'quoteVolume': base_volume * last,
+        }
+
+    def fetch_ticker(self, symbol: str, params: Dict = {}) -> Dict[str, Any]:
+        self._request()
+        return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Dict = {}) -> Dict[str, Dict]:
+        self._request()
+        return {s: self._ticker(s) for s in (symbols or self.symbols)}
+
+
+def make_fake_exchanges(count: int = 4, symbols_per_exchange: int = 50, latency: float = 0.05,
+                        now_ms: Optional[int] = None, **kwargs) -> List[Tuple[str, Dict, FakeExchange]]:
+    """生成 CryptoAnalyzer(exchanges=...) 可直接使用的模拟交易所列表"""
+    rate_limits = [50, 100, 20, 50, 100, 20, 50, 100]
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    exchanges = []
+    for i in range(count):
+        name = f"fake{i}"
+        inst = FakeExchange(name, num_symbols=symbols_per_exchange, latency=latency,
+                            rate_limit=rate_limits[i % len(rate_limits)], now_ms=now_ms, **kwargs)
+        conf = {
+            'name': name,
+            'enabled': True,
+            'quote_currency': 'USDT',
+            'min_volume_usd': 0,
+            'priority': i + 1,
+            'description': f'模拟交易所 {name}',
+        }
+        exchanges.append((name, conf, inst))
+    return exchanges
+
+
+class AsyncFakeExchange(FakeExchange):
+    """模拟 ccxt.async_support 交易所，延迟通过 asyncio.sleep 注入"""
+
+    async def _async_request(self, candles: int = 0) -> None:
+        with self._lock:
+            self.request_count += 1
+            self.candles_returned += candles
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def load_markets(self, reload: bool = False, params: Dict = {}) -> Dict[str, Dict]:
+        await self._async_request()
+        return self.markets
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1h', since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Dict = {}) -> List[List[float]]:
+        bars = self._ohlcv(symbol, timeframe, since, limit)
+        await self._async_request(len(bars))
+        return bars
+
+    async def fetch_ticker(self, symbol: str, params: Dict = {}) -> Dict[str, Any]:
+        await self._async_request()
+        return self._ticker(symbol)
+
+    async def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Dict = {}) -> Dict[str, Dict]:
+        await self._async_request()
+        return {s: self._ticker(s) for s in (symbols or self.symbols)}
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,193 @@
+"""
+本地 WebSocket 推送替身服务器
+
+按录制时间回放币安组合流格式的推送帧（{'stream': ..., 'data': ...}），支持 SUBSCRIBE 订阅、
+按倍速回放以及在指定时间点主动断开连接，用于离线验证 stream_ingest 的订阅、重连与补齐逻辑。
+
+帧文件为 JSONL，每行 {'at': 相对开始的模拟秒数, 'stream': 流名称, 'data': 推送内容}。
+record_frames() 用 FakeExchange 生成与其 REST 数据一致的帧，作为录制数据的替代。
+"""
+
+import asyncio
+import bisect
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiohttp import WSMsgType, web
+
+from fake_exchange import FakeExchange
+
+
+def record_frames(inst: FakeExchange, symbols: Sequence[str], timeframe: str, start_ms: int,
+                  bars: int, ticks_per_bar: int = 10) -> List[Dict[str, Any]]:
+    """
+    生成 bars 根K线期间的推送帧：每根K线 ticks_per_bar 次跳动，收盘时一帧 x=true 和一帧 ticker。
+    最后一根K线只有跳动帧（回放结束时仍在形成中）。
+    """
+    tf_ms = inst.parse_timeframe(timeframe) * 1000
+    saved_now = inst.now_ms
+    frames = []
+    try:
+        for i in range(bars):
+            bar_start = start_ms + i * tf_ms
+            index = bar_start // tf_ms
+            moments = [(bar_start + j * tf_ms // ticks_per_bar, False) for j in range(ticks_per_bar)]
+            if i < bars - 1:
+                moments.append((bar_start + tf_ms, True))
+            for now_ms, closed in moments:
+                inst.now_ms = now_ms
+                for symbol in symbols:
+                    ts, o, h, l, c, v = inst._bars(symbol, timeframe, index, index)[0]
+                    market_id = inst.markets[symbol]['id']
+                    frames.append({
+                        'at': (now_ms - start_ms) / 1000.0,
+                        'stream': f"{market_id.lower()}@kline_{timeframe}",
+                        'data': {'e': 'kline', 'E': now_ms, 's': market_id, 'k': {
+                            't': ts, 'T': ts + tf_ms - 1, 's': market_id, 'i': timeframe,
+                            'o': str(o), 'h': str(h), 'l': str(l), 'c': str(c), 'v': str(v), 'x': closed,
+                        }},
+                    })
+                    if closed:
+                        ticker = inst._ticker(symbol)
+                        frames.append({
+                            'at': (now_ms - start_ms) / 1000.0,
+                            'stream': f"{market_id.lower()}@ticker",
+                            'data': {'e': '24hrTicker', 'E': now_ms, 's': market_id,
+                                     'c': str(ticker['last']), 'o': str(ticker['open']),
+                                     'h': str(ticker['last']), 'l': str(ticker['last']),
+                                     'v': str(ticker['baseVolume']), 'q': str(ticker['quoteVolume']),
+                                     'P': '0'},
+                        })
+    finally:
+        inst.now_ms = saved_now
+    return frames
+
+
+def save_frames(path: str, frames: List[Dict[str, Any]]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        for frame in frames:
+            f.write(json.dumps(frame) + '\n')
+
+
+def load_frames(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayServer:
+    """在后台线程中运行的回放服务器"""
+
+    def __init__(self, frames: List[Dict[str, Any]], speed: float = 1.0,
+                 drop_at: Sequence[float] = (), host: str = '127.0.0.1'):
+        """
+        Args:
+            frames: 按 at 排序的推送帧
+            speed: 回放倍速（每秒真实时间对应的模拟秒数）
+            drop_at: 模拟时间点（秒），到达时断开当时所有连接
+        """
+        self.frames = sorted(frames, key=lambda f: f['at'])
+        self._times = [f['at'] for f in self.frames]
+        self.speed = float(speed)
+        self.drop_at = sorted(drop_at)
+        self.host = host
+        self.port: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.connections = 0
+        self.frames_sent = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/stream"
+
+    @property
+    def duration(self) -> float:
+        """回放总时长（真实秒）"""
+        return (self._times[-1] if self._times else 0.0) / self.speed
+
+    def elapsed(self) -> float:
+        """已回放的模拟秒数（未启动时为 0，结束后停在最后一帧）"""
+        if self.started_at is None:
+            return 0.0
+        sim = (time.monotonic() - self.started_at) * self.speed
+        return min(sim, self._times[-1] if self._times else 0.0)
+
+    def wall_time(self, at: float) -> float:
+        """模拟时间点对应的 time.monotonic()"""
+        return self.started_at + at / self.speed
+
+    def start(self) -> str:
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='ws-replay', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.url
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/stream', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.started_at = time.monotonic()
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        subscriptions = set()
+
+        async def reader():
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                if payload.get('method') == 'SUBSCRIBE':
+                    subscriptions.update(payload.get('params', []))
+                    await ws.send_json({'result': None, 'id': payload.get('id')})
+
+        reader_task = asyncio.ensure_future(reader())
+        connected_at = self.elapsed()
+        drops = [t for t in self.drop_at if t > connected_at]
+        index = bisect.bisect_right(self._times, connected_at)
+        try:
+            while index < len(self.frames) and not ws.closed:
+                frame = self.frames[index]
+                if drops and frame['at'] >= drops[0]:
+                    await asyncio.sleep(max(0.0, self.wall_time(drops[0]) - time.monotonic()))
+                    break
+                delay = self.wall_time(frame['at']) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if frame['stream'] in subscriptions:
+                    await ws.send_str(json.dumps({'stream': frame['stream'], 'data': frame['data']}))
+                    self.frames_sent += 1
+                index += 1
+            if not drops:
+                # 回放结束后保持连接，直到客户端断开
+                await reader_task
+        finally:
+            reader_task.cancel()
+            await ws.close()
+        return ws
@@ -0,0 +1,200 @@
+"""
+进程内共享缓存
+
+线程安全的 LRU + TTL 缓存，按条目数和估算内存占用双重限制容量，
+并统计命中、未命中、淘汰和过期次数。app.py 与分析器共用同一个实例（get_shared_cache()）。
+get_or_load() 对同一键的并发加载做合并，只有一个线程调用 loader。
+"""
+
+import sys
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_CONFIG
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """估算对象占用的内存（字节），用于内存预算"""
+    if isinstance(value, np.ndarray):
+        # 持有数据的数组 getsizeof 已包含数据区，视图只计算数组头
+        return sys.getsizeof(value) + (0 if value.flags.owndata else int(value.nbytes))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    size = sys.getsizeof(value)
+    if _depth >= 6:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class TTLCache:
+    """LRU + TTL 缓存"""
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 default_ttl: Optional[float] = None, name: str = 'cache'):
+        """
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 估算内存上限（字节）
+            default_ttl: 默认有效期（秒）
+            name: 名称，用于日志
+        """
+        self.max_entries = int(max_entries or CACHE_CONFIG.get('max_entries', 2048))
+        self.max_bytes = int(max_bytes or CACHE_CONFIG.get('max_bytes', 64 * 1024 * 1024))
+        self.default_ttl = float(default_ttl if default_ttl is not None else CACHE_CONFIG.get('default_ttl', 300))
+        self.name = name
+        self._lock = threading.RLock()
+        # key -> (value, expires_at, size)，按最近使用排序（末尾最新）
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float, int]]' = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flight = SingleFlight(name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """读取缓存，过期条目在读取时删除"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> bool:
+        """
+        写入缓存
+
+        Returns:
+            False 表示单个值超过内存上限而未写入
+        """
+        size = int(size if size is not None else estimate_size(value))
+        if size > self.max_bytes:
+            logger.debug(f"{self.name} 缓存值过大 ({size} 字节)，跳过 {key}")
+            return False
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else float(ttl))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+        return True
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None,
+                    cache_if: Callable[[Any], bool] = bool) -> Any:
+        """
+        命中则返回缓存值，否则调用 loader 加载；cache_if(value) 为真时写入缓存
+
+        同一键的并发未命中只会调用一次 loader，其余调用共享该结果。
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def load():
+            # 排队期间上一次加载可能已写入缓存
+            cached = self.get(key, _MISSING, count=False)
+            if cached is not _MISSING:
+                return cached
+            loaded = loader()
+            if cache_if(loaded):
+                self.set(key, loaded, ttl)
+            return loaded
+
+        return self.flight.do(key, load)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """删除全部过期条目，返回删除数量"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        """超出容量时先清理过期条目，再按最近最少使用淘汰"""
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        self.purge_expired()
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'coalesced': self.flight.coalesced,
+            }
+
+
+_shared_cache: Optional[TTLCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> TTLCache:
+    """进程内共享的缓存实例"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TTLCache(name='shared')
+        return _shared_cache
@@ -0,0 +1,178 @@
+"""
+K线磁盘归档（列式、内存映射 .npy 分段）
+
+目录结构: <root>/<exchange>/<symbol>/<timeframe>/seg-<序号>.npy
+每个分段是形状为 (6, n) 的 float64 数组，依次为 timestamp/open/high/low/close/volume，
+每一列在文件中连续存放，可通过 np.load(mmap_mode='r') 零拷贝读取为 NumPy 视图。
+追加只写新分段；分段过多时合并为一个分段（compact），合并时按时间戳去重，
+后写入的K线覆盖先写入的同一时间戳K线（形成中的K线会被后续数据替换）。
+"""
+
+import os
+import re
+import threading
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import ARCHIVE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+_SEGMENT_RE = re.compile(r'^seg-(\d+)\.npy$')
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]', '_', value)
+
+
+class CandleArchive:
+    """按 (exchange, symbol, timeframe) 归档K线"""
+
+    def __init__(self, root: Optional[str] = None, compact_segments: Optional[int] = None,
+                 max_bars: Optional[int] = None):
+        """
+        Args:
+            root: 归档根目录
+            compact_segments: 分段数达到该值时自动合并
+            max_bars: 合并时每个键最多保留的K线数量
+        """
+        self.root = root or ARCHIVE_CONFIG.get('path', '.cache/candles')
+        self.compact_segments = int(compact_segments or ARCHIVE_CONFIG.get('compact_segments', 16))
+        self.max_bars = int(max_bars or ARCHIVE_CONFIG.get('max_bars', 5000))
+        self._lock = threading.Lock()
+
+    def _dir(self, exchange: str, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, _safe_name(exchange), _safe_name(symbol), _safe_name(timeframe))
+
+    def _segments(self, directory: str) -> List[Tuple[int, str]]:
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        segments = []
+        for name in names:
+            match = _SEGMENT_RE.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(directory, name)))
+        segments.sort()
+        return segments
+
+    @staticmethod
+    def _write(path: str, columns: np.ndarray) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(columns, dtype=np.float64))
+        os.replace(tmp_path, path)
+
+    def append(self, exchange: str, symbol: str, timeframe: str, bars: np.ndarray) -> None:
+        """追加K线（形状 (n, 6)，与 ccxt fetch_ohlcv 返回的行格式一致）"""
+        bars = np.asarray(bars, dtype=np.float64).reshape(-1, 6)
+        if not len(bars):
+            return
+        directory = self._dir(exchange, symbol, timeframe)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            segments = self._segments(directory)
+            seq = segments[-1][0] + 1 if segments else 0
+            self._write(os.path.join(directory, f"seg-{seq:08d}.npy"), bars.T)
+            if len(segments) + 1 >= self.compact_segments:
+                self._compact_dir(directory)
+
+    def read(self, exchange: str, symbol: str, timeframe: str,
+             limit: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        读取归档K线，返回列名 -> 一维数组
+
+        只有一个分段时（合并后的常态）返回内存映射文件上的只读视图，不复制数据；
+        多个分段时需要合并去重，返回新数组。
+        """
+        directory = self._dir(exchange, symbol, timeframe)
+        columns = None
+        # 读取期间可能恰好发生合并（旧分段被删除），重试一次即可
+        for attempt in range(2):
+            segments = self._segments(directory)
+            if not segments:
+                return None
+            try:
+                if len(segments) == 1:
+                    columns = np.load(segments[0][1], mmap_mode='r')
+                else:
+                    columns = self._merge([path for _, path in segments])
+                break
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"读取 {exchange} {symbol} {timeframe} K线归档失败: {e}")
+                return None
+        if columns is None:
+            return None
+        if limit is not None:
+            columns = columns[:, -limit:]
+        return {name: columns[i] for i, name in enumerate(COLUMNS)}
+
+    def read_bars(self, exchange: str, symbol: str, timeframe: str,
+                  limit: Optional[int] = None) -> Optional[np.ndarray]:
+        """读取归档K线为 (n, 6) 行格式数组（复制）"""
+        columns = self.read(exchange, symbol, timeframe, limit)
+        if columns is None:
+            return None
+        return np.stack([columns[name] for name in COLUMNS], axis=1)
+
+    @staticmethod
+    def _merge(paths: List[str]) -> np.ndarray:
+        """按写入顺序合并分段，同一时间戳保留最后写入的K线"""
+        merged = np.concatenate([np.load(path) for path in paths], axis=1)
+        # 稳定排序保持同一时间戳的写入顺序，每组取最后一根
+        order = np.argsort(merged[0], kind='stable')
+        timestamps = merged[0, order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = timestamps[1:] != timestamps[:-1]
+        return merged[:, order[last]]
+
+    def _compact_dir(self, directory: str) -> bool:
+        segments = self._segments(directory)
+        if len(segments) <= 1:
+            return False
+        columns = self._merge([path for _, path in segments])[:, -self.max_bars:]
+        last_seq = segments[-1][0]
+        try:
+            self._write(os.path.join(directory, f"seg-{last_seq + 1:08d}.npy"), columns)
+            for _, path in segments:
+                os.remove(path)
+        except OSError as e:
+            # Windows 下被内存映射的文件无法删除，留待下次合并
+            logger.warning(f"合并K线归档 {directory} 失败: {e}")
+            return False
+        return True
+
+    def compact(self, exchange: str, symbol: str, timeframe: str) -> bool:
+        """合并单个键的全部分段"""
+        with self._lock:
+            return self._compact_dir(self._dir(exchange, symbol, timeframe))
+
+    def keys(self) -> Iterator[Tuple[str, str, str]]:
+        """遍历归档中的 (exchange, symbol, timeframe) 目录名"""
+        if not os.path.isdir(self.root):
+            return
+        for exchange in sorted(os.listdir(self.root)):
+            ex_dir = os.path.join(self.root, exchange)
+            if not os.path.isdir(ex_dir):
+                continue
+            for symbol in sorted(os.listdir(ex_dir)):
+                sym_dir = os.path.join(ex_dir, symbol)
+                if not os.path.isdir(sym_dir):
+                    continue
+                for timeframe in sorted(os.listdir(sym_dir)):
+                    yield exchange, symbol, timeframe
+
+    def compact_all(self) -> int:
+        """合并全部键，返回实际合并的数量"""
+        compacted = 0
+        for exchange, symbol, timeframe in list(self.keys()):
+            with self._lock:
+                if self._compact_dir(os.path.join(self.root, exchange, symbol, timeframe)):
+                    compacted += 1
+        return compacted
@@ -0,0 +1,238 @@
+"""
+批量K线获取策略
+
+CryptoAnalyzer.fetch_ohlcv_many 按交易所挑选第一个支持该交易所的提供者（列表按单个交易对的
+请求成本从低到高排列），同一提供者负责的交易所合并成一次调用：
+  - CombinedRequestProvider: 交易所实例提供 fetch_ohlcvs(symbols, timeframe, limit=...) 时，
+    一次请求获取多个交易对的K线（has['fetchOHLCVs']）
+  - ConcurrentProvider: 逐个交易对请求，但按交易所并发，多个请求同时复用 ccxt 实例的 keep-alive 连接
+  - SerialProvider: 逐个交易对顺序请求，兜底
+订阅了实时推送的交易对，K线由推送写入K线存储，逐个请求的提供者直接命中存储，不产生请求。
+
+每个提供者按交易所记录调用次数、交易对数量、实际发出的请求数和耗时。请求数通过线程局部的
+归属标记统计：提供者在获取某个交易对前设置标记，分析器的 _request 据此计数。
+"""
+
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import SCAN_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_attribution = threading.local()
+
+
+class ProviderStats:
+    """单个 (提供者, 交易所) 的计数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.symbols = 0
+        self.requests = 0
+        self.request_seconds = 0.0
+        self.seconds = 0.0
+
+    def add_request(self, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.request_seconds += seconds
+
+    def add_call(self, symbols: int, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.symbols += symbols
+            self.seconds += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'symbols': self.symbols,
+            'requests': self.requests,
+            'avg_request_ms': round(self.request_seconds / self.requests * 1000, 1) if self.requests else None,
+            'seconds': round(self.seconds, 3),
+        }
+
+
+def attributed(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """由 _request 调用：当前线程正在为某个提供者获取K线时，计入该提供者的请求数与耗时"""
+    stats: Optional[ProviderStats] = getattr(_attribution, 'stats', None)
+    if stats is None:
+        return fn
+
+    def counted() -> Any:
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            stats.add_request(time.perf_counter() - start)
+    return counted
+
+
+class CandleProvider:
+    """批量K线提供者接口"""
+
+    name = 'base'
+
+    def __init__(self):
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def supports(self, analyzer: Any, name: str, inst: Any) -> bool:
+        """是否能为该交易所获取K线"""
+        return True
+
+    def fetch(self, analyzer: Any, symbols: Sequence[str], timeframe: str, limit: int) -> List[Optional[np.ndarray]]:
+        """获取 symbols 的K线（可能属于多个交易所），结果顺序与 symbols 一致，失败时为 None"""
+        raise NotImplementedError
+
+    def stats_for(self, name: str) -> ProviderStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(name, ProviderStats())
+        return stats
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.as_dict() for name, stats in list(self._stats.items())}
+
+    def _fetch_one(self, analyzer: Any, symbol: str, timeframe: str, limit: int) -> Optional[np.ndarray]:
+        """通过分析器（K线存储、请求合并、调度器）获取单个交易对，请求计入本提供者"""
+        _attribution.stats = self.stats_for(analyzer.exchange_by_symbol.get(symbol) or analyzer.exchanges[0][0])
+        try:
+            return analyzer.get_ohlcv_bars(symbol, timeframe, limit)
+        finally:
+            _attribution.stats = None
+
+    def _record_calls(self, analyzer: Any, symbols: Sequence[str], seconds: float) -> None:
+        counts: Dict[str, int] = {}
+        for symbol in symbols:
+            name = analyzer.exchange_by_symbol.get(symbol) or analyzer.exchanges[0][0]
+            counts[name] = counts.get(name, 0) + 1
+        for name, count in counts.items():
+            self.stats_for(name).add_call(count, seconds)
+
+
+class SerialProvider(CandleProvider):
+    """逐个交易对顺序请求"""
+
+    name = 'serial'
+
+    def fetch(self, analyzer: Any, symbols: Sequence[str], timeframe: str, limit: int) -> List[Optional[np.ndarray]]:
+        start = time.perf_counter()
+        results = analyzer._scan_serial(list(symbols), lambda s: self._fetch_one(analyzer, s, timeframe, limit))
+        self._record_calls(analyzer, symbols, time.perf_counter() - start)
+        return results
+
+
+class ConcurrentProvider(CandleProvider):
+    """逐个交易对请求，按交易所并发（共享 ccxt 实例的 keep-alive 连接）"""
+
+    name = 'concurrent'
+
+    def supports(self, analyzer: Any, name: str, inst: Any) -> bool:
+        return bool(SCAN_CONFIG.get('concurrent', True))
+
+    def fetch(self, analyzer: Any, symbols: Sequence[str], timeframe: str, limit: int) -> List[Optional[np.ndarray]]:
+        start = time.perf_counter()
+        if len(symbols) > 1:
+            results = analyzer._get_scanner().map(list(symbols), lambda s: self._fetch_one(analyzer, s, timeframe, limit),
+                                                  analyzer.exchange_by_symbol.get)
+        else:
+            results = analyzer._scan_serial(list(symbols), lambda s: self._fetch_one(analyzer, s, timeframe, limit))
+        self._record_calls(analyzer, symbols, time.perf_counter() - start)
+        return results
+
+
+class CombinedRequestProvider(CandleProvider):
+    """
+    一次请求获取多个交易对的K线
+
+    要求交易所实例声明 has['fetchOHLCVs'] 并提供 fetch_ohlcvs(symbols, timeframe, limit=None)，
+    返回 {交易对: K线列表}。K线存储中仍新鲜的交易对不请求；其余每 max_symbols 个一次请求，
+    取回最近 limit 根K线后写入存储（请求数少，但不做逐个交易对的增量获取）。
+    """
+
+    name = 'combined'
+
+    def __init__(self, max_symbols: Optional[int] = None):
+        super().__init__()
+        self.max_symbols = int(max_symbols or SCAN_CONFIG.get('combined_max_symbols', 50))
+
+    def supports(self, analyzer: Any, name: str, inst: Any) -> bool:
+        return bool(getattr(inst, 'has', {}).get('fetchOHLCVs')) and hasattr(inst, 'fetch_ohlcvs')
+
+    def fetch(self, analyzer: Any, symbols: Sequence[str], timeframe: str, limit: int) -> List[Optional[np.ndarray]]:
+        by_exchange: Dict[str, List[int]] = {}
+        for index, symbol in enumerate(symbols):
+            by_exchange.setdefault(analyzer.exchange_by_symbol.get(symbol) or analyzer.exchanges[0][0], []).append(index)
+        instances = {name: inst for name, _, inst in analyzer.exchanges}
+
+        results: List[Optional[np.ndarray]] = [None] * len(symbols)
+        for name, indexes in by_exchange.items():
+            start = time.perf_counter()
+            self._fetch_exchange(analyzer, name, instances[name], [symbols[i] for i in indexes], timeframe, limit,
+                                 results, indexes)
+            self.stats_for(name).add_call(len(indexes), time.perf_counter() - start)
+        return results
+
+    def _fetch_exchange(self, analyzer: Any, name: str, inst: Any, symbols: List[str], timeframe: str, limit: int,
+                        results: List[Optional[np.ndarray]], indexes: List[int]) -> None:
+        store = analyzer.candle_store
+        pending: List[int] = []
+        if store is not None and limit <= store.ring_length:
+            timeframe_ms = inst.parse_timeframe(timeframe) * 1000
+            now_ms = inst.milliseconds() if hasattr(inst, 'milliseconds') else time.time() * 1000
+            for position, symbol in enumerate(symbols):
+                mode, _ = store.plan((name, symbol, timeframe), limit, timeframe_ms, now_ms)
+                if mode == 'cached':
+                    store.record_hit()
+                    results[indexes[position]] = store.tail((name, symbol, timeframe), limit)
+                else:
+                    pending.append(position)
+        else:
+            pending = list(range(len(symbols)))
+
+        stats = self.stats_for(name)
+        for chunk_start in range(0, len(pending), self.max_symbols):
+            chunk = pending[chunk_start:chunk_start + self.max_symbols]
+            chunk_symbols = [symbols[p] for p in chunk]
+            _attribution.stats = stats
+            try:
+                fetched = analyzer._request(name, inst, 'fetch_ohlcvs',
+                                            lambda: inst.fetch_ohlcvs(chunk_symbols, timeframe, limit=limit))
+            except Exception as e:
+                logger.error(f"{name} 批量获取 {len(chunk_symbols)} 个交易对的K线失败: {e}")
+                continue
+            finally:
+                _attribution.stats = None
+            for position, symbol in zip(chunk, chunk_symbols):
+                ohlcv = (fetched or {}).get(symbol)
+                if not ohlcv:
+                    continue
+                analyzer._archive_bars(name, symbol, timeframe, ohlcv)
+                bars = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+                if store is not None and limit <= store.ring_length:
+                    store.replace((name, symbol, timeframe), ohlcv)
+                results[indexes[position]] = bars[-limit:]
+
+
+PROVIDERS = {
+    'combined': CombinedRequestProvider,
+    'concurrent': ConcurrentProvider,
+    'serial': SerialProvider,
+}
+
+
+def default_providers() -> List[CandleProvider]:
+    """按 SCAN_CONFIG['candle_providers'] 的顺序创建提供者，末尾总是保留逐个顺序请求兜底"""
+    names = list(SCAN_CONFIG.get('candle_providers', ['combined', 'concurrent', 'serial']))
+    providers = [PROVIDERS[name]() for name in names if name in PROVIDERS]
+    if not any(isinstance(p, SerialProvider) for p in providers):
+        providers.append(SerialProvider())
+    return providers
@@ -0,0 +1,190 @@
+"""
+增量K线存储
+
+按 (exchange, symbol, timeframe) 保存最近 ring_length 根K线。已有数据时只需用
+fetch_ohlcv(since=最后一根K线时间) 拉取新K线，并替换仍在形成中的最后一根。
+
+默认每次获取仍为每个交易对发一次增量请求（刷新形成中的K线），减少的是下载的K线数量；
+closed_only 时已存数据覆盖到当前周期的交易对不再请求，形成中的K线只由实时推送更新。
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config import DATA_CONFIG
+
+logger = logging.getLogger(__name__)
+
+CandleKey = Tuple[str, str, str]
+
+
+class CandleStore:
+    """按 (exchange, symbol, timeframe) 存储K线的有界缓冲，线程安全"""
+
+    def __init__(self, ring_length: Optional[int] = None, fresh_seconds: Optional[float] = None,
+                 closed_only: Optional[bool] = None):
+        """
+        Args:
+            ring_length: 每个键最多保留的K线数量
+            fresh_seconds: 距上次拉取不足该秒数时直接使用已存数据
+            closed_only: 已存的最后一根K线属于当前周期（之前的K线都已收盘）时直接使用已存数据
+        """
+        self.ring_length = int(ring_length or DATA_CONFIG.get('candle_ring_length', 500))
+        self.fresh_seconds = float(fresh_seconds if fresh_seconds is not None
+                                   else DATA_CONFIG.get('candle_fresh_seconds', 0))
+        self._lock = threading.Lock()
+        self._bars: Dict[CandleKey, np.ndarray] = {}
+        self.closed_only = bool(closed_only if closed_only is not None
+                                else DATA_CONFIG.get('candle_closed_only', False))
+        self._fetched_at: Dict[CandleKey, float] = {}
+        self._expired: Set[CandleKey] = set()
+        self.full_fetches = 0
+        self.incremental_fetches = 0
+        self.cache_hits = 0
+        self.candles_received = 0
+
+    def __len__(self) -> int:
+        return len(self._bars)
+
+    def __contains__(self, key: CandleKey) -> bool:
+        return key in self._bars
+
+    def plan(self, key: CandleKey, limit: int, timeframe_ms: int, now_ms: float) -> Tuple[str, Optional[int]]:
+        """
+        决定本次获取方式
+
+        Returns:
+            ('cached', None) 直接使用已存数据；('incremental', since) 增量拉取；('full', None) 全量拉取
+        """
+        if limit > self.ring_length:
+            return 'full', None
+        with self._lock:
+            bars = self._bars.get(key)
+            fetched_at = self._fetched_at.get(key, 0.0)
+            expired = key in self._expired
+        if bars is None or len(bars) < limit:
+            return 'full', None
+        if self.fresh_seconds > 0 and time.time() - fetched_at < self.fresh_seconds:
+            return 'cached', None
+
+        last_ts = int(bars[-1, 0])
+        if self.closed_only and not expired and last_ts >= now_ms // timeframe_ms * timeframe_ms:
+            # 已有当前周期的K线，说明上一根在存入时已收盘；只有形成中的K线可能变化
+            return 'cached', None
+        # 缺口超过 limit 根时 since 请求无法一次补齐，改为全量
+        missing = (now_ms - last_ts) // timeframe_ms + 1
+        if missing > limit:
+            return 'full', None
+        return 'incremental', last_ts
+
+    def replace(self, key: CandleKey, ohlcv: List[List[float]]) -> None:
+        """用全量拉取结果覆盖"""
+        bars = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)[-self.ring_length:]
+        with self._lock:
+            self._bars[key] = bars
+            self._fetched_at[key] = time.time()
+            self._expired.discard(key)
+            self.full_fetches += 1
+            self.candles_received += len(ohlcv)
+
+    def seed(self, key: CandleKey, bars: np.ndarray) -> None:
+        """用本地已有数据（如磁盘归档）初始化，下次获取时增量补齐"""
+        bars = np.asarray(bars, dtype=np.float64).reshape(-1, 6)[-self.ring_length:]
+        with self._lock:
+            if key not in self._bars and len(bars):
+                self._bars[key] = bars
+                self._fetched_at[key] = 0.0
+
+    def merge(self, key: CandleKey, ohlcv: List[List[float]], since: int) -> bool:
+        """
+        合并增量拉取结果：时间戳 >= 新数据首根的已存K线被替换（含形成中的最后一根）
+
+        Returns:
+            False 表示新数据与已存数据之间存在缺口，调用方应改为全量拉取
+        """
+        new = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        with self._lock:
+            self.incremental_fetches += 1
+            self.candles_received += len(new)
+            bars = self._bars.get(key)
+            if bars is None or (len(new) and new[0, 0] > since):
+                return False
+            if len(new):
+                keep = bars[bars[:, 0] < new[0, 0]]
+                bars = np.concatenate([keep, new])[-self.ring_length:]
+                self._bars[key] = bars
+            self._fetched_at[key] = time.time()
+            self._expired.discard(key)
+            return True
+
+    def upsert(self, key: CandleKey, bar: Sequence[float]) -> bool:
+        """
+        写入单根K线（实时推送）：时间戳与最后一根相同则原地替换，更新则追加
+
+        Returns:
+            False 表示该键尚无数据，调用方应先通过 REST 补齐
+        """
+        with self._lock:
+            bars = self._bars.get(key)
+            if bars is None or not len(bars):
+                return False
+            ts = bar[0]
+            last_ts = bars[-1, 0]
+            if ts == last_ts:
+                bars[-1] = bar
+            elif ts > last_ts:
+                row = np.asarray(bar, dtype=np.float64).reshape(1, 6)
+                self._bars[key] = np.concatenate([bars, row])[-self.ring_length:]
+            else:
+                index = np.searchsorted(bars[:, 0], ts)
+                if index < len(bars) and bars[index, 0] == ts:
+                    bars[index] = bar
+            self._fetched_at[key] = time.time()
+            return True
+
+    def expire(self, key: CandleKey) -> None:
+        """标记为过期：下次获取时不直接复用，至少增量拉取一次"""
+        with self._lock:
+            if key in self._fetched_at:
+                self._fetched_at[key] = 0.0
+                self._expired.add(key)
+
+    def last_timestamp(self, key: CandleKey) -> Optional[int]:
+        with self._lock:
+            bars = self._bars.get(key)
+            return int(bars[-1, 0]) if bars is not None and len(bars) else None
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def tail(self, key: CandleKey, limit: int) -> Optional[np.ndarray]:
+        """返回最近 limit 根K线的副本"""
+        with self._lock:
+            bars = self._bars.get(key)
+            return None if bars is None else bars[-limit:].copy()
+
+    def clear(self, key: Optional[CandleKey] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._bars.clear()
+                self._fetched_at.clear()
+                self._expired.clear()
+            else:
+                self._bars.pop(key, None)
+                self._fetched_at.pop(key, None)
+                self._expired.discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'keys': len(self._bars),
+                'full_fetches': self.full_fetches,
+                'incremental_fetches': self.incremental_fetches,
+                'cache_hits': self.cache_hits,
+                'candles_received': self.candles_received,
+            }
@@ -8,8 +8,9 @@ import argparse
 import sys
 import json
 from datetime import datetime
-from crypto_analyzer import CryptoAnalyzer
-from config import SYMBOL_FILTER, INDICATOR_CONFIG
+from crypto_analyzer import create_analyzer
+from opportunity_table import OpportunityTable
+from config import SYMBOL_FILTER, INDICATOR_CONFIG, SCANNER_CONFIG, DISTRIBUTED_CONFIG
 
 def format_volume(volume: float) -> str:
     """智能格式化交易量显示"""
@@ -68,8 +69,8 @@ def scan_opportunities(analyzer, top_n=20):
         print("正在分析技术指标...")
         print()
         
-        # 扫描交易机会
-        opportunities = analyzer.get_top_opportunities(top_n)
+        # 扫描交易机会（列式结果，迭代时按行生成字典）
+        opportunities = analyzer.get_opportunity_table(top_n)
         
         if not opportunities:
             print("❌ 未找到符合条件的交易机会")
@@ -159,8 +160,14 @@ def analyze_symbol(analyzer, symbol, timeframe='1h'):
         print(f"❌ 分析失败: {e}")
 
 def export_results(opportunities, filename):
-    """导出结果到JSON文件"""
+    """导出结果到JSON文件；文件名以 .npy 结尾且结果为 OpportunityTable 时直接写入结构化数组"""
     try:
+        if isinstance(opportunities, OpportunityTable):
+            if filename.endswith('.npy'):
+                opportunities.save(filename)
+                print(f"✅ 结果已导出到: {filename}")
+                return
+            opportunities = opportunities.to_records()
         export_data = {
             'export_time': datetime.now().isoformat(),
             'total_opportunities': len(opportunities),
@@ -175,6 +182,40 @@ def export_results(opportunities, filename):
     except Exception as e:
         print(f"❌ 导出失败: {e}")
 
+def run_distributed(args):
+    """分布式扫描的协调器或节点（不在本进程初始化交易所）"""
+    import logging
+    from distributed import CoordinatorServer, ScanCoordinator, ScanWorker, TcpClient
+    from scanner_worker import file_publisher
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    if args.command == 'coordinator':
+        path = args.snapshot or SCANNER_CONFIG['snapshot_path']
+        coordinator = ScanCoordinator(publish=file_publisher(path))
+        try:
+            server = CoordinatorServer(coordinator, args.host, args.port)
+        except PermissionError as e:
+            print(f"❌ {e}")
+            return
+        print(f"✅ 协调器已启动: {args.host}:{args.port}，覆盖 {len(coordinator.exchanges)} 个交易所，快照文件: {path}")
+        coordinator.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            coordinator.stop()
+            server.server_close()
+    else:
+        host, _, port = args.coordinator.rpartition(':')
+        worker = ScanWorker(TcpClient(host, int(port)))
+        print(f"✅ 扫描节点 {worker.worker_id} 连接协调器 {args.coordinator}")
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -187,6 +228,9 @@ def main():
   python cli.py analyze BTC/USDT       # 分析特定交易对
   python cli.py analyze BTC/USDT --timeframe 4h  # 使用4小时周期
   python cli.py scan --export results.json  # 导出结果
+  python cli.py worker                 # 独立扫描进程，Web 进程以 SCANNER_MODE=external 启动
+  python cli.py coordinator            # 分布式扫描协调器，合并结果写入快照文件
+  python cli.py scan-node --coordinator 10.0.0.5:8765  # 分布式扫描节点
         """
     )
     
@@ -195,13 +239,26 @@ def main():
     # 扫描命令
     scan_parser = subparsers.add_parser('scan', help='扫描交易机会')
     scan_parser.add_argument('--top', type=int, default=20, help='返回前N个机会 (默认: 20)')
-    scan_parser.add_argument('--export', help='导出结果到JSON文件')
+    scan_parser.add_argument('--export', help='导出结果到JSON文件（.npy 结尾时导出 NumPy 结构化数组）')
     
     # 分析命令
     analyze_parser = subparsers.add_parser('analyze', help='分析特定交易对')
     analyze_parser.add_argument('symbol', help='交易对符号 (如: BTC/USDT)')
     analyze_parser.add_argument('--timeframe', default='1h', help='时间周期 (默认: 1h)')
     
+    # 扫描进程
+    worker_parser = subparsers.add_parser('worker', help='持续扫描并写入排行快照文件，供 Web 进程读取')
+    worker_parser.add_argument('--snapshot', help=f"快照文件路径 (默认: {SCANNER_CONFIG['snapshot_path']})")
+    
+    # 分布式扫描
+    coordinator_parser = subparsers.add_parser('coordinator', help='分配扫描租约并合并各节点结果')
+    coordinator_parser.add_argument('--host', default=DISTRIBUTED_CONFIG['host'], help='监听地址')
+    coordinator_parser.add_argument('--port', type=int, default=DISTRIBUTED_CONFIG['port'], help='监听端口')
+    coordinator_parser.add_argument('--snapshot', help=f"快照文件路径 (默认: {SCANNER_CONFIG['snapshot_path']})")
+    node_parser = subparsers.add_parser('scan-node', help='从协调器领取租约并扫描')
+    node_parser.add_argument('--coordinator', default=f"{DISTRIBUTED_CONFIG['host']}:{DISTRIBUTED_CONFIG['port']}",
+                             help='协调器地址 host:port')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -210,9 +267,13 @@ def main():
     
     print_banner()
     
+    if args.command in ('coordinator', 'scan-node'):
+        run_distributed(args)
+        return
+    
     # 初始化分析器
     try:
-        analyzer = CryptoAnalyzer()
+        analyzer = create_analyzer()
         print("✅ 分析器初始化成功")
         print()
     except Exception as e:
@@ -228,6 +289,13 @@ def main():
     elif args.command == 'analyze':
         analyze_symbol(analyzer, args.symbol, args.timeframe)
     
+    elif args.command == 'worker':
+        import logging
+        from scanner_worker import run_scanner
+        logging.basicConfig(level=logging.INFO,
+                            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        run_scanner(analyzer, args.snapshot)
+    
     print("\n" + "=" * 60)
     print("分析完成！")
 
@@ -7,7 +7,8 @@ def validate_config() -> bool:
     """验证配置文件的完整性"""
     required_configs = [
         'EXCHANGE_CONFIG', 'EXCHANGES', 'NETWORK_CONFIG',
-        'SYMBOL_FILTER', 'INDICATOR_CONFIG', 'DATA_CONFIG'
+        'SYMBOL_FILTER', 'INDICATOR_CONFIG', 'DATA_CONFIG',
+        'SCAN_CONFIG'
     ]
     
     for config_name in required_configs:
@@ -150,6 +151,38 @@ NETWORK_CONFIG = {
     'retry_count': 2,  # 减少重试次数
     'retry_delay': 1,  # 减少重试延迟
     # 'proxies': {'http': 'http://127.0.0.1:7890', 'https': 'http://127.0.0.1:7890'},
+    # 同步 ccxt 实例共用的 HTTP 会话（transport.py）
+    'transport': {
+        'enabled': True,            # 关闭时每个 ccxt 实例使用自己的默认会话
+        'pool_hosts': 32,           # 缓存连接池的主机数量
+        'pool_maxsize': None,       # 每个主机保持的连接数，None 表示 SCAN_CONFIG['max_per_exchange'] + 4
+        'keepalive': True,          # 复用连接；关闭时每个请求发送 Connection: close
+        'keepalive_idle': 60,       # 空闲多少秒后发送 TCP keepalive 探测，0 表示不启用
+        'keepalive_interval': 15,   # keepalive 探测间隔（秒）
+        'keepalive_count': 4,       # 探测失败多少次后断开
+        'tcp_nodelay': True,        # 禁用 Nagle 算法
+        'trust_env': False,         # 是否读取 HTTP(S)_PROXY 等环境变量（与 ccxt 默认一致）
+        'http2': False,             # requests 不支持 HTTP/2，需同时配置 session_factory
+        'session_factory': None,    # 'module:callable'，返回与 requests.Session 接口兼容的会话
+    },
+}
+
+# 交易所请求调度（request_scheduler.py）：令牌桶、优先通道、限速退避与重试
+REQUEST_SCHEDULER_CONFIG = {
+    'enabled': True,                # 启用时由调度器统一节流，ccxt 实例的 enableRateLimit 关闭
+    'burst_seconds': 2,             # 令牌桶容量 = 基础速率 × 该秒数，允许短时突发
+    'interactive_reserve': 0.25,    # 桶容量中只给交互式请求（图表、API K线）使用的比例
+    'backoff_factor': 0.5,          # 遇到 429/418/DDoSProtection 时速率乘以该系数
+    'min_rate_factor': 0.1,         # 速率下限（相对基础速率）
+    'recovery_step': 0.02,          # 每次成功请求恢复的速率（相对基础速率）
+    'cooldown': 5,                  # 429 且无 Retry-After 时暂停该交易所的秒数
+    'ban_cooldown': 120,            # 418（IP 被临时封禁）时暂停的秒数
+    'max_retry_delay': 30,          # 重试等待上限（秒），实际等待在 [0, retry_delay × 2^n] 内随机
+    # 接口权重（消耗的令牌数），交易所名称下的配置优先于 default
+    'weights': {
+        'default': {'fetch_ohlcv': 1, 'fetch_ticker': 1, 'fetch_tickers': 10, 'load_markets': 10},
+        'binance': {'fetch_ohlcv': 2, 'fetch_ticker': 2, 'fetch_tickers': 40},
+    },
 }
 
 # 交易对筛选配置
@@ -158,6 +191,17 @@ SYMBOL_FILTER = {
     'min_volume_usd': 1000000,    # 最小24小时交易量（美元）
     'max_symbols': 200,           # 最大分析交易对数量
     'market_types': ['spot', 'future'],  # 市场类型：现货和合约都支持
+    'venue_selection': 'volume',  # 多个交易所上市的交易对选哪个交易所分析：'volume' 成交额最高 / 'priority' 优先级最高
+    'aggregate_venues': False,    # 结果中附带跨交易所24小时成交额合计与选中交易所的占比（来自筛选时的批量 ticker）
+}
+
+# 交易所健康监控（被动统计真实请求，空闲时探测）
+HEALTH_CONFIG = {
+    'window': 300,                  # 统计失败率的时间窗口（秒）
+    'latency_samples': 200,         # 计算延迟分位数的最近请求数
+    'max_consecutive_errors': 3,    # 连续失败达到该次数视为连接异常
+    'idle_after': 60,               # 超过该秒数没有请求时发出一次轻量探测
+    'check_interval': 15,           # 后台汇总与检查空闲的间隔（秒）
 }
 
 # 技术指标配置
@@ -174,6 +218,118 @@ DATA_CONFIG = {
     'default_limit': 100,           # 默认K线数量
     'update_interval': 180,         # 数据更新间隔（秒）- Bolt.host优化
     'chart_limit': 100,             # 图表显示K线数量
+    'candle_store': True,           # 是否启用增量K线存储（每个交易对仍每周期请求一次，只下载新K线）
+    'candle_ring_length': 500,      # 每个 (交易所, 交易对, 周期) 最多保留的K线数量
+    'candle_fresh_seconds': 30,     # 距上次拉取不足该秒数时直接复用已存K线
+    'candle_closed_only': False,    # 已存到当前周期的交易对不再请求，形成中的K线只靠实时推送更新（适合配合 STREAM_CONFIG）
+}
+
+# 扫描引擎配置
+SCAN_CONFIG = {
+    'backend': 'sync',              # 分析器后端：'sync' 同步 ccxt，'async' 基于 ccxt.async_support
+                                    # （async 不支持K线存储/归档、candle_providers、ticker_prefilter、processes）
+    'concurrent': True,             # 是否启用并发扫描（结果与串行扫描一致）
+    'max_workers': 32,              # 全局最大工作线程数
+    'max_per_exchange': 8,          # 单个交易所最大并发请求数
+    'expected_latency_ms': 300,     # 预估单次请求耗时，用于按 rateLimit 推算并发度
+    'batch_indicators': True,       # 先获取全部K线，再对所有交易对一次性向量化计算指标
+    'processes': 1,                 # 分片扫描的工作进程数，大于 1 时按交易所或哈希把交易对分给多个进程
+    'shard_by': 'auto',             # 分片方式：'exchange' / 'hash' / 'auto'（交易所数不少于进程数时按交易所）
+    'start_method': 'spawn',        # 工作进程启动方式
+    'candle_providers': ['combined', 'concurrent', 'serial'],  # K线获取策略，按成本从低到高依次尝试
+    'combined_max_symbols': 50,     # 支持多交易对K线接口的交易所，每次请求最多包含的交易对数量
+    'ticker_prefilter': False,      # 用批量 ticker 和已存K线的均量估算交易量比率上界，达不到阈值的交易对不再拉取K线（沿用上次结果）
+    'prefilter_margin': 1.2,        # 上界乘以该系数后仍低于阈值才跳过（容纳 ticker 缓存期间的新增成交）
+}
+
+# 分级重扫配置：按上次结果的交易量比率、波动率和综合评分为每个交易对安排重扫间隔
+TIERED_SCAN_CONFIG = {
+    'enabled': False,               # 启用后扫描循环按到期交易对分批扫描，取代固定周期的全量扫描
+    'tick': 5,                      # 调度周期（秒）
+    'min_interval': 30,             # 最热交易对（量比达到阈值）的重扫间隔（秒）
+    'max_interval': 900,            # 最冷交易对的重扫间隔（秒）
+    'budget_per_minute': 600,       # 每分钟最多扫描的交易对数量，超出时按比例拉长所有间隔
+    'volatility_ref': 0.03,         # 波动率达到该值时波动率分量取满分
+    'weights': {                    # 优先级各分量的权重
+        'volume_ratio': 0.6,
+        'volatility': 0.2,
+        'composite_score': 0.2,
+    },
+}
+
+# K线磁盘归档配置
+ARCHIVE_CONFIG = {
+    'enabled': True,                # 是否将拉取到的K线归档到磁盘，重启后从归档恢复
+    'path': '.cache/candles',       # 归档根目录
+    'compact_segments': 16,         # 单个交易对分段数达到该值时自动合并
+    'max_bars': 5000,               # 合并时每个交易对/周期最多保留的K线数量
+}
+
+# 共享缓存配置
+CACHE_CONFIG = {
+    'max_entries': 2048,            # 最大条目数
+    'max_bytes': 64 * 1024 * 1024,  # 估算内存上限（字节）
+    'default_ttl': 300,             # 默认有效期（秒）
+    'chart_ttl': 60,                # 图表数据有效期（秒）
+    'ticker_ttl': 30,               # ticker 有效期（秒）
+}
+
+# WebSocket 实时推送配置
+STREAM_CONFIG = {
+    'enabled': True,                # 是否订阅K线/ticker推送（仅对有推送适配器的交易所生效）
+    'timeframe': '1h',              # 订阅的K线周期，与扫描周期一致
+    'backfill_limit': 100,          # 连接建立或出现缺口时通过 REST 补齐的K线数量
+    'rank_interval': 5,             # 推送可用时重新排序交易机会的间隔（秒）
+    'reconnect_min_delay': 1,       # 重连初始等待（秒），之后指数增长
+    'reconnect_max_delay': 60,      # 重连最大等待（秒）
+    'heartbeat': 30,                # WebSocket ping 间隔（秒）
+    'ticker_flush_interval': 1,     # 推送的 ticker 合并进 REST ticker 缓存的间隔（秒），筛选与预筛选因此不再请求 fetch_tickers
+    'max_streams_per_connection': 200,  # 单个连接最多订阅的流数量
+    'urls': {},                     # 交易所名称 -> 推送地址，覆盖适配器默认地址
+    'signal_history': 200,          # 保留的最近信号告警数量
+}
+
+# HTTP API 配置（挂载在 Dash 的 Flask 服务上）
+API_CONFIG = {
+    'enabled': True,                # 是否提供 /api 接口
+    'prefix': '/api',               # 路由前缀
+    'gzip_min_bytes': 1024,         # 响应超过该大小且客户端支持时 gzip 压缩
+    'gzip_level': 6,                # gzip 压缩级别
+    'max_limit': 1000,              # 单次请求最多返回的交易机会/K线数量
+    'sse_keepalive': 15,            # SSE 无更新时发送注释行保持连接的间隔（秒）
+    'sse_retry_ms': 3000,           # 通知浏览器断线后重连的等待（毫秒）
+    'cors_origin': None,            # 允许跨域访问的来源，None 表示不返回 CORS 头
+}
+
+# 扫描进程配置
+SCANNER_CONFIG = {
+    # embedded: Web 进程内运行扫描循环；external: 由 `python cli.py worker` 扫描，Web 进程只读取快照文件
+    'mode': os.environ.get('SCANNER_MODE', 'embedded'),
+    'snapshot_path': '.cache/ranking.snap',  # 扫描进程写入、Web 进程映射读取的快照文件
+    'poll_interval': 1.0,           # Web 进程检查快照文件更新的间隔（秒）
+}
+
+# 分布式扫描配置（python cli.py coordinator / python cli.py scan-node）
+DISTRIBUTED_CONFIG = {
+    'host': '127.0.0.1',            # 协调器监听地址（节点连接地址）
+    'port': 8765,                   # 协调器端口
+    'token': os.environ.get('SCAN_COORDINATOR_TOKEN', ''),  # 节点与协调器共享的令牌，空表示不校验（只允许监听本机地址）
+    'include_disabled': True,       # 是否覆盖 EXCHANGES 中未启用的交易所
+    'shards_per_exchange': 1,       # 每个交易所拆成的租约数（整数或 交易所 -> 数量）
+    'lease_ttl': 120,               # 租约有效期（秒），节点超时未回报时重新分配；扫描期间每 1/3 有效期续期一次
+    'scan_chunk': 50,               # 节点每批分析的交易对数量，批次之间检查租约是否已被回收
+    'max_attempts': 3,              # 同一租约每轮最多尝试次数
+    'round_interval': 180,          # 两轮扫描开始时间的最小间隔（秒）
+    'poll_interval': 2,             # 节点没有租约时的等待（秒）
+    'publish_interval': 2,          # 协调器合并发布排行的间隔（秒）
+}
+
+# 市场元数据缓存配置
+MARKET_CACHE_CONFIG = {
+    'enabled': True,                # 是否启用 load_markets 结果的磁盘缓存
+    'path': '.cache/markets',       # 缓存目录
+    'ttl': 6 * 3600,                # 缓存有效期（秒），过期后先用旧缓存启动再后台刷新
+    'init_workers': 8,              # 并行初始化交易所的线程数
 }
 
 # 图表配置
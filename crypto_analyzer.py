@@ -3,107 +3,91 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, Iterable, List, Tuple, Any, Optional
 import logging
-from config import EXCHANGE_CONFIG, EXCHANGES, NETWORK_CONFIG, INDICATOR_CONFIG
+from concurrent.futures import ThreadPoolExecutor
+from config import (EXCHANGE_CONFIG, EXCHANGES, NETWORK_CONFIG, INDICATOR_CONFIG, SCAN_CONFIG,
+                    MARKET_CACHE_CONFIG, DATA_CONFIG, ARCHIVE_CONFIG, CACHE_CONFIG, REQUEST_SCHEDULER_CONFIG,
+                    SYMBOL_FILTER)
+from health_monitor import HealthMonitor, get_health_monitor
+from batch_indicators import latest_indicators, stack_bars
+from cache import TTLCache, get_shared_cache
+from candle_providers import CandleProvider, ConcurrentProvider, attributed, default_providers
+from candle_archive import CandleArchive
+from candle_store import CandleStore
+from market_cache import MarketCache
+from opportunity_table import OpportunityTable
+from request_scheduler import RequestScheduler, get_scheduler, interactive
+from scan_engine import ConcurrentScanner
+from signal_detector import classify_signal
+from single_flight import SingleFlight
+from streaming_indicators import StreamingIndicators
+from symbol_universe import SymbolUniverse
+from ticker_prefilter import volume_ratio_bound
+from transport import get_transport
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class CryptoAnalyzer:
-    def __init__(self, exchange_name: str = 'binance'):
-        """
-        初始化加密货币分析器
-        
-        Args:
-            exchange_name: 兼容旧参数，不再仅依赖单一交易所
-        """
-        self.exchange_name = exchange_name
-        self.exchanges = self._init_exchanges()
-        self.symbols: List[str] = []
-        self.exchange_by_symbol: Dict[str, str] = {}
-        self.data_cache: Dict[Tuple[str, str], pd.DataFrame] = {}
-    
-    def _init_exchanges(self):
-        """初始化交易所实例，按优先级排序"""
-        instances = []
+class AnalyzerBase:
+    """与数据获取方式无关的分析逻辑，同步与异步分析器共用"""
+
+    exchange_name: str = 'binance'
+    exchange_by_symbol: Dict[str, str]
+    universe: SymbolUniverse
+
+    def _enabled_exchange_configs(self) -> List[Dict]:
+        """启用的交易所配置，按优先级排序"""
         enabled_exchanges = [ex for ex in EXCHANGES if ex.get('enabled', True)]
-        
-        # 按优先级排序
         enabled_exchanges.sort(key=lambda x: x.get('priority', 999))
+        return enabled_exchanges
+
+    def _exchange_params(self, ex: Dict) -> Dict[str, Any]:
+        """构造 ccxt 实例参数"""
+        params = {
+            # 启用请求调度器时由调度器统一节流，避免与 ccxt 内置节流重复等待
+            'enableRateLimit': (NETWORK_CONFIG.get('rate_limit', True)
+                                and not REQUEST_SCHEDULER_CONFIG.get('enabled', True)),
+            'timeout': NETWORK_CONFIG.get('timeout', 30000)
+        }
         
-        logger.info(f"初始化 {len(enabled_exchanges)} 个启用的交易所")
-        
-        for ex in enabled_exchanges:
-            name = ex['name']
-            params = {
-                'enableRateLimit': NETWORK_CONFIG.get('rate_limit', True),
-                'timeout': NETWORK_CONFIG.get('timeout', 30000)
-            }
-            
-            # 添加交易所特定的options配置（如合约支持）
-            options = ex.get('options', {})
-            if options:
-                params['options'] = options
-            
-            proxies = NETWORK_CONFIG.get('proxies')
-            if proxies:
-                params['proxies'] = proxies
-            
-            try:
-                # 根据配置显示市场类型
-                market_type = options.get('defaultType', 'spot')
-                logger.info(f"正在初始化交易所: {name} ({ex.get('description', '')}) [{market_type} 市场]")
-                inst = getattr(ccxt, name)(params)
-                
-                # 测试连接（带超时控制）
-                try:
-                    # 设置更短的超时时间
-                    inst.timeout = 10000  # 10秒超时
-                    markets = inst.load_markets()
-                    logger.info(f"✅ {name} 初始化成功，支持 {len(markets)} 个交易对")
-                    instances.append((name, ex, inst))
-                except Exception as test_err:
-                    error_msg = str(test_err)
-                    if "TimeoutError" in error_msg or "timeout" in error_msg.lower():
-                        logger.warning(f"⏰ {name} 连接超时，跳过该交易所")
-                    elif "ConnectionError" in error_msg or "connection" in error_msg.lower():
-                        logger.warning(f"🔌 {name} 连接错误，跳过该交易所")
-                    else:
-                        logger.warning(f"⚠️ {name} 连接测试失败: {test_err}")
-                    # 连接失败的交易所直接跳过，不添加到实例列表
-                    continue
-                    
-            except Exception as e:
-                logger.error(f"❌ 初始化交易所 {name} 失败: {e}")
-                continue
-        
-        # 向后兼容：若未配置或全部禁用，则创建单一 exchange_name
-        if not instances:
-            logger.warning("没有启用的交易所，使用默认配置")
-            try:
-                params = {
-                    'enableRateLimit': EXCHANGE_CONFIG.get('rate_limit', True),
-                    'timeout': EXCHANGE_CONFIG.get('timeout', 30000)
-                }
-                proxies = EXCHANGE_CONFIG.get('proxies')
-                if proxies:
-                    params['proxies'] = proxies
-                inst = getattr(ccxt, self.exchange_name)(params)
-                instances.append((self.exchange_name, {
-                    'name': self.exchange_name,
-                    'quote_currency': 'USDT',
-                    'min_volume_usd': 1_000_000,
-                    'priority': 999,
-                    'description': f'默认交易所: {self.exchange_name}'
-                }, inst))
-                logger.info(f"✅ 默认交易所 {self.exchange_name} 初始化成功")
-            except Exception as e:
-                logger.error(f"❌ 初始化默认交易所失败: {e}")
+        # 添加交易所特定的options配置（如合约支持）
+        options = ex.get('options', {})
+        if options:
+            params['options'] = options
         
-        logger.info(f"成功初始化 {len(instances)} 个交易所")
-        return instances
+        proxies = NETWORK_CONFIG.get('proxies')
+        if proxies:
+            params['proxies'] = proxies
+        return params
+
+    def _default_exchange_params(self) -> Tuple[Dict[str, Any], Dict]:
+        """未启用任何交易所时使用的默认交易所参数与配置"""
+        params = {
+            'enableRateLimit': EXCHANGE_CONFIG.get('rate_limit', True),
+            'timeout': EXCHANGE_CONFIG.get('timeout', 30000)
+        }
+        proxies = EXCHANGE_CONFIG.get('proxies')
+        if proxies:
+            params['proxies'] = proxies
+        conf = {
+            'name': self.exchange_name,
+            'quote_currency': 'USDT',
+            'min_volume_usd': 1_000_000,
+            'priority': 999,
+            'description': f'默认交易所: {self.exchange_name}'
+        }
+        return params, conf
+
+    def _log_connect_error(self, name: str, test_err: Exception) -> None:
+        error_msg = str(test_err)
+        if "TimeoutError" in error_msg or "timeout" in error_msg.lower():
+            logger.warning(f"⏰ {name} 连接超时，跳过该交易所")
+        elif "ConnectionError" in error_msg or "connection" in error_msg.lower():
+            logger.warning(f"🔌 {name} 连接错误，跳过该交易所")
+        else:
+            logger.warning(f"⚠️ {name} 连接测试失败: {test_err}")
 
     def _estimate_quote_volume(self, ticker: Dict) -> float:
         price = (
@@ -123,70 +107,129 @@ class CryptoAnalyzer:
             quote_volume = base_volume * price if (base_volume and price) else 0
         return float(quote_volume or 0)
 
-    def get_tradable_symbols(self, quote_currency: str = 'USDT', min_volume: float = 1000000) -> List[str]:
-        """聚合多个交易所可交易对，按成交额过滤。支持现货和合约市场。"""
-        aggregated: List[str] = []
-        exchange_by_symbol: Dict[str, str] = {}
+    def _select_candidates(self, name: str, ex_conf: Dict, markets: Dict, quote_currency: str) -> List[str]:
+        """根据市场类型和计价货币筛选候选交易对"""
+        options = ex_conf.get('options', {})
+        market_type = options.get('defaultType', 'spot')
         
-        logger.info(f"开始获取交易对，最小交易量: ${min_volume:,.0f}")
+        # 优先使用各自配置的 quote 过滤
+        q = ex_conf.get('quote_currency', quote_currency)
         
-        for name, ex_conf, inst in self.exchanges:
-            try:
-                # 获取市场类型
-                options = ex_conf.get('options', {})
-                market_type = options.get('defaultType', 'spot')
-                logger.info(f"正在处理交易所: {name} (市场类型: {market_type})")
-                
-                markets = inst.load_markets()
-                
-                # 优先使用各自配置的 quote 过滤
-                q = ex_conf.get('quote_currency', quote_currency)
-                mv = ex_conf.get('min_volume_usd', min_volume)
-                
-                # 根据市场类型过滤交易对
-                if market_type == 'future':
-                    # 过滤合约交易对
-                    candidates = [s for s in markets.keys() if s.endswith(f'/{q}') and markets[s].get('type') == 'future']
-                else:
-                    # 过滤现货交易对
-                    candidates = [s for s in markets.keys() if s.endswith(f'/{q}') and markets[s].get('type') == 'spot']
-                
-                logger.info(f"{name} [{market_type}] 找到 {len(candidates)} 个候选交易对")
-                
-                # 批量获取
-                tickers = {}
-                try:
-                    if getattr(inst, 'has', {}).get('fetchTickers'):
-                        tickers = inst.fetch_tickers(candidates)
-                        logger.info(f"{name} 批量获取tickers成功")
-                except Exception as bulk_err:
-                    logger.warning(f"{name} 批量fetchTickers失败: {bulk_err}")
-                    tickers = {}
-                
-                valid_count = 0
-                for sym in candidates:
-                    try:
-                        t = tickers.get(sym) if tickers else inst.fetch_ticker(sym)
-                        qv = self._estimate_quote_volume(t)
-                        if qv and qv > mv:
-                            aggregated.append(sym)
-                            exchange_by_symbol[sym] = name
-                            valid_count += 1
-                    except Exception as e:
-                        logger.debug(f"{name} 获取 {sym} ticker 失败: {e}")
-                        continue
-                
-                logger.info(f"{name} 有效交易对数量: {valid_count}")
-                
-            except Exception as e:
-                logger.error(f"获取 {name} 交易对列表失败: {e}")
-                continue
+        # 根据市场类型过滤交易对
+        if market_type == 'future':
+            # 过滤合约交易对
+            candidates = [s for s in markets.keys() if s.endswith(f'/{q}') and markets[s].get('type') == 'future']
+        else:
+            # 过滤现货交易对
+            candidates = [s for s in markets.keys() if s.endswith(f'/{q}') and markets[s].get('type') == 'spot']
         
-        # 去重并保存映射
-        unique_symbols = sorted(list(set(aggregated)))
+        logger.info(f"{name} [{market_type}] 找到 {len(candidates)} 个候选交易对")
+        return candidates
+
+    @staticmethod
+    def _tickers_key(name: str, ex_conf: Dict, quote_currency: str) -> Tuple:
+        """交易所批量 ticker 的缓存键"""
+        return ('tickers', name, ex_conf.get('options', {}).get('defaultType', 'spot'), quote_currency)
+
+    def _ticker_entries(self, key: Tuple, symbols: List[str]) -> Tuple[Dict[str, Tuple[float, Optional[Dict]]], List[str]]:
+        """
+        缓存中的 ticker 条目 {交易对: (获取时间, ticker)}，以及 symbols 中缺失或超过 ticker_ttl 需要请求的交易对
+
+        按交易对记录获取时间，后续调用的交易对列表与缓存时不同时只请求缺少的部分。
+        """
+        ttl = CACHE_CONFIG.get('ticker_ttl', 30)
+        entries: Dict[str, Tuple[float, Optional[Dict]]] = dict(self.cache.get(key) or {})
+        now = time.time()
+        missing = [s for s in symbols if s not in entries or now - entries[s][0] > ttl]
+        return entries, missing
+
+    def _merge_tickers(self, key: Tuple, entries: Dict[str, Tuple[float, Optional[Dict]]], symbols: List[str],
+                       requested: List[str], fetched: Optional[Dict[str, Dict]]) -> Dict[str, Dict]:
+        """
+        把新获取的 ticker 并入缓存条目，返回 symbols 中有 ticker 的部分
+
+        请求过但交易所没有返回的交易对记为 None，ticker_ttl 内不再重复请求。
+        """
+        ttl = CACHE_CONFIG.get('ticker_ttl', 30)
+        now = time.time()
+        if requested:
+            fetched = fetched or {}
+            for symbol in requested:
+                entries[symbol] = (now, fetched.get(symbol))
+            self.cache.set(key, entries, ttl)
+        return {s: entries[s][1] for s in symbols
+                if s in entries and entries[s][1] and now - entries[s][0] <= ttl}
+
+    def merge_streamed_tickers(self, name: str, tickers: Dict[str, Dict]) -> None:
+        """
+        把实时推送的 ticker 并入与 REST 相同的缓存条目（交易对筛选与预筛选各自的缓存键），
+        ticker_ttl 内这些交易对不再通过 fetch_tickers 请求
+
+        与扫描线程同时合并时后写入的一方覆盖对方新增的条目，被覆盖的交易对下次照常请求。
+        """
+        ex_conf = next((conf for n, conf, _ in self.exchanges if n == name), None)
+        if ex_conf is None or not tickers:
+            return
+        tickers = {symbol: dict(ticker, symbol=symbol) for symbol, ticker in tickers.items()}
+        by_quote: Dict[str, List[str]] = {}
+        for symbol in tickers:
+            by_quote.setdefault(symbol.split('/')[-1].split(':')[0], []).append(symbol)
+        keys = [(('scan_tickers', name), list(tickers))]
+        keys += [(self._tickers_key(name, ex_conf, quote), symbols) for quote, symbols in by_quote.items()]
+        for key, symbols in keys:
+            entries, _ = self._ticker_entries(key, [])
+            self._merge_tickers(key, entries, [], symbols, tickers)
+
+    def _valid_symbols(self, name: str, candidates: List[str], tickers: Dict[str, Dict],
+                       min_volume: float) -> List[Tuple[str, float]]:
+        """成交额超过 min_volume 的 (交易对, 24小时成交额)；没有 ticker 的交易对计数后跳过"""
+        valid: List[Tuple[str, float]] = []
+        without_ticker = 0
+        for sym in candidates:
+            t = tickers.get(sym)
+            if not t:
+                without_ticker += 1
+                continue
+            qv = self._estimate_quote_volume(t)
+            if qv and qv > min_volume:
+                valid.append((sym, qv))
+        if without_ticker:
+            logger.info(f"{name} {without_ticker} 个候选交易对没有获取到 ticker，已跳过")
+        return valid
+
+    def _listed_symbols(self, name: str, ex_conf: Dict, candidates: List[str], key: Tuple,
+                        entries: Dict[str, Tuple[float, Optional[Dict]]], requested: List[str],
+                        fetched: Optional[Dict[str, Dict]], min_volume: float) -> List[Tuple[str, float]]:
+        """
+        合并本次获取的 ticker 后按成交额筛选交易所的候选交易对（同步、异步后端共用）
+
+        Args:
+            key, entries, requested: _tickers_key() / _ticker_entries() 的结果
+            fetched: 对 requested 实际获取到的 ticker
+            min_volume: 交易所未配置 min_volume_usd 时使用的成交额下限
+        """
+        tickers = self._merge_tickers(key, entries, candidates, requested, fetched)
+        valid = self._valid_symbols(name, candidates, tickers, ex_conf.get('min_volume_usd', min_volume))
+        logger.info(f"{name} 有效交易对数量: {len(valid)}")
+        return valid
+
+    def _collect_symbols(self, listed: Iterable[Tuple[str, Dict, List[Tuple[str, float]]]]) -> List[str]:
+        """由各交易所的 (name, conf, [(交易对, 成交额)]) 建立交易对全集并选出每个交易对的交易所"""
+        universe = SymbolUniverse()
+        for name, ex_conf, valid in listed:
+            for sym, qv in valid:
+                universe.add(sym, name, qv, ex_conf.get('priority', 999))
+        return self._finalize_symbols(universe)
+
+    def _finalize_symbols(self, universe: SymbolUniverse) -> List[str]:
+        """保存交易对全集，每个交易对映射到选中的交易所"""
+        unique_symbols = universe.symbols()
+        self.universe = universe
         self.symbols = unique_symbols
-        self.exchange_by_symbol = exchange_by_symbol
-        logger.info(f"聚合得到 {len(unique_symbols)} 个可交易对")
+        self.exchange_by_symbol = universe.exchange_by_symbol()
+        stats = universe.stats()
+        logger.info(f"聚合得到 {len(unique_symbols)} 个可交易对（{stats['listings']} 条上市记录，"
+                    f"{stats['multi_venue']} 个在多个交易所上市，按 {universe.selection} 选择交易所）")
         
         if not unique_symbols:
             logger.warning("未找到符合条件的交易对，请检查网络连接或调整筛选条件")
@@ -194,56 +237,39 @@ class CryptoAnalyzer:
         
         return unique_symbols
 
-    def get_exchange_status(self) -> Dict[str, Dict[str, Any]]:
-        """获取所有交易所的状态信息"""
-        status = {}
-        
-        for name, ex_conf, inst in self.exchanges:
-            try:
-                # 测试基本连接
-                markets = inst.load_markets()
-                market_count = len(markets)
-                
-                # 测试获取ticker
-                test_symbols = list(markets.keys())[:5]  # 测试前5个交易对
-                ticker_success = 0
-                
-                for symbol in test_symbols:
-                    try:
-                        ticker = inst.fetch_ticker(symbol)
-                        if ticker:
-                            ticker_success += 1
-                    except:
-                        pass
-                
-                status[name] = {
-                    'enabled': True,
-                    'connected': True,
-                    'market_count': market_count,
-                    'ticker_success_rate': ticker_success / len(test_symbols) if test_symbols else 0,
-                    'description': ex_conf.get('description', ''),
-                    'priority': ex_conf.get('priority', 999),
-                    'quote_currency': ex_conf.get('quote_currency', 'USDT'),
-                    'min_volume_usd': ex_conf.get('min_volume_usd', 0)
-                }
-                
-            except Exception as e:
-                status[name] = {
-                    'enabled': True,
-                    'connected': False,
-                    'error': str(e),
-                    'description': ex_conf.get('description', ''),
-                    'priority': ex_conf.get('priority', 999),
-                    'quote_currency': ex_conf.get('quote_currency', 'USDT'),
-                    'min_volume_usd': ex_conf.get('min_volume_usd', 0)
-                }
-        
+    def _build_exchange_status(self, ex_conf: Dict, market_count: int, health: Dict[str, Any]) -> Dict[str, Any]:
+        """由配置、已加载的市场数量和健康监控汇总构造单个交易所的状态信息"""
+        status = {
+            'enabled': True,
+            'description': ex_conf.get('description', ''),
+            'priority': ex_conf.get('priority', 999),
+            'quote_currency': ex_conf.get('quote_currency', 'USDT'),
+            'min_volume_usd': ex_conf.get('min_volume_usd', 0),
+            'market_count': market_count,
+        }
+        status.update(health)
+        if not status['connected']:
+            status['error'] = health.get('last_error') or '连续请求失败'
         return status
 
-    def get_exchange_statistics(self) -> Dict[str, Any]:
-        """获取交易所统计信息"""
-        status = self.get_exchange_status()
-        
+    def get_exchange_status_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各交易所的状态，全部来自健康监控的汇总，不发出请求"""
+        return {
+            name: self._build_exchange_status(ex_conf, len(getattr(inst, 'markets', None) or {}),
+                                              self.health.status(name))
+            for name, ex_conf, inst in self.exchanges
+        }
+
+    @staticmethod
+    def _ping_request(inst) -> Tuple[str, Callable[[], Any]]:
+        """空闲探测使用的最轻量请求：支持时用 fetch_time，否则获取一个交易对的 ticker"""
+        if getattr(inst, 'has', {}).get('fetchTime'):
+            return 'fetch_time', inst.fetch_time
+        symbol = next(iter(getattr(inst, 'markets', None) or {}), None)
+        return 'fetch_ticker', lambda: inst.fetch_ticker(symbol)
+
+    def _summarize_exchange_status(self, status: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """根据交易所状态汇总统计信息"""
         total_exchanges = len(status)
         connected_exchanges = sum(1 for s in status.values() if s.get('connected', False))
         total_markets = sum(s.get('market_count', 0) for s in status.values())
@@ -262,45 +288,23 @@ class CryptoAnalyzer:
             'status_details': status
         }
 
-    def _get_exchange_for_symbol(self, symbol: str):
-        """根据交易对获取对应的交易所实例"""
-        name = self.exchange_by_symbol.get(symbol)
-        if not name:
-            # 回退：第一个实例
-            return self.exchanges[0][2] if self.exchanges else None
-        for n, _, inst in self.exchanges:
-            if n == name:
-                return inst
-        return None
-
-    def get_ohlcv_data(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> pd.DataFrame:
-        """获取K线数据，仅使用真实API数据"""
-        inst = self._get_exchange_for_symbol(symbol)
-        if not inst:
-            logger.error(f"无法找到 {symbol} 对应的交易所实例")
+    def _ohlcv_to_dataframe(self, symbol: str, ohlcv: List[List[float]]) -> pd.DataFrame:
+        """将 ccxt 返回的K线列表转换为 DataFrame"""
+        if ohlcv is None or len(ohlcv) == 0:
+            logger.warning(f"{symbol} 返回空数据")
             return pd.DataFrame()
         
-        try:
-            ohlcv = inst.fetch_ohlcv(symbol, timeframe, limit=limit)
-            if not ohlcv:
-                logger.warning(f"{symbol} 返回空数据")
-                return pd.DataFrame()
-                
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
-            # 验证数据质量
-            if df.empty or df['volume'].sum() == 0:
-                logger.warning(f"{symbol} 数据质量不佳，跳过")
-                return pd.DataFrame()
-                
-            logger.debug(f"成功获取 {symbol} 的 {len(df)} 条K线数据")
-            return df
-            
-        except Exception as e:
-            logger.error(f"获取 {symbol} 的OHLCV数据失败: {e}")
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        
+        # 验证数据质量
+        if df.empty or df['volume'].sum() == 0:
+            logger.warning(f"{symbol} 数据质量不佳，跳过")
             return pd.DataFrame()
+        
+        logger.debug(f"成功获取 {symbol} 的 {len(df)} 条K线数据")
+        return df
 
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
@@ -318,140 +322,188 @@ class CryptoAnalyzer:
         df['price_volatility'] = df['price_change'].rolling(window=INDICATOR_CONFIG.get('price_volatility_period', 10)).std()
         return df
 
-    def identify_trading_opportunities(self, symbol: str) -> Dict:
-        """识别交易机会，仅使用真实API数据"""
-        try:
-            df = self.get_ohlcv_data(symbol, '1h', 100)  # 增加数据量以确保有30根K线
-            if df.empty or len(df) < 20:
-                logger.debug(f"{symbol} 数据不足，跳过分析")
-                return {}
-            
-            df = self.calculate_indicators(df)
-            if df.empty or len(df) < 20:
-                logger.debug(f"{symbol} 指标计算后数据不足，跳过分析")
-                return {}
-            
-            latest = df.iloc[-1]
-            
-            # 验证数据有效性
-            if (pd.isna(latest['volume']) or latest['volume'] <= 0 or
-                pd.isna(latest['close']) or latest['close'] <= 0):
-                logger.debug(f"{symbol} 最新数据无效，跳过分析")
-                return {}
-            
-            # 计算交易量比率（当前K线交易量 / 前30根K线平均交易量）
-            if len(df) < 31:
-                logger.debug(f"{symbol} 数据不足31根K线，跳过分析")
-                return {}
-            
-            # 当前K线交易量
-            current_volume = latest['volume']
-            
-            # 前30根K线的平均交易量
-            previous_30_volumes = df['volume'].iloc[-31:-1]  # 排除当前K线，取前30根
-            avg_volume_30 = previous_30_volumes.mean()
-            
-            if pd.isna(avg_volume_30) or avg_volume_30 <= 0:
-                logger.debug(f"{symbol} 前30根K线平均交易量无效，跳过分析")
-                return {}
-            
-            # 计算交易量倍数
-            volume_ratio = current_volume / avg_volume_30
-            
-            # 计算移动平均线
-            ma5 = latest['MA5'] if not pd.isna(latest['MA5']) else 0
-            ma10 = latest['MA10'] if not pd.isna(latest['MA10']) else 0
-            ma20 = latest['MA20'] if not pd.isna(latest['MA20']) else 0
-            
-            # 判断MA排列
-            ma_bullish = (ma5 > ma10 > ma20) and (ma5 > 0 and ma10 > 0 and ma20 > 0)
-            ma_bearish = (ma5 < ma10 < ma20) and (ma5 > 0 and ma10 > 0 and ma20 > 0)
-            
-            # 生成交易信号和推荐状态
-            signal = 'none'
-            is_recommended = False
-            
-            # 5倍阈值推荐逻辑
-            if volume_ratio >= 5.0:
-                is_recommended = True
-                if ma_bullish:
-                    signal = 'long'
-                elif ma_bearish:
-                    signal = 'short'
-                else:
-                    signal = 'hold'  # 超过5倍但MA不明确
-            elif volume_ratio >= INDICATOR_CONFIG.get('volume_ratio_threshold', 3.0):
-                # 3-5倍之间，根据MA排列判断
-                if ma_bullish:
-                    signal = 'long'
-                elif ma_bearish:
-                    signal = 'short'
-            
-            # 计算24小时价格变化
-            price_change_24h = 0.0
-            if len(df) >= 24:
-                price_24h_ago = df['close'].iloc[-24]
-                if not pd.isna(price_24h_ago) and price_24h_ago > 0:
-                    price_change_24h = (latest['close'] - price_24h_ago) / price_24h_ago
-            
-            exchange_name = self.exchange_by_symbol.get(symbol, 'unknown')
-            
-            result = {
-                'symbol': symbol,
-                'exchange': exchange_name,
-                'current_price': float(latest['close']),
-                'volume_ratio': float(volume_ratio),
-                'current_volume': float(current_volume),
-                'avg_volume_30': float(avg_volume_30),
-                'ma5': float(ma5),
-                'ma10': float(ma10),
-                'ma20': float(ma20),
-                'signal': signal,
-                'is_recommended': is_recommended,
-                'price_change_24h': float(price_change_24h),
-                'volatility': float(latest['price_volatility']) if not pd.isna(latest['price_volatility']) else 0.0
-            }
-            
-            logger.debug(f"{symbol} 分析完成: {signal} 信号, 交易量比率: {volume_ratio:.2f}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"识别交易机会失败 {symbol}: {e}")
+    def _analyze_dataframe(self, symbol: str, df: pd.DataFrame) -> Dict:
+        """根据K线数据识别交易机会"""
+        if df.empty or len(df) < 20:
+            logger.debug(f"{symbol} 数据不足，跳过分析")
             return {}
-
-    def get_top_opportunities(self, top_n: int = 20, sort_by: str = 'volume_ratio') -> List[Dict]:
-        """获取前N个交易机会，支持多种排序方式"""
-        symbols = self.symbols or self.get_tradable_symbols()
-        if not symbols:
-            logger.warning("没有可用的交易对")
-            return []
         
-        logger.info(f"开始分析 {len(symbols)} 个交易对...")
-        opportunities = []
+        df = self.calculate_indicators(df)
+        if df.empty or len(df) < 20:
+            logger.debug(f"{symbol} 指标计算后数据不足，跳过分析")
+            return {}
         
-        for i, symbol in enumerate(symbols, 1):
-            try:
-                opp = self.identify_trading_opportunities(symbol)
-                if opp:  # 包含所有有数据的交易对
-                    # 添加综合评分
-                    opp['composite_score'] = self._calculate_composite_score(opp)
-                    opportunities.append(opp)
-                    logger.debug(f"分析完成: {symbol} - 比率: {opp['volume_ratio']:.2f}x, 推荐: {opp.get('is_recommended', False)}")
-                
-                # 显示进度
-                if i % 50 == 0 or i == len(symbols):
-                    logger.info(f"分析进度: {i}/{len(symbols)} ({i/len(symbols)*100:.1f}%)")
-                    
-            except Exception as e:
-                logger.error(f"分析 {symbol} 失败: {e}")
+        latest = df.iloc[-1]
+        
+        # 验证数据有效性
+        if (pd.isna(latest['volume']) or latest['volume'] <= 0 or
+            pd.isna(latest['close']) or latest['close'] <= 0):
+            logger.debug(f"{symbol} 最新数据无效，跳过分析")
+            return {}
+        
+        # 计算交易量比率（当前K线交易量 / 前30根K线平均交易量）
+        if len(df) < 31:
+            logger.debug(f"{symbol} 数据不足31根K线，跳过分析")
+            return {}
+        
+        # 当前K线交易量
+        current_volume = latest['volume']
+        
+        # 前30根K线的平均交易量
+        previous_30_volumes = df['volume'].iloc[-31:-1]  # 排除当前K线，取前30根
+        avg_volume_30 = previous_30_volumes.mean()
+        
+        if pd.isna(avg_volume_30) or avg_volume_30 <= 0:
+            logger.debug(f"{symbol} 前30根K线平均交易量无效，跳过分析")
+            return {}
+        
+        # 计算交易量倍数
+        volume_ratio = current_volume / avg_volume_30
+        
+        # 计算移动平均线
+        ma5 = latest['MA5'] if not pd.isna(latest['MA5']) else 0
+        ma10 = latest['MA10'] if not pd.isna(latest['MA10']) else 0
+        ma20 = latest['MA20'] if not pd.isna(latest['MA20']) else 0
+        
+        # 生成交易信号和推荐状态
+        signal, is_recommended = self._classify_signal(volume_ratio, ma5, ma10, ma20)
+        
+        # 计算24小时价格变化
+        price_change_24h = 0.0
+        if len(df) >= 24:
+            price_24h_ago = df['close'].iloc[-24]
+            if not pd.isna(price_24h_ago) and price_24h_ago > 0:
+                price_change_24h = (latest['close'] - price_24h_ago) / price_24h_ago
+        
+        exchange_name = self.exchange_by_symbol.get(symbol, 'unknown')
+        
+        result = {
+            'symbol': symbol,
+            'exchange': exchange_name,
+            'current_price': float(latest['close']),
+            'volume_ratio': float(volume_ratio),
+            'current_volume': float(current_volume),
+            'avg_volume_30': float(avg_volume_30),
+            'ma5': float(ma5),
+            'ma10': float(ma10),
+            'ma20': float(ma20),
+            'signal': signal,
+            'is_recommended': is_recommended,
+            'price_change_24h': float(price_change_24h),
+            'volatility': float(latest['price_volatility']) if not pd.isna(latest['price_volatility']) else 0.0
+        }
+        
+        logger.debug(f"{symbol} 分析完成: {signal} 信号, 交易量比率: {volume_ratio:.2f}")
+        return result
+
+    @staticmethod
+    def _classify_signal(volume_ratio: float, ma5: float, ma10: float, ma20: float) -> Tuple[str, bool]:
+        """根据交易量倍数与MA排列生成 (交易信号, 是否推荐)"""
+        return classify_signal(volume_ratio, ma5, ma10, ma20)
+
+    def _analyze_bars_batch(self, symbols: List[str], bars_list: List[Optional[np.ndarray]]) -> List[Dict]:
+        """批量分析：全部交易对的K线一次性向量化计算指标，结果与逐个 _analyze_dataframe 一致"""
+        closes, volumes, lengths = stack_bars(bars_list)
+        latest = latest_indicators(closes, volumes, lengths)
+        
+        results: List[Dict] = []
+        for row, symbol in enumerate(symbols):
+            if not latest['valid'][row]:
+                logger.debug(f"{symbol} 数据不足或无效，跳过分析")
+                results.append({})
                 continue
+            results.append(self._build_opportunity(symbol, {key: values[row] for key, values in latest.items()}))
+        return results
+
+    def _table_from_bars(self, symbols: List[str], bars_list: List[Optional[np.ndarray]]) -> OpportunityTable:
+        """批量计算指标后直接构造列式结果，不生成逐行字典"""
+        closes, volumes, lengths = stack_bars(bars_list)
+        latest = latest_indicators(closes, volumes, lengths)
+        exchanges = [self.exchange_by_symbol.get(symbol, 'unknown') for symbol in symbols]
+        return OpportunityTable.from_indicators(symbols, exchanges, latest)
+
+    def _rank_table(self, table: OpportunityTable, top_n: Optional[int], sort_by: str) -> OpportunityTable:
+        """列式结果的评分与排序，行内容和顺序与 _rank_opportunities 一致"""
+        table.score()
+        ranked = table.top(top_n, sort_by)
+        universe = getattr(self, 'universe', None) if SYMBOL_FILTER.get('aggregate_venues', False) else None
+        if universe is not None and len(ranked):
+            aggregates = [universe.aggregate(str(symbol)) for symbol in ranked.data['symbol']]
+            for name in ('venue_count', 'total_quote_volume_24h', 'venue_volume_share'):
+                ranked.extras[name] = np.array([a.get(name, np.nan) for a in aggregates], dtype=np.float64)
+        logger.info(f"找到 {len(table)} 个交易机会，返回前 {len(ranked)} 个")
+        return ranked
+
+    def _analyze_streaming(self, symbol: str, state: StreamingIndicators) -> Dict:
+        """根据流式指标状态生成分析结果，字段与 _analyze_dataframe 一致"""
+        values = state.values()
+        if not values['valid']:
+            return {}
+        return self._build_opportunity(symbol, values)
+
+    def get_streaming_opportunities(self, states: Iterable[Tuple[str, StreamingIndicators]], top_n: int = 20,
+                                    sort_by: str = 'volume_ratio',
+                                    fallback: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        根据流式指标状态排序交易机会
+        
+        Args:
+            states: (交易对, 流式指标状态) 序列
+            fallback: 最近一次全量扫描的结果，未被流式覆盖的交易对使用其中的结果
+        """
+        results: Dict[str, Dict] = {}
+        for opp in fallback or []:
+            results[opp['symbol']] = dict(opp)
+        for symbol, state in states:
+            opp = self._analyze_streaming(symbol, state)
+            if opp:
+                results[symbol] = opp
+        symbols = list(results)
+        return self._rank_opportunities(symbols, [results[s] for s in symbols], top_n, sort_by)
+
+    def _build_opportunity(self, symbol: str, values: Dict[str, Any]) -> Dict:
+        """由最新一根K线的指标值构造分析结果"""
+        volume_ratio = float(values['volume_ratio'])
+        ma5 = float(values['ma5'])
+        ma10 = float(values['ma10'])
+        ma20 = float(values['ma20'])
+        signal, is_recommended = self._classify_signal(volume_ratio, ma5, ma10, ma20)
+        return {
+            'symbol': symbol,
+            'exchange': self.exchange_by_symbol.get(symbol, 'unknown'),
+            'current_price': float(values['close']),
+            'volume_ratio': volume_ratio,
+            'current_volume': float(values['volume']),
+            'avg_volume_30': float(values['avg_volume_30']),
+            'ma5': ma5,
+            'ma10': ma10,
+            'ma20': ma20,
+            'signal': signal,
+            'is_recommended': is_recommended,
+            'price_change_24h': float(values['price_change_24h']),
+            'volatility': float(values['volatility'])
+        }
+
+    def _rank_opportunities(self, symbols: List[str], results: List[Dict], top_n: int, sort_by: str) -> List[Dict]:
+        """为分析结果添加综合评分并排序（results 与 symbols 一一对应）"""
+        opportunities = []
+        # 只负责排序的实例（扫描循环、协调器）可能没有交易对全集
+        universe = getattr(self, 'universe', None) if SYMBOL_FILTER.get('aggregate_venues', False) else None
+        for symbol, opp in zip(symbols, results):
+            if opp:  # 包含所有有数据的交易对
+                # 添加综合评分
+                opp['composite_score'] = self._calculate_composite_score(opp)
+                if universe is not None:
+                    opp.update(universe.aggregate(symbol))
+                opportunities.append(opp)
+                logger.debug(f"分析完成: {symbol} - 比率: {opp['volume_ratio']:.2f}x, 推荐: {opp.get('is_recommended', False)}")
         
         # 智能排序
         opportunities = self._smart_sort_opportunities(opportunities, sort_by)
         
         logger.info(f"找到 {len(opportunities)} 个交易机会，返回前 {min(top_n, len(opportunities))} 个")
         return opportunities[:top_n]
-    
+
     def _calculate_composite_score(self, opp: Dict) -> float:
         """计算综合评分"""
         try:
@@ -478,11 +530,11 @@ class CryptoAnalyzer:
             )
             
             return round(composite_score, 2)
-            
+        
         except Exception as e:
             logger.error(f"计算综合评分失败: {e}")
             return 0.0
-    
+
     def _smart_sort_opportunities(self, opportunities: List[Dict], sort_by: str) -> List[Dict]:
         """智能排序交易机会"""
         try:
@@ -513,32 +565,586 @@ class CryptoAnalyzer:
             else:
                 # 默认按交易量比率排序
                 return sorted(opportunities, key=lambda x: x.get('volume_ratio', 0), reverse=True)
-                
+        
         except Exception as e:
             logger.error(f"排序失败: {e}")
             # 回退到简单排序
             return sorted(opportunities, key=lambda x: x.get('volume_ratio', 0), reverse=True)
 
+    def _chart_cache_key(self, symbol: str, timeframe: str, limit: int) -> Tuple:
+        return ('chart', self.exchange_by_symbol.get(symbol, ''), symbol, timeframe, limit)
+
+    def get_coalescing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """并发请求合并统计，coalesced 即节省的上游请求数"""
+        return {'ohlcv': self.ohlcv_flight.stats(), 'chart': self.chart_flight.stats()}
+
+    def _build_chart_data(self, symbol: str, df: pd.DataFrame) -> Dict:
+        """计算指标并转换为图表数据"""
+        if df.empty:
+            return {}
+        df = self.calculate_indicators(df)
+        return {
+            'symbol': symbol,
+            'timestamps': df.index.strftime('%Y-%m-%d %H:%M').tolist(),
+            'prices': df['close'].tolist(),
+            'opens': df['open'].tolist(),
+            'highs': df['high'].tolist(),
+            'lows': df['low'].tolist(),
+            'volumes': df['volume'].tolist(),
+            'ma5': df['MA5'].tolist(),
+            'ma10': df['MA10'].tolist(),
+            'ma20': df['MA20'].tolist(),
+            'volume_ratio': df['volume_ratio'].tolist()
+        }
+
+
+class CryptoAnalyzer(AnalyzerBase):
+    def __init__(self, exchange_name: str = 'binance', exchanges: Optional[List[Tuple[str, Dict, Any]]] = None,
+                 cache: Optional[TTLCache] = None):
+        """
+        初始化加密货币分析器
+        
+        Args:
+            exchange_name: 兼容旧参数，不再仅依赖单一交易所
+            exchanges: 预先创建的 (name, conf, inst) 列表，传入时跳过交易所初始化
+            cache: 图表、ticker、交易所状态使用的缓存，默认与 app.py 共用 get_shared_cache()
+        """
+        self.exchange_name = exchange_name
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.market_cache = MarketCache() if MARKET_CACHE_CONFIG.get('enabled', True) else None
+        self.exchanges = exchanges if exchanges is not None else self._init_exchanges()
+        self.health: HealthMonitor = get_health_monitor()
+        for name, _, inst in self.exchanges:
+            self.health.register(name, lambda name=name, inst=inst: self._ping(name, inst))
+        self.symbols: List[str] = []
+        self.exchange_by_symbol: Dict[str, str] = {}
+        self.universe = SymbolUniverse()
+        self.candle_store = CandleStore() if DATA_CONFIG.get('candle_store', True) else None
+        self.candle_archive = CandleArchive() if ARCHIVE_CONFIG.get('enabled', True) else None
+        self._scanner: Optional[ConcurrentScanner] = None
+        self._sharded = None
+        self.prefilter_stats = {'checked': 0, 'skipped': 0}
+        # 预筛选开启时每个交易对最近一次算出的结果及其时间，被跳过的交易对沿用它，不从排行中消失
+        self._prefilter_rows: Dict[str, Dict] = {}
+        self._prefilter_computed_at: Dict[str, float] = {}
+        self.candle_providers: List[CandleProvider] = default_providers()
+        self.scheduler: Optional[RequestScheduler] = (
+            get_scheduler() if REQUEST_SCHEDULER_CONFIG.get('enabled', True) else None)
+        # 同一 (交易对, 周期, 数量) 的并发请求共享一次上游获取
+        self.ohlcv_flight = SingleFlight('ohlcv')
+        self.chart_flight = SingleFlight('chart')
+
+    def _init_exchange(self, ex: Dict) -> Optional[Tuple[str, Dict, Any]]:
+        """初始化单个交易所：优先从磁盘缓存恢复市场数据，否则在线加载"""
+        name = ex['name']
+        params = self._exchange_params(ex)
+        
+        try:
+            # 根据配置显示市场类型
+            market_type = ex.get('options', {}).get('defaultType', 'spot')
+            logger.info(f"正在初始化交易所: {name} ({ex.get('description', '')}) [{market_type} 市场]")
+            inst = getattr(ccxt, name)({**params, **get_transport().exchange_params()})
+            
+            # 设置更短的超时时间
+            inst.timeout = 10000  # 10秒超时
+            
+            if self.market_cache is not None:
+                fresh = self.market_cache.restore(name, ex, inst)
+                if fresh is not None:
+                    logger.info(f"✅ {name} 从缓存恢复，支持 {len(inst.markets)} 个交易对")
+                    if not fresh:
+                        self.market_cache.refresh_in_background(name, ex, inst)
+                    return name, ex, inst
+            
+            # 测试连接（带超时控制）
+            try:
+                markets = inst.load_markets()
+                logger.info(f"✅ {name} 初始化成功，支持 {len(markets)} 个交易对")
+                if self.market_cache is not None:
+                    self.market_cache.save(name, ex, inst)
+                return name, ex, inst
+            except Exception as test_err:
+                self._log_connect_error(name, test_err)
+                # 连接失败的交易所直接跳过，不添加到实例列表
+                return None
+        
+        except Exception as e:
+            logger.error(f"❌ 初始化交易所 {name} 失败: {e}")
+            return None
+
+    def _init_exchanges(self):
+        """并行初始化交易所实例，按优先级排序"""
+        enabled_exchanges = self._enabled_exchange_configs()
+        
+        logger.info(f"初始化 {len(enabled_exchanges)} 个启用的交易所")
+        
+        instances = []
+        if enabled_exchanges:
+            workers = min(len(enabled_exchanges), int(MARKET_CACHE_CONFIG.get('init_workers', 8)))
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='init') as pool:
+                # map 保持输入顺序，即优先级顺序
+                instances = [r for r in pool.map(self._init_exchange, enabled_exchanges) if r is not None]
+        
+        # 向后兼容：若未配置或全部禁用，则创建单一 exchange_name
+        if not instances:
+            logger.warning("没有启用的交易所，使用默认配置")
+            try:
+                params, conf = self._default_exchange_params()
+                inst = getattr(ccxt, self.exchange_name)({**params, **get_transport().exchange_params()})
+                instances.append((self.exchange_name, conf, inst))
+                logger.info(f"✅ 默认交易所 {self.exchange_name} 初始化成功")
+            except Exception as e:
+                logger.error(f"❌ 初始化默认交易所失败: {e}")
+        
+        logger.info(f"成功初始化 {len(instances)} 个交易所")
+        return instances
+
+    def get_tradable_symbols(self, quote_currency: str = 'USDT', min_volume: float = 1000000) -> List[str]:
+        """聚合多个交易所可交易对，按成交额过滤。支持现货和合约市场。"""
+        listed = []
+        
+        logger.info(f"开始获取交易对，最小交易量: ${min_volume:,.0f}")
+        
+        for name, ex_conf, inst in self.exchanges:
+            try:
+                # 获取市场类型
+                options = ex_conf.get('options', {})
+                market_type = options.get('defaultType', 'spot')
+                logger.info(f"正在处理交易所: {name} (市场类型: {market_type})")
+                
+                markets = inst.load_markets()
+                candidates = self._select_candidates(name, ex_conf, markets, quote_currency)
+                
+                # 批量获取（短时间内重复筛选时复用缓存，只请求缓存中缺少的交易对）
+                tickers_key = self._tickers_key(name, ex_conf, quote_currency)
+                entries, missing = self._ticker_entries(tickers_key, candidates)
+                fetched: Dict[str, Dict] = {}
+                if missing:
+                    try:
+                        if not getattr(inst, 'has', {}).get('fetchTickers'):
+                            fetched = self._fetch_tickers_one_by_one(name, inst, missing)
+                        else:
+                            fetched = self._request(name, inst, 'fetch_tickers', lambda: inst.fetch_tickers(missing))
+                            logger.info(f"{name} 批量获取 {len(missing)} 个tickers成功")
+                    except Exception as bulk_err:
+                        logger.warning(f"{name} 批量fetchTickers失败: {bulk_err}")
+                        fetched = self._fetch_tickers_one_by_one(name, inst, missing)
+                listed.append((name, ex_conf, self._listed_symbols(
+                    name, ex_conf, candidates, tickers_key, entries, missing, fetched, min_volume)))
+            
+            except Exception as e:
+                logger.error(f"获取 {name} 交易对列表失败: {e}")
+                continue
+        
+        return self._collect_symbols(listed)
+
+    def get_exchange_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有交易所的状态信息（来自健康监控，不发出请求）"""
+        return self.get_exchange_status_snapshot()
+
+    def _ping(self, name: str, inst) -> None:
+        method, fn = self._ping_request(inst)
+        self._request(name, inst, method, fn)
+
+    def get_exchange_statistics(self) -> Dict[str, Any]:
+        """获取交易所统计信息"""
+        return self._summarize_exchange_status(self.get_exchange_status())
+
+    def _fetch_tickers_one_by_one(self, name: str, inst, symbols: List[str]) -> Dict[str, Dict]:
+        """交易所不支持批量获取或批量获取失败时逐个获取 ticker，失败的交易对不出现在结果中"""
+        tickers: Dict[str, Dict] = {}
+        for sym in symbols:
+            try:
+                tickers[sym] = self._fetch_ticker_cached(name, inst, sym)
+            except Exception as e:
+                logger.debug(f"{name} 获取 {sym} ticker 失败: {e}")
+        return tickers
+
+    def _fetch_ticker_cached(self, name: str, inst, symbol: str) -> Dict:
+        """逐个获取 ticker（交易所不支持批量获取时），结果按交易对缓存"""
+        return self.cache.get_or_load(
+            ('ticker', name, symbol),
+            lambda: self._request(name, inst, 'fetch_ticker', lambda: inst.fetch_ticker(symbol)),
+            CACHE_CONFIG.get('ticker_ttl', 30))
+
+    def _request(self, name: str, inst, method: str, fn: Callable[[], Any]) -> Any:
+        """经请求调度器（令牌桶、优先通道、限速退避与重试）发出交易所请求，每次尝试都计入健康监控"""
+        fn = attributed(self.health.track(name, fn))
+        if self.scheduler is None:
+            return fn()
+        return self.scheduler.run(name, inst, method, fn)
+
+    def _get_exchange_for_symbol(self, symbol: str):
+        """根据交易对获取对应的交易所实例"""
+        name = self.exchange_by_symbol.get(symbol)
+        if not name:
+            # 回退：第一个实例
+            return self.exchanges[0][2] if self.exchanges else None
+        for n, _, inst in self.exchanges:
+            if n == name:
+                return inst
+        return None
+
+    def get_ohlcv_data(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> pd.DataFrame:
+        """获取K线数据，仅使用真实API数据；已有K线时只增量拉取新K线"""
+        bars = self.get_ohlcv_bars(symbol, timeframe, limit)
+        if bars is None:
+            return pd.DataFrame()
+        return self._ohlcv_to_dataframe(symbol, bars)
+
+    def get_ohlcv_bars(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Optional[np.ndarray]:
+        """获取K线为 (n, 6) 数组，不构造 DataFrame；失败时返回 None。并发的相同请求共享一次获取"""
+        return self.ohlcv_flight.do((symbol, timeframe, limit),
+                                    lambda: self._load_ohlcv_bars(symbol, timeframe, limit))
+
+    def _load_ohlcv_bars(self, symbol: str, timeframe: str, limit: int) -> Optional[np.ndarray]:
+        inst = self._get_exchange_for_symbol(symbol)
+        if not inst:
+            logger.error(f"无法找到 {symbol} 对应的交易所实例")
+            return None
+        
+        try:
+            if self.candle_store is None:
+                name = self.exchange_by_symbol.get(symbol) or self.exchanges[0][0]
+                ohlcv = self._request(name, inst, 'fetch_ohlcv',
+                                      lambda: inst.fetch_ohlcv(symbol, timeframe, limit=limit))
+                return np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+            
+            return self._fetch_into_store(inst, symbol, timeframe, limit)
+            
+        except Exception as e:
+            logger.error(f"获取 {symbol} 的OHLCV数据失败: {e}")
+            return None
+
+    def _fetch_into_store(self, inst, symbol: str, timeframe: str, limit: int) -> np.ndarray:
+        """通过K线存储获取最近 limit 根K线"""
+        name = self.exchange_by_symbol.get(symbol) or self.exchanges[0][0]
+        key = (name, symbol, timeframe)
+        timeframe_ms = inst.parse_timeframe(timeframe) * 1000
+        now_ms = inst.milliseconds() if hasattr(inst, 'milliseconds') else time.time() * 1000
+        
+        if self.candle_archive is not None and key not in self.candle_store:
+            archived = self.candle_archive.read_bars(name, symbol, timeframe, self.candle_store.ring_length)
+            if archived is not None:
+                self.candle_store.seed(key, archived)
+        
+        mode, since = self.candle_store.plan(key, limit, timeframe_ms, now_ms)
+        if mode == 'cached':
+            self.candle_store.record_hit()
+        elif mode == 'incremental':
+            new_bars = self._request(name, inst, 'fetch_ohlcv',
+                                     lambda: inst.fetch_ohlcv(symbol, timeframe, since=since, limit=limit))
+            if self.candle_store.merge(key, new_bars, since):
+                self._archive_bars(name, symbol, timeframe, new_bars)
+            else:
+                logger.debug(f"{symbol} 增量K线存在缺口，改为全量获取")
+                mode = 'full'
+        if mode == 'full':
+            ohlcv = self._request(name, inst, 'fetch_ohlcv',
+                                  lambda: inst.fetch_ohlcv(symbol, timeframe, limit=limit))
+            self._archive_bars(name, symbol, timeframe, ohlcv)
+            if limit > self.candle_store.ring_length:
+                return np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+            self.candle_store.replace(key, ohlcv)
+        
+        bars = self.candle_store.tail(key, limit)
+        return bars if bars is not None else np.empty((0, 6))
+
+    def _archive_bars(self, exchange: str, symbol: str, timeframe: str, ohlcv: List[List[float]]) -> None:
+        if self.candle_archive is None or not ohlcv:
+            return
+        try:
+            self.candle_archive.append(exchange, symbol, timeframe, ohlcv)
+        except Exception as e:
+            logger.warning(f"归档 {symbol} K线失败: {e}")
+
+    def read_archived_candles(self, symbol: str, timeframe: str = '1h', limit: Optional[int] = None,
+                              exchange: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """从磁盘归档读取K线，返回列名 -> NumPy 数组视图（不构造 DataFrame）"""
+        if self.candle_archive is None:
+            return None
+        name = exchange or self.exchange_by_symbol.get(symbol) or (self.exchanges[0][0] if self.exchanges else None)
+        if name is None:
+            return None
+        return self.candle_archive.read(name, symbol, timeframe, limit)
+
+    def compact_candle_archive(self) -> int:
+        """合并K线归档分段，返回合并的交易对数量"""
+        if self.candle_archive is None:
+            return 0
+        return self.candle_archive.compact_all()
+
+    def identify_trading_opportunities(self, symbol: str) -> Dict:
+        """识别交易机会，仅使用真实API数据"""
+        try:
+            df = self.get_ohlcv_data(symbol, '1h', 100)  # 增加数据量以确保有30根K线
+            return self._analyze_dataframe(symbol, df)
+        
+        except Exception as e:
+            logger.error(f"识别交易机会失败 {symbol}: {e}")
+            return {}
+
+    def get_top_opportunities(self, top_n: int = 20, sort_by: str = 'volume_ratio',
+                              concurrent: Optional[bool] = None, batch: Optional[bool] = None) -> List[Dict]:
+        """获取前N个交易机会，支持多种排序方式
+        
+        Args:
+            concurrent: 是否并发扫描，默认读取 SCAN_CONFIG['concurrent']
+            batch: 是否先获取全部K线再批量向量化计算指标，默认读取 SCAN_CONFIG['batch_indicators']
+        """
+        symbols = self.symbols or self.get_tradable_symbols()
+        if not symbols:
+            logger.warning("没有可用的交易对")
+            return []
+        
+        logger.info(f"开始分析 {len(symbols)} 个交易对...")
+        if int(SCAN_CONFIG.get('processes', 1)) > 1 and len(symbols) > 1:
+            # 多进程分片：每个进程持有自己的交易所实例，结果按原顺序合并后统一排序
+            results = self._get_sharded_scanner().analyze(symbols, self.exchange_by_symbol, concurrent, batch)
+        else:
+            results = self.analyze_symbols(symbols, concurrent, batch)
+        
+        return self._rank_opportunities(symbols, results, top_n, sort_by)
+
+    def get_opportunity_table(self, top_n: Optional[int] = None, sort_by: str = 'volume_ratio',
+                              concurrent: Optional[bool] = None) -> OpportunityTable:
+        """
+        全量扫描结果的列式版本（OpportunityTable），排序规则与 get_top_opportunities 一致
+
+        批量指标路径下K线直接转换为结构化数组；多进程分片或逐个分析时由结果字典构造。
+
+        Args:
+            top_n: 返回前N个，None 表示全部
+        """
+        symbols = self.symbols or self.get_tradable_symbols()
+        if not symbols:
+            logger.warning("没有可用的交易对")
+            return OpportunityTable.empty()
+        
+        logger.info(f"开始分析 {len(symbols)} 个交易对...")
+        if int(SCAN_CONFIG.get('processes', 1)) > 1 and len(symbols) > 1:
+            table = OpportunityTable.from_records(
+                self._get_sharded_scanner().analyze(symbols, self.exchange_by_symbol, concurrent, None))
+        elif SCAN_CONFIG.get('batch_indicators', True) and not SCAN_CONFIG.get('ticker_prefilter', False):
+            table = self._table_from_bars(symbols, self.fetch_ohlcv_many(symbols, '1h', 100, concurrent))
+        else:
+            # 预筛选跳过的交易对沿用上次的结果字典，由 analyze_symbols 按原顺序合并
+            table = OpportunityTable.from_records(self.analyze_symbols(symbols, concurrent))
+        return self._rank_table(table, top_n, sort_by)
+
+    def analyze_symbols(self, symbols: List[str], concurrent: Optional[bool] = None,
+                        batch: Optional[bool] = None) -> List[Optional[Dict]]:
+        """
+        分析交易对（不排序），结果顺序与 symbols 一致，无数据时为空字典或 None
+
+        被预筛选跳过的交易对返回其最近一次算出的结果（副本），行不会从任何排行中消失；
+        价格和24小时涨跌按本次 ticker 更新，stale_since 为K线指标算出的时间。
+        """
+        candidates, skipped = self._prefilter_symbols(symbols)
+        if not skipped:
+            fetched = None
+            results = self._analyze_candidates(symbols, concurrent, batch)
+        else:
+            fetched = dict(zip(candidates, self._analyze_candidates(candidates, concurrent, batch)))
+            results = [fetched[symbol] if symbol in fetched else self._reused_row(symbol, skipped[symbol])
+                       for symbol in symbols]
+        if SCAN_CONFIG.get('ticker_prefilter', False):
+            now = time.time()
+            for symbol, opp in zip(symbols, results):
+                if fetched is not None and symbol not in fetched:
+                    continue
+                if opp:
+                    self._prefilter_rows[symbol] = dict(opp)
+                    self._prefilter_computed_at[symbol] = now
+                else:
+                    self._prefilter_rows.pop(symbol, None)
+                    self._prefilter_computed_at.pop(symbol, None)
+        return results
+
+    def _reused_row(self, symbol: str, ticker: Optional[Dict]) -> Dict:
+        """预筛选跳过的交易对：上次的结果，价格与24小时涨跌取自本次 ticker，并标记 stale_since"""
+        row = dict(self._prefilter_rows[symbol])
+        last = ticker.get('last') or ticker.get('close') if ticker else None
+        if last:
+            row['current_price'] = float(last)
+            if ticker.get('percentage') is not None:
+                row['price_change_24h'] = float(ticker['percentage']) / 100
+            elif ticker.get('open'):
+                row['price_change_24h'] = (float(last) - float(ticker['open'])) / float(ticker['open'])
+        row['stale_since'] = self._prefilter_computed_at.get(symbol, 0.0)
+        return row
+
+    def _analyze_candidates(self, symbols: List[str], concurrent: Optional[bool],
+                            batch: Optional[bool]) -> List[Optional[Dict]]:
+        if concurrent is None:
+            concurrent = SCAN_CONFIG.get('concurrent', True)
+        if batch is None:
+            batch = SCAN_CONFIG.get('batch_indicators', True)
+        
+        if batch:
+            bars_list = self.fetch_ohlcv_many(symbols, '1h', 100, concurrent)
+            return self._analyze_bars_batch(symbols, bars_list)
+        if concurrent and len(symbols) > 1:
+            return self._get_scanner().map(symbols, self.identify_trading_opportunities,
+                                           self.exchange_by_symbol.get)
+        return self._scan_serial(symbols, self.identify_trading_opportunities)
+
+    def _prefilter_symbols(self, symbols: List[str]) -> Tuple[List[str], Dict[str, Optional[Dict]]]:
+        """
+        用批量 ticker 和K线存储中的均量剔除交易量比率不可能达到阈值的交易对
+
+        没有已存K线、ticker 或不支持批量获取 ticker 的交易对保留为候选；还没有算出过结果（或所属交易所
+        已变化）的交易对也保留，跳过的交易对由 analyze_symbols 沿用上次的结果。
+
+        Returns:
+            (候选交易对, 跳过的交易对 -> 本次的 ticker)
+        """
+        if not SCAN_CONFIG.get('ticker_prefilter', False) or self.candle_store is None:
+            return symbols, {}
+        threshold = INDICATOR_CONFIG.get('volume_ratio_threshold', 3.0) / float(SCAN_CONFIG.get('prefilter_margin', 1.2))
+        period = int(INDICATOR_CONFIG.get('volume_ma_period', 30))
+        by_exchange: Dict[str, List[str]] = {}
+        for symbol in symbols:
+            by_exchange.setdefault(self.exchange_by_symbol.get(symbol) or self.exchanges[0][0], []).append(symbol)
+
+        skipped: Dict[str, Optional[Dict]] = {}
+        for name, ex_conf, inst in self.exchanges:
+            group = by_exchange.get(name)
+            if not group or ex_conf.get('options', {}).get('defaultType', 'spot') != 'spot':
+                # 合约K线交易量可能以张数计，与 ticker 的 baseVolume 单位不一致
+                continue
+            try:
+                tickers = self._scan_tickers(name, inst, group)
+                timeframe_ms = inst.parse_timeframe('1h') * 1000
+                now_ms = inst.milliseconds() if hasattr(inst, 'milliseconds') else time.time() * 1000
+            except Exception as e:
+                logger.warning(f"{name} 预筛选获取tickers失败，全部交易对照常扫描: {e}")
+                continue
+            for symbol in group:
+                previous = self._prefilter_rows.get(symbol)
+                if previous is None or previous.get('exchange') != name:
+                    continue
+                bars = self.candle_store.tail((name, symbol, '1h'), max(period, 24) + 2)
+                bound = volume_ratio_bound(tickers.get(symbol), bars, timeframe_ms, now_ms, period)
+                if bound is not None and bound < threshold:
+                    skipped[symbol] = tickers.get(symbol)
+
+        self.prefilter_stats['checked'] += len(symbols)
+        self.prefilter_stats['skipped'] += len(skipped)
+        if skipped:
+            logger.info(f"ticker 预筛选: {len(symbols)} 个交易对中跳过 {len(skipped)} 个"
+                        f"（交易量比率上界低于阈值），{len(symbols) - len(skipped)} 个获取K线")
+        return [symbol for symbol in symbols if symbol not in skipped], skipped
+
+    def _scan_tickers(self, name: str, inst, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        获取 symbols 的 ticker：未超过 ticker_ttl 的直接复用，其余合并为一次批量请求
+
+        按交易所缓存为 {交易对: (获取时间, ticker)}，分级重扫每次只请求其中一部分时也能复用。
+        """
+        key = ('scan_tickers', name)
+        entries, missing = self._ticker_entries(key, symbols)
+        if not getattr(inst, 'has', {}).get('fetchTickers'):
+            missing = []
+        fetched = self._request(name, inst, 'fetch_tickers', lambda: inst.fetch_tickers(missing)) if missing else None
+        return self._merge_tickers(key, entries, symbols, missing, fetched)
+
+    def fetch_ohlcv_many(self, symbols: List[str], timeframe: str = '1h', limit: int = 100,
+                         concurrent: Optional[bool] = None) -> List[Optional[np.ndarray]]:
+        """批量获取K线为 (n, 6) 数组，每个交易所使用成本最低的可用K线提供者，结果顺序与 symbols 一致"""
+        if concurrent is None:
+            concurrent = SCAN_CONFIG.get('concurrent', True)
+        
+        default_name = self.exchanges[0][0] if self.exchanges else None
+        chosen = {name: self._candle_provider_for(name, inst, concurrent) for name, _, inst in self.exchanges}
+        groups: Dict[int, List[int]] = {}
+        providers: Dict[int, CandleProvider] = {}
+        for index, symbol in enumerate(symbols):
+            provider = chosen.get(self.exchange_by_symbol.get(symbol) or default_name) or self.candle_providers[-1]
+            groups.setdefault(id(provider), []).append(index)
+            providers[id(provider)] = provider
+        
+        results: List[Optional[np.ndarray]] = [None] * len(symbols)
+        for key, indexes in groups.items():
+            fetched = providers[key].fetch(self, [symbols[i] for i in indexes], timeframe, limit)
+            for index, bars in zip(indexes, fetched):
+                results[index] = bars
+        return results
+
+    def _candle_provider_for(self, name: str, inst, concurrent: bool) -> CandleProvider:
+        for provider in self.candle_providers:
+            if not concurrent and isinstance(provider, ConcurrentProvider):
+                continue
+            if provider.supports(self, name, inst):
+                return provider
+        return self.candle_providers[-1]
+
+    def register_candle_provider(self, provider: CandleProvider, index: int = 0) -> None:
+        """注册自定义K线提供者，默认放在最前（优先使用）"""
+        self.candle_providers.insert(index, provider)
+
+    def get_candle_provider_stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """提供者名称 -> 交易所 -> 调用次数、交易对数量、请求数、平均请求耗时与总耗时"""
+        return {provider.name: provider.stats() for provider in self.candle_providers if provider.stats()}
+
+    def _scan_serial(self, symbols: List[str], fn: Callable[[str], Any]) -> List[Any]:
+        """逐个处理交易对，结果顺序与 symbols 一致，异常时结果为 None"""
+        results = []
+        for i, symbol in enumerate(symbols, 1):
+            try:
+                results.append(fn(symbol))
+            except Exception as e:
+                logger.error(f"分析 {symbol} 失败: {e}")
+                results.append(None)
+            
+            # 显示进度
+            if i % 50 == 0 or i == len(symbols):
+                logger.info(f"分析进度: {i}/{len(symbols)} ({i/len(symbols)*100:.1f}%)")
+        return results
+
+    def _get_scanner(self) -> ConcurrentScanner:
+        """延迟创建并发扫描器（交易所实例初始化后不再变化）"""
+        if self._scanner is None:
+            self._scanner = ConcurrentScanner(self.exchanges)
+        return self._scanner
+
+    def _get_sharded_scanner(self) -> 'ShardedScanner':
+        """延迟创建多进程分片扫描器（进程常驻，跨扫描复用各自的K线存储）"""
+        if self._sharded is None:
+            from sharded_scan import ShardedScanner
+            self._sharded = ShardedScanner(int(SCAN_CONFIG.get('processes', 1)))
+        return self._sharded
 
     def get_symbol_data_for_chart(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Dict:
+        key = self._chart_cache_key(symbol, timeframe, limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # 多个会话同时查看同一图表时只请求一次；图表请求走交互式通道，优先于后台扫描
+        with interactive():
+            return self.chart_flight.do(key, lambda: self._load_chart_data(key, symbol, timeframe, limit))
+
+    def _load_chart_data(self, key: Tuple, symbol: str, timeframe: str, limit: int) -> Dict:
+        cached = self.cache.get(key, count=False)
+        if cached is not None:
+            return cached
         try:
             df = self.get_ohlcv_data(symbol, timeframe, limit)
-            if df.empty:
-                return {}
-            df = self.calculate_indicators(df)
-            return {
-                'symbol': symbol,
-                'timestamps': df.index.strftime('%Y-%m-%d %H:%M').tolist(),
-                'prices': df['close'].tolist(),
-                'opens': df['open'].tolist(),
-                'highs': df['high'].tolist(),
-                'lows': df['low'].tolist(),
-                'volumes': df['volume'].tolist(),
-                'ma5': df['MA5'].tolist(),
-                'ma10': df['MA10'].tolist(),
-                'ma20': df['MA20'].tolist(),
-                'volume_ratio': df['volume_ratio'].tolist()
-            }
+            chart_data = self._build_chart_data(symbol, df)
         except Exception as e:
             logger.error(f"获取{symbol}图表数据失败: {e}")
-            return {} 
\ No newline at end of file
+            return {}
+        if chart_data:
+            self.cache.set(key, chart_data, CACHE_CONFIG.get('chart_ttl', 60))
+        return chart_data
+
+
+def create_analyzer(exchange_name: str = 'binance') -> AnalyzerBase:
+    """按 SCAN_CONFIG['backend'] 创建分析器：'sync' 使用同步 ccxt，'async' 使用 ccxt.async_support"""
+    if SCAN_CONFIG.get('backend', 'sync') == 'async':
+        from async_analyzer import SyncCryptoAnalyzer, unsupported_async_options
+        ignored = unsupported_async_options()
+        if ignored:
+            logger.warning(f"async 后端不支持以下已启用的配置，将被忽略: {', '.join(ignored)}")
+        return SyncCryptoAnalyzer(exchange_name)
+    return CryptoAnalyzer(exchange_name)
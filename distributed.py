@@ -0,0 +1,529 @@
+"""
+分布式扫描
+
+单台主机从一个出口 IP 无法同时满足全部交易所的限速。协调器（ScanCoordinator）把
+(交易所, 分片) 作为租约分配给任意数量的扫描节点（ScanWorker）：节点获取该交易所的可交易对，
+只分析哈希落在本分片的交易对，把逐个交易对的分析结果回报给协调器；
+协调器合并各分片最近一次的结果，get_top_opportunities 返回与单机分析器相同格式的排行。
+
+租约超时未完成或节点报错时重新分配，同一轮内失败超过 max_attempts 次的租约本轮放弃。
+节点扫描期间由后台线程每隔租约有效期的 1/3 续期一次；续期被拒绝（租约已被回收）时
+在下一批交易对之前停止扫描，不再回报。
+全部租约完成且距本轮开始超过 round_interval 后开始下一轮。
+
+传输层可替换，节点只依赖 acquire / renew / report 三个方法：
+    LocalClient   同一进程内直接调用协调器（测试、单机运行）
+    TcpClient     连接 CoordinatorServer，每行一个 JSON 请求/响应
+"""
+
+import hmac
+import ipaddress
+import json
+import socket
+import socketserver
+import threading
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import DISTRIBUTED_CONFIG, EXCHANGES, SYMBOL_FILTER
+from crypto_analyzer import AnalyzerBase, CryptoAnalyzer
+from sharded_scan import shard_of
+
+logger = logging.getLogger(__name__)
+
+PublishCallback = Callable[[List[Dict[str, Any]], Optional[datetime]], Any]
+AnalyzerFactory = Callable[[str], Optional[AnalyzerBase]]
+
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+
+def tracked_exchanges(include_disabled: Optional[bool] = None) -> List[Dict]:
+    """分布式扫描覆盖的交易所配置，按优先级排序"""
+    if include_disabled is None:
+        include_disabled = DISTRIBUTED_CONFIG.get('include_disabled', True)
+    exchanges = [ex for ex in EXCHANGES if include_disabled or ex.get('enabled', True)]
+    return sorted(exchanges, key=lambda ex: ex.get('priority', 999))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+class Lease:
+    """一个 (交易所, 分片) 的扫描租约"""
+
+    __slots__ = ('id', 'round', 'exchange', 'shard', 'shards', 'state', 'worker', 'expires', 'attempts')
+
+    def __init__(self, round_id: int, exchange: str, shard: int, shards: int):
+        self.id = uuid.uuid4().hex
+        self.round = round_id
+        self.exchange = exchange
+        self.shard = shard
+        self.shards = shards
+        self.state = PENDING
+        self.worker: Optional[str] = None
+        self.expires = 0.0
+        self.attempts = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'round': self.round, 'exchange': self.exchange,
+                'shard': self.shard, 'shards': self.shards, 'expires_in': max(0.0, self.expires - time.time())}
+
+
+class ScanCoordinator:
+    """分配扫描租约并合并各节点回报的结果"""
+
+    def __init__(self, exchanges: Optional[Sequence[str]] = None,
+                 shards_per_exchange: Optional[Any] = None,
+                 lease_ttl: Optional[float] = None,
+                 round_interval: Optional[float] = None,
+                 publish: Optional[PublishCallback] = None):
+        """
+        Args:
+            exchanges: 交易所名称，默认 tracked_exchanges()
+            shards_per_exchange: 每个交易所的分片数（整数，或 交易所 -> 分片数 的字典）
+            lease_ttl: 租约有效期（秒），节点可通过 renew 续期
+            round_interval: 两轮扫描开始时间的最小间隔（秒）
+            publish: 合并结果有变化时调用，参数与 SnapshotPublisher.publish 相同
+        """
+        self.exchanges = list(exchanges) if exchanges is not None else [ex['name'] for ex in tracked_exchanges()]
+        shards = shards_per_exchange if shards_per_exchange is not None else DISTRIBUTED_CONFIG.get(
+            'shards_per_exchange', 1)
+        self.shards = {name: max(1, int(shards.get(name, 1) if isinstance(shards, dict) else shards))
+                       for name in self.exchanges}
+        self.lease_ttl = float(lease_ttl or DISTRIBUTED_CONFIG.get('lease_ttl', 120))
+        self.round_interval = float(round_interval if round_interval is not None
+                                    else DISTRIBUTED_CONFIG.get('round_interval', 180))
+        self.max_attempts = int(DISTRIBUTED_CONFIG.get('max_attempts', 3))
+        self.publish = publish
+
+        self._lock = threading.Lock()
+        self._round = 0
+        self._round_started = 0.0
+        self._leases: Dict[str, Lease] = {}
+        # (交易所, 分片) -> 最近一次回报的结果
+        self._results: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._dirty = False
+        self._ranker = AnalyzerBase()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start_round_locked(self) -> None:
+        self._round += 1
+        self._round_started = time.time()
+        self._leases = {}
+        for name in self.exchanges:
+            for shard in range(self.shards[name]):
+                lease = Lease(self._round, name, shard, self.shards[name])
+                self._leases[lease.id] = lease
+        logger.info(f"开始第 {self._round} 轮分布式扫描: {len(self._leases)} 个租约")
+
+    def _maintain_locked(self, now: float) -> None:
+        """回收超时租约，必要时开始新一轮"""
+        for lease in self._leases.values():
+            if lease.state == LEASED and lease.expires < now:
+                logger.warning(f"租约超时: {lease.exchange}#{lease.shard} ({lease.worker})")
+                self._retry_locked(lease)
+        finished = all(lease.state in (DONE, FAILED) for lease in self._leases.values())
+        if finished and (self._round == 0 or now - self._round_started >= self.round_interval):
+            self._start_round_locked()
+
+    def _retry_locked(self, lease: Lease) -> None:
+        lease.worker = None
+        lease.state = FAILED if lease.attempts >= self.max_attempts else PENDING
+        if lease.state == FAILED:
+            logger.error(f"{lease.exchange}#{lease.shard} 本轮失败 {lease.attempts} 次，放弃")
+
+    def acquire(self, worker: str) -> Optional[Dict[str, Any]]:
+        """为节点分配一个待处理租约，没有时返回 None"""
+        now = time.time()
+        with self._lock:
+            self._maintain_locked(now)
+            for lease in self._leases.values():
+                if lease.state == PENDING:
+                    lease.state = LEASED
+                    lease.worker = worker
+                    lease.expires = now + self.lease_ttl
+                    lease.attempts += 1
+                    logger.debug(f"分配租约 {lease.exchange}#{lease.shard} -> {worker}")
+                    return lease.to_dict()
+        return None
+
+    def renew(self, lease_id: str, worker: str) -> bool:
+        """续期租约；租约已被回收或转给其他节点时返回 False"""
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None or lease.state != LEASED or lease.worker != worker:
+                return False
+            lease.expires = time.time() + self.lease_ttl
+            return True
+
+    def report(self, lease_id: str, worker: str, results: Optional[List[Dict[str, Any]]] = None,
+               error: Optional[str] = None) -> bool:
+        """
+        回报租约结果；error 非空时租约重新排队
+
+        Returns:
+            租约仍属于该节点并被接受时返回 True
+        """
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None or lease.state != LEASED or lease.worker != worker:
+                logger.warning(f"忽略过期租约的回报: {worker}")
+                return False
+            if error:
+                logger.warning(f"{worker} 扫描 {lease.exchange}#{lease.shard} 失败: {error}")
+                self._retry_locked(lease)
+                return True
+            lease.state = DONE
+            rows = [dict(row, exchange=lease.exchange) for row in results or [] if row]
+            self._results[(lease.exchange, lease.shard)] = rows
+            # 分片数调整后旧分片的结果不再保留
+            for key in [k for k in self._results if k[0] == lease.exchange and k[1] >= lease.shards]:
+                del self._results[key]
+            self._dirty = True
+        logger.info(f"{worker} 完成 {lease.exchange}#{lease.shard}: {len(rows)} 个交易对")
+        return True
+
+    def get_tradable_symbols(self) -> List[str]:
+        """已回报结果中的交易对"""
+        with self._lock:
+            rows = [row for part in self._results.values() for row in part]
+        return sorted({row['symbol'] for row in rows})
+
+    def get_top_opportunities(self, top_n: int = 20, sort_by: str = 'volume_ratio') -> List[Dict]:
+        """合并各分片最近的结果，评分排序方式与单机分析器相同"""
+        with self._lock:
+            keys = [(name, shard) for name in self.exchanges for shard in range(self.shards[name])]
+            rows = [dict(row) for key in keys for row in self._results.get(key, ())]
+        return self._ranker._rank_opportunities([row['symbol'] for row in rows], rows, top_n, sort_by)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for lease in self._leases.values():
+                counts[lease.state] = counts.get(lease.state, 0) + 1
+            return {
+                'round': self._round,
+                'leases': counts,
+                'workers': sorted({l.worker for l in self._leases.values() if l.worker}),
+                'results': sum(len(part) for part in self._results.values()),
+            }
+
+    def start(self, publish_interval: Optional[float] = None) -> None:
+        """后台维护租约，并在结果变化后发布合并排行"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        interval = float(publish_interval or DISTRIBUTED_CONFIG.get('publish_interval', 2))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='scan-coordinator', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                with self._lock:
+                    self._maintain_locked(time.time())
+                    dirty, self._dirty = self._dirty, False
+                if dirty and self.publish is not None:
+                    self.publish(self.get_top_opportunities(10 ** 9), datetime.now())
+            except Exception as e:
+                logger.error(f"协调器维护失败: {e}", exc_info=True)
+
+
+class LocalClient:
+    """同一进程内直接调用协调器"""
+
+    def __init__(self, coordinator: ScanCoordinator):
+        self.coordinator = coordinator
+
+    def acquire(self, worker: str) -> Optional[Dict[str, Any]]:
+        return self.coordinator.acquire(worker)
+
+    def renew(self, lease_id: str, worker: str) -> bool:
+        return self.coordinator.renew(lease_id, worker)
+
+    def report(self, lease_id: str, worker: str, results: Optional[List[Dict[str, Any]]] = None,
+               error: Optional[str] = None) -> bool:
+        return self.coordinator.report(lease_id, worker, results, error)
+
+
+def is_loopback(host: str) -> bool:
+    """监听地址是否只接受本机连接（主机名按解析结果判断，无法解析时视为非本机）"""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        return all(ipaddress.ip_address(info[4][0]).is_loopback
+                   for info in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+    except (OSError, ValueError):
+        return False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = {'ok': True, 'result': self.server.dispatch(json.loads(line))}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response, ensure_ascii=False, default=_json_default).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    """协调器的 TCP 服务：每行一个 JSON 请求 {"op": ..., "token": ..., 参数...}"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, coordinator: ScanCoordinator, host: Optional[str] = None, port: Optional[int] = None,
+                 token: Optional[str] = None):
+        """
+        Raises:
+            PermissionError: 监听非本机地址但没有配置 token（任何能连上的主机都可以领取租约、回报伪造结果）
+        """
+        self.coordinator = coordinator
+        self.token = token if token is not None else DISTRIBUTED_CONFIG.get('token', '')
+        address = (host or DISTRIBUTED_CONFIG.get('host', '127.0.0.1'),
+                   DISTRIBUTED_CONFIG.get('port', 8765) if port is None else port)
+        if not self.token and not is_loopback(address[0]):
+            raise PermissionError(f"协调器监听 {address[0]} 时必须设置 SCAN_COORDINATOR_TOKEN，"
+                                  f"否则网络上的任何主机都可以领取租约并回报结果")
+        super().__init__(address, _RequestHandler)
+
+    def dispatch(self, request: Dict[str, Any]) -> Any:
+        if self.token and not hmac.compare_digest(str(request.get('token', '')), self.token):
+            raise PermissionError("token 无效")
+        op = request.get('op')
+        worker = str(request.get('worker', ''))
+        if op == 'acquire':
+            return self.coordinator.acquire(worker)
+        if op == 'renew':
+            return self.coordinator.renew(request['lease'], worker)
+        if op == 'report':
+            return self.coordinator.report(request['lease'], worker, request.get('results'), request.get('error'))
+        if op == 'status':
+            return self.coordinator.status()
+        raise ValueError(f"未知操作: {op}")
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='coordinator-server', daemon=True)
+        thread.start()
+        logger.info(f"协调器监听 {self.server_address[0]}:{self.server_address[1]}")
+        return thread
+
+
+class TcpClient:
+    """连接 CoordinatorServer，断线后下次调用时重连"""
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, token: Optional[str] = None,
+                 timeout: float = 30.0):
+        self.address = (host or DISTRIBUTED_CONFIG.get('host', '127.0.0.1'),
+                        int(port or DISTRIBUTED_CONFIG.get('port', 8765)))
+        self.token = token if token is not None else DISTRIBUTED_CONFIG.get('token', '')
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def _call(self, op: str, **params: Any) -> Any:
+        payload = json.dumps(dict(params, op=op, token=self.token), ensure_ascii=False,
+                             default=_json_default).encode('utf-8') + b'\n'
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                    self._reader = self._sock.makefile('rb')
+                self._sock.sendall(payload)
+                line = self._reader.readline()
+                if not line:
+                    raise ConnectionError("协调器关闭了连接")
+            except OSError:
+                self.close()
+                raise
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', '协调器返回错误'))
+        return response.get('result')
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def acquire(self, worker: str) -> Optional[Dict[str, Any]]:
+        return self._call('acquire', worker=worker)
+
+    def renew(self, lease_id: str, worker: str) -> bool:
+        return bool(self._call('renew', lease=lease_id, worker=worker))
+
+    def report(self, lease_id: str, worker: str, results: Optional[List[Dict[str, Any]]] = None,
+               error: Optional[str] = None) -> bool:
+        return bool(self._call('report', lease=lease_id, worker=worker, results=results, error=error))
+
+
+def exchange_analyzer(name: str) -> Optional[AnalyzerBase]:
+    """按配置为单个交易所创建分析器（包括未启用的交易所）"""
+    conf = next((ex for ex in EXCHANGES if ex['name'] == name), None)
+    if conf is None:
+        return None
+    analyzer = CryptoAnalyzer(exchanges=[])
+    entry = analyzer._init_exchange(conf)
+    if entry is None:
+        return None
+    analyzer.exchanges = [entry]
+    return analyzer
+
+
+class LeaseLost(RuntimeError):
+    """租约已被协调器回收或转给其他节点"""
+
+
+class LeaseHeartbeat:
+    """扫描期间在后台线程中定期续期租约"""
+
+    def __init__(self, client: Any, lease_id: str, worker: str, interval: float):
+        """
+        Args:
+            client: LocalClient 或 TcpClient
+            interval: 续期间隔（秒）
+        """
+        self.client = client
+        self.lease_id = lease_id
+        self.worker = worker
+        self.interval = max(0.1, float(interval))
+        self.lost = threading.Event()
+        self.renewals = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.client.renew(self.lease_id, self.worker):
+                    self.lost.set()
+                    return
+                self.renewals += 1
+            except Exception as e:
+                # 通信失败时继续尝试，租约真正超时后下一次续期会被拒绝
+                logger.warning(f"续期租约失败: {e}")
+
+    def check(self) -> None:
+        """租约已丢失时抛出 LeaseLost"""
+        if self.lost.is_set():
+            raise LeaseLost("租约已被回收")
+
+
+class ScanWorker:
+    """扫描节点：循环领取租约、扫描并回报"""
+
+    def __init__(self, client: Any, worker_id: Optional[str] = None,
+                 analyzer_factory: Optional[AnalyzerFactory] = None,
+                 poll_interval: Optional[float] = None):
+        """
+        Args:
+            client: LocalClient 或 TcpClient
+            worker_id: 节点标识，默认 主机名-随机后缀
+            analyzer_factory: 交易所名称 -> 只包含该交易所的分析器，默认 exchange_analyzer
+            poll_interval: 没有租约时的等待（秒）
+        """
+        self.client = client
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.analyzer_factory = analyzer_factory or exchange_analyzer
+        self.poll_interval = float(poll_interval or DISTRIBUTED_CONFIG.get('poll_interval', 2))
+        self.chunk_size = max(1, int(DISTRIBUTED_CONFIG.get('scan_chunk', 50)))
+        self._analyzers: Dict[str, AnalyzerBase] = {}
+        self._stop = threading.Event()
+
+    def _analyzer(self, exchange: str) -> AnalyzerBase:
+        analyzer = self._analyzers.get(exchange)
+        if analyzer is None:
+            analyzer = self.analyzer_factory(exchange)
+            if analyzer is None:
+                raise RuntimeError(f"无法初始化交易所 {exchange}")
+            self._analyzers[exchange] = analyzer
+        return analyzer
+
+    def scan(self, lease: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        扫描租约对应的 (交易所, 分片)，返回有数据的分析结果
+
+        扫描期间每隔租约有效期的 1/3 续期；按 chunk_size 分批分析，续期被拒绝时在下一批之前抛出 LeaseLost。
+        """
+        exchange, shard, shards = lease['exchange'], lease['shard'], lease['shards']
+        ttl = lease.get('expires_in') or DISTRIBUTED_CONFIG.get('lease_ttl', 120)
+        with LeaseHeartbeat(self.client, lease['id'], self.worker_id, ttl / 3) as heartbeat:
+            analyzer = self._analyzer(exchange)
+            conf = analyzer.exchanges[0][1] if analyzer.exchanges else {}
+            symbols = analyzer.get_tradable_symbols(conf.get('quote_currency', SYMBOL_FILTER['quote_currency']),
+                                                    conf.get('min_volume_usd', SYMBOL_FILTER['min_volume_usd']))
+            mine = [s for s in symbols if shard_of(exchange, s, shards) == shard]
+            results: List[Dict[str, Any]] = []
+            for i in range(0, len(mine), self.chunk_size):
+                heartbeat.check()
+                results.extend(r for r in analyzer.analyze_symbols(mine[i:i + self.chunk_size]) if r)
+            heartbeat.check()
+        return results
+
+    def run_once(self) -> bool:
+        """处理一个租约；没有可领取的租约时返回 False"""
+        lease = self.client.acquire(self.worker_id)
+        if lease is None:
+            return False
+        logger.info(f"领取租约 {lease['exchange']}#{lease['shard']}/{lease['shards']}")
+        try:
+            results = self.scan(lease)
+        except LeaseLost:
+            # 租约已转给其他节点，回报会被忽略，直接放弃本次结果
+            logger.warning(f"{lease['exchange']}#{lease['shard']} 的租约已被回收，停止扫描")
+            return True
+        except Exception as e:
+            logger.error(f"扫描 {lease['exchange']}#{lease['shard']} 失败: {e}")
+            self.client.report(lease['id'], self.worker_id, None, str(e) or type(e).__name__)
+            return True
+        self.client.report(lease['id'], self.worker_id, results)
+        return True
+
+    def run(self) -> None:
+        """循环直到 stop()；与协调器的连接异常时等待后重试"""
+        logger.info(f"扫描节点 {self.worker_id} 已启动")
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.warning(f"与协调器通信失败: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,210 @@
+"""
+交易所健康监控
+
+分析器发出的每个交易所请求都经过 HealthMonitor.track()，被动记录耗时与成败：
+  - 最近 latency_samples 次请求的耗时，用于计算 p50 / p95 / p99
+  - window 秒内的请求数与失败率、最近一次成功时间、连续失败次数
+后台线程每 check_interval 秒汇总一次，读取状态只是查字典；某个交易所超过
+idle_after 秒没有请求时才发出一次轻量探测（fetch_time 或单个 ticker），
+不再为每次页面刷新调用 load_markets 和逐个 fetch_ticker。
+
+只有网络层错误（超时、限速、交易所不可用等）计为失败；BadSymbol 之类的业务错误说明交易所
+能正常响应，按成功计。
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import ccxt
+import numpy as np
+
+from config import HEALTH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def _is_failure(error: Exception) -> bool:
+    return isinstance(error, ccxt.NetworkError) or not isinstance(error, ccxt.BaseError)
+
+
+class ExchangeHealth:
+    """单个交易所的请求记录"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: Deque[float] = deque(maxlen=int(HEALTH_CONFIG.get('latency_samples', 200)))
+        self.outcomes: Deque[Tuple[float, bool]] = deque(maxlen=10000)
+        self.last_request: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_errors = 0
+        self.ping: Optional[Callable[[], Any]] = None
+
+    def record(self, latency: float, error: Optional[Exception]) -> None:
+        now = time.time()
+        self.last_request = now
+        failed = error is not None and _is_failure(error)
+        self.outcomes.append((now, not failed))
+        if failed:
+            self.consecutive_errors += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+        else:
+            self.latencies.append(latency)
+            self.consecutive_errors = 0
+            self.last_success = now
+
+    def summarize(self, now: float) -> Dict[str, Any]:
+        window = float(HEALTH_CONFIG.get('window', 300))
+        while self.outcomes and now - self.outcomes[0][0] > window:
+            self.outcomes.popleft()
+        requests = len(self.outcomes)
+        errors = sum(1 for _, ok in self.outcomes if not ok)
+        summary: Dict[str, Any] = {
+            # 未出现连续失败即视为可用；尚无请求时沿用初始化时 load_markets 成功的结论
+            'connected': self.consecutive_errors < int(HEALTH_CONFIG.get('max_consecutive_errors', 3)),
+            'requests': requests,
+            'error_rate': errors / requests if requests else 0.0,
+            'success_rate': 1 - errors / requests if requests else 1.0,
+            'last_success': self.last_success,
+            'last_error': self.last_error,
+            'consecutive_errors': self.consecutive_errors,
+            'idle_seconds': now - self.last_request if self.last_request is not None else None,
+        }
+        if self.latencies:
+            p50, p95, p99 = np.percentile(np.fromiter(self.latencies, dtype=np.float64), [50, 95, 99])
+            summary.update(latency_p50_ms=round(float(p50) * 1000, 1), latency_p95_ms=round(float(p95) * 1000, 1),
+                           latency_p99_ms=round(float(p99) * 1000, 1))
+        else:
+            summary.update(latency_p50_ms=None, latency_p95_ms=None, latency_p99_ms=None)
+        return summary
+
+
+class HealthMonitor:
+    """被动记录各交易所的请求质量，空闲时探测"""
+
+    def __init__(self, check_interval: Optional[float] = None, idle_after: Optional[float] = None):
+        self.check_interval = float(check_interval or HEALTH_CONFIG.get('check_interval', 15))
+        self.idle_after = float(idle_after or HEALTH_CONFIG.get('idle_after', 60))
+        self._lock = threading.Lock()
+        self._exchanges: Dict[str, ExchangeHealth] = {}
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _health(self, name: str) -> ExchangeHealth:
+        health = self._exchanges.get(name)
+        if health is None:
+            with self._lock:
+                health = self._exchanges.setdefault(name, ExchangeHealth(name))
+        return health
+
+    def register(self, name: str, ping: Optional[Callable[[], Any]] = None) -> None:
+        """登记交易所及其探测函数（同一交易所重复登记时使用最新的探测函数），并确保后台线程运行"""
+        health = self._health(name)
+        health.ping = ping
+        with self._lock:
+            self._summaries[name] = health.summarize(time.time())
+        self.start()
+
+    def record(self, name: str, latency: float, error: Optional[Exception] = None) -> None:
+        health = self._health(name)
+        with self._lock:
+            health.record(latency, error)
+
+    def track(self, name: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+        """包装请求函数：每次调用（包括重试）都记录耗时与成败"""
+        def tracked() -> Any:
+            start = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                self.record(name, time.perf_counter() - start, e)
+                raise
+            self.record(name, time.perf_counter() - start)
+            return result
+        return tracked
+
+    def track_async(self, name: str, fn: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        """track() 的协程版本"""
+        async def tracked() -> Any:
+            start = time.perf_counter()
+            try:
+                result = await fn()
+            except Exception as e:
+                self.record(name, time.perf_counter() - start, e)
+                raise
+            self.record(name, time.perf_counter() - start)
+            return result
+        return tracked
+
+    def status(self, name: str) -> Dict[str, Any]:
+        """最近一次汇总的状态（不发出请求）"""
+        summary = self._summaries.get(name)
+        if summary is None:
+            summary = self.refresh(name)
+        return summary
+
+    def refresh(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """重新汇总一个或全部交易所，返回最后汇总的结果"""
+        now = time.time()
+        names = [name] if name is not None else list(self._exchanges)
+        summary: Dict[str, Any] = {}
+        for exchange in names:
+            health = self._health(exchange)
+            with self._lock:
+                summary = self._summaries[exchange] = health.summarize(now)
+        return summary
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.probe_idle()
+                self.refresh()
+            except Exception as e:
+                logger.error(f"汇总交易所健康状态失败: {e}")
+
+    def probe_idle(self) -> None:
+        """对超过 idle_after 秒没有请求的交易所发出一次探测"""
+        now = time.time()
+        for health in list(self._exchanges.values()):
+            if health.ping is None:
+                continue
+            idle = now - health.last_request if health.last_request is not None else float('inf')
+            if idle < self.idle_after:
+                continue
+            try:
+                health.ping()
+            except Exception as e:
+                logger.debug(f"{health.name} 空闲探测失败: {e}")
+
+
+_monitor: Optional[HealthMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor() -> HealthMonitor:
+    """进程内共享的健康监控（同一交易所的所有请求汇总在一起）"""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = HealthMonitor()
+    return _monitor
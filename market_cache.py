@@ -0,0 +1,122 @@
+"""
+交易所市场元数据磁盘缓存
+
+每个交易所（按名称和市场类型区分）一个 JSON 文件，记录 ccxt 版本和写入时间。
+ccxt 版本不一致的缓存直接作废；超过 TTL 的缓存仍可用于启动，但需要后台刷新。
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+import ccxt
+
+from config import MARKET_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCHEMA_VERSION = 1
+
+
+class MarketCache:
+    """按交易所存储 load_markets() 结果"""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            path: 缓存目录，默认 MARKET_CACHE_CONFIG['path']
+            ttl: 缓存有效期（秒），默认 MARKET_CACHE_CONFIG['ttl']
+        """
+        self.path = path or MARKET_CACHE_CONFIG.get('path', '.cache/markets')
+        self.ttl = float(ttl if ttl is not None else MARKET_CACHE_CONFIG.get('ttl', 21600))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(name: str, ex_conf: Dict) -> str:
+        market_type = ex_conf.get('options', {}).get('defaultType', 'spot')
+        return f"{name}-{market_type}"
+
+    def _file(self, name: str, ex_conf: Dict) -> str:
+        return os.path.join(self.path, f"{self.cache_key(name, ex_conf)}.json")
+
+    def load(self, name: str, ex_conf: Dict) -> Optional[Dict[str, Any]]:
+        """读取缓存，版本不匹配或文件损坏时返回 None"""
+        path = self._file(name, ex_conf)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取 {name} 市场缓存失败: {e}")
+            return None
+
+        if (entry.get('schema') != CACHE_SCHEMA_VERSION
+                or entry.get('ccxt_version') != ccxt.__version__
+                or entry.get('exchange') != name
+                or not entry.get('markets')):
+            logger.info(f"{name} 市场缓存版本不匹配，忽略")
+            return None
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - float(entry.get('saved_at', 0)) < self.ttl
+
+    def save(self, name: str, ex_conf: Dict, inst: Any) -> None:
+        """写入缓存（先写临时文件再原子替换）"""
+        entry = {
+            'schema': CACHE_SCHEMA_VERSION,
+            'ccxt_version': ccxt.__version__,
+            'exchange': name,
+            'saved_at': time.time(),
+            'markets': getattr(inst, 'markets', None) or {},
+            'currencies': getattr(inst, 'currencies', None) or {},
+        }
+        path = self._file(name, ex_conf)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with self._lock:
+                os.makedirs(self.path, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入 {name} 市场缓存失败: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def restore(self, name: str, ex_conf: Dict, inst: Any) -> Optional[bool]:
+        """
+        从缓存恢复市场数据到 ccxt 实例
+
+        Returns:
+            None 表示无可用缓存；True 表示缓存新鲜；False 表示缓存已过期需要刷新
+        """
+        entry = self.load(name, ex_conf)
+        if entry is None:
+            return None
+        try:
+            inst.set_markets(entry['markets'], entry.get('currencies') or None)
+        except Exception as e:
+            logger.warning(f"恢复 {name} 市场缓存失败: {e}")
+            return None
+        return self.is_fresh(entry)
+
+    def refresh_in_background(self, name: str, ex_conf: Dict, inst: Any) -> threading.Thread:
+        """后台重新加载市场数据并更新缓存"""
+        def refresh():
+            try:
+                inst.load_markets(reload=True)
+                self.save(name, ex_conf, inst)
+                logger.info(f"🔄 {name} 市场缓存已后台刷新，共 {len(inst.markets)} 个交易对")
+            except Exception as e:
+                logger.warning(f"后台刷新 {name} 市场数据失败: {e}")
+
+        thread = threading.Thread(target=refresh, name=f'markets-{name}', daemon=True)
+        thread.start()
+        return thread
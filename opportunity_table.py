@@ -0,0 +1,209 @@
+"""
+列式交易机会结果
+
+全量扫描时每个交易对一个字典，排序要为每一行构造元组键。OpportunityTable 把结果放在一个
+NumPy 结构化数组里（每个字段一列）：
+  - from_indicators() 直接由 batch_indicators.latest_indicators 的数组构造，不经过逐行字典
+  - score() 向量化计算综合评分，与 AnalyzerBase._calculate_composite_score 一致
+  - top() 先用 argpartition 选出前 N 个，只对这 N 个排序，顺序与 _smart_sort_opportunities 一致
+  - columns() 返回各列的视图，save() 把结构化数组原样写入 .npy，都不复制逐行数据
+迭代、下标访问时按行生成与原来相同字段的字典，调用方可以把它当作交易机会列表使用。
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from config import INDICATOR_CONFIG
+from signal_detector import RECOMMEND_RATIO
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = ('none', 'long', 'short', 'hold')
+_SIGNAL_CODES = {name: code for code, name in enumerate(SIGNALS)}
+
+# 与 _build_opportunity 的字段顺序一致
+FLOAT_FIELDS = ('current_price', 'volume_ratio', 'current_volume', 'avg_volume_30', 'ma5', 'ma10', 'ma20')
+TAIL_FLOAT_FIELDS = ('price_change_24h', 'volatility', 'composite_score')
+
+
+def _dtype(symbol_width: int, exchange_width: int) -> np.dtype:
+    return np.dtype(
+        [('symbol', f'U{max(symbol_width, 1)}'), ('exchange', f'U{max(exchange_width, 1)}')]
+        + [(name, np.float64) for name in FLOAT_FIELDS]
+        + [('signal', np.int8), ('is_recommended', np.bool_)]
+        + [(name, np.float64) for name in TAIL_FLOAT_FIELDS]
+    )
+
+
+def classify_signals(volume_ratio: np.ndarray, ma5: np.ndarray, ma10: np.ndarray,
+                     ma20: np.ndarray) -> Dict[str, np.ndarray]:
+    """signal_detector.classify_signal 的向量化版本，返回信号编码（SIGNALS 的下标）与是否推荐"""
+    positive = (ma5 > 0) & (ma10 > 0) & (ma20 > 0)
+    bullish = (ma5 > ma10) & (ma10 > ma20) & positive
+    bearish = (ma5 < ma10) & (ma10 < ma20) & positive
+    recommended = volume_ratio >= RECOMMEND_RATIO
+    active = volume_ratio >= INDICATOR_CONFIG.get('volume_ratio_threshold', 3.0)
+
+    signal = np.full(len(volume_ratio), _SIGNAL_CODES['none'], dtype=np.int8)
+    signal[active & bullish] = _SIGNAL_CODES['long']
+    signal[active & bearish] = _SIGNAL_CODES['short']
+    signal[recommended & ~bullish & ~bearish] = _SIGNAL_CODES['hold']
+    return {'signal': signal, 'is_recommended': recommended}
+
+
+def composite_scores(volume_ratio: np.ndarray, price_change_24h: np.ndarray,
+                     current_volume: np.ndarray) -> np.ndarray:
+    """AnalyzerBase._calculate_composite_score 的向量化版本"""
+    volume_score = np.minimum(volume_ratio * 10, 100)
+    momentum_score = np.minimum(np.abs(price_change_24h) * 100 * 2, 100)
+    liquidity_score = np.minimum(current_volume / 1000000 * 20, 100)
+    return np.round(volume_score * 0.4 + momentum_score * 0.3 + liquidity_score * 0.3, 2)
+
+
+class OpportunityTable:
+    """结构化数组存储的交易机会，可按字典迭代"""
+
+    def __init__(self, data: np.ndarray, extras: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            data: _dtype() 结构的数组
+            extras: 附加数值列（例如跨交易所汇总字段），与 data 等长，生成字典时附在末尾
+        """
+        self.data = data
+        self.extras: Dict[str, np.ndarray] = dict(extras or {})
+
+    @classmethod
+    def empty(cls) -> 'OpportunityTable':
+        return cls(np.empty(0, dtype=_dtype(1, 1)))
+
+    @classmethod
+    def from_indicators(cls, symbols: Sequence[str], exchanges: Sequence[str],
+                        latest: Dict[str, np.ndarray]) -> 'OpportunityTable':
+        """
+        由 latest_indicators() 的结果构造，只保留 valid 的交易对
+
+        Args:
+            symbols: 交易对，与指标数组一一对应
+            exchanges: 各交易对所属交易所
+        """
+        rows = np.flatnonzero(latest['valid'])
+        symbol_col = np.asarray(symbols, dtype=str)[rows] if len(rows) else np.empty(0, dtype='U1')
+        exchange_col = np.asarray(exchanges, dtype=str)[rows] if len(rows) else np.empty(0, dtype='U1')
+        data = np.empty(len(rows), dtype=_dtype(symbol_col.dtype.itemsize // 4, exchange_col.dtype.itemsize // 4))
+        data['symbol'] = symbol_col
+        data['exchange'] = exchange_col
+        data['current_price'] = latest['close'][rows]
+        data['current_volume'] = latest['volume'][rows]
+        for name in ('volume_ratio', 'avg_volume_30', 'ma5', 'ma10', 'ma20', 'price_change_24h', 'volatility'):
+            data[name] = latest[name][rows]
+        signals = classify_signals(data['volume_ratio'], data['ma5'], data['ma10'], data['ma20'])
+        data['signal'] = signals['signal']
+        data['is_recommended'] = signals['is_recommended']
+        data['composite_score'] = 0.0
+        return cls(data)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Optional[Dict[str, Any]]]) -> 'OpportunityTable':
+        """由交易机会字典构造（跳过空结果），未知的数值字段放入 extras"""
+        records = [r for r in records if r]
+        if not records:
+            return cls.empty()
+        data = np.empty(len(records), dtype=_dtype(max(len(r['symbol']) for r in records),
+                                                   max(len(r.get('exchange', '')) for r in records)))
+        data['symbol'] = [r['symbol'] for r in records]
+        data['exchange'] = [r.get('exchange', '') for r in records]
+        for name in FLOAT_FIELDS + TAIL_FLOAT_FIELDS:
+            data[name] = [r.get(name, 0.0) for r in records]
+        data['signal'] = [_SIGNAL_CODES.get(r.get('signal', 'none'), 0) for r in records]
+        data['is_recommended'] = [bool(r.get('is_recommended', False)) for r in records]
+
+        known = set(data.dtype.names)
+        extra_names = list(dict.fromkeys(
+            k for r in records for k, v in r.items()
+            if k not in known and isinstance(v, (int, float, np.number)) and not isinstance(v, bool)))
+        extras = {name: np.array([r.get(name, np.nan) for r in records], dtype=np.float64) for name in extra_names}
+        return cls(data, extras)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self.data)):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        """第 index 行的交易机会字典（字段与 _build_opportunity 的结果相同）"""
+        row = self.data[index]
+        record: Dict[str, Any] = {'symbol': str(row['symbol']), 'exchange': str(row['exchange'])}
+        for name in FLOAT_FIELDS:
+            record[name] = float(row[name])
+        record['signal'] = SIGNALS[row['signal']]
+        record['is_recommended'] = bool(row['is_recommended'])
+        for name in TAIL_FLOAT_FIELDS:
+            record[name] = float(row[name])
+        for name, values in self.extras.items():
+            if not np.isnan(values[index]):
+                record[name] = float(values[index])
+        return record
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def take(self, indexes: np.ndarray) -> 'OpportunityTable':
+        return OpportunityTable(self.data[indexes], {name: values[indexes] for name, values in self.extras.items()})
+
+    def score(self) -> 'OpportunityTable':
+        """就地写入综合评分"""
+        self.data['composite_score'] = composite_scores(self.data['volume_ratio'], self.data['price_change_24h'],
+                                                        self.data['current_volume'])
+        return self
+
+    def order(self, sort_by: str = 'volume_ratio', top_n: Optional[int] = None) -> np.ndarray:
+        """
+        排序后前 top_n 行的下标，规则与 _smart_sort_opportunities 一致（降序，相同键保持原顺序）
+
+        只对 argpartition 选出的候选排序；与第 top_n 名主键相同的行都进入候选，边界上的顺序不受影响。
+        """
+        data = self.data
+        if sort_by == 'price_change_24h':
+            primary = np.abs(data['price_change_24h'])
+        elif sort_by in ('current_volume', 'current_price', 'composite_score'):
+            primary = data[sort_by]
+        else:
+            primary = data['volume_ratio']
+
+        n = len(data)
+        candidates = np.arange(n)
+        if top_n is not None and top_n < n:
+            if top_n <= 0:
+                return np.empty(0, dtype=np.int64)
+            kth = primary[np.argpartition(-primary, top_n - 1)[top_n - 1]]
+            candidates = np.flatnonzero(primary >= kth)
+
+        keys = [candidates, -primary[candidates]]
+        if sort_by == 'volume_ratio':
+            keys = [candidates, -data['current_volume'][candidates], -data['composite_score'][candidates],
+                    -primary[candidates]]
+        ordered = candidates[np.lexsort(keys)]
+        return ordered[:top_n] if top_n is not None else ordered
+
+    def top(self, top_n: Optional[int] = None, sort_by: str = 'volume_ratio') -> 'OpportunityTable':
+        return self.take(self.order(sort_by, top_n))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """各列的只读视图（不复制数据），信号列为 SIGNALS 的下标"""
+        columns = {}
+        for name in self.data.dtype.names:
+            view = self.data[name]
+            view.flags.writeable = False
+            columns[name] = view
+        columns.update(self.extras)
+        return columns
+
+    def save(self, path: str) -> None:
+        """结构化数组直接写入 .npy（附加列另存为同名 .extras.npz），np.load 即可读回"""
+        np.save(path, self.data)
+        if self.extras:
+            np.savez(f"{path}.extras.npz", **self.extras)
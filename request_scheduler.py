@@ -0,0 +1,310 @@
+"""
+交易所请求调度
+
+所有对交易所的 REST 请求经过 RequestScheduler：
+  - 每个交易所一个令牌桶，速率由 ccxt 实例的 rateLimit 推算，不同接口按权重消耗令牌
+  - 交互式请求（图表、API K线）与后台扫描分两条通道：桶内保留一部分令牌只给交互式请求，
+    有交互式请求等待时后台请求让行
+  - 遇到 429 / 418 / DDoSProtection 时乘性降低速率并暂停该交易所（优先使用 Retry-After），
+    之后每次成功请求逐步恢复到原速率
+  - 网络错误按 NETWORK_CONFIG['retry_count'] / ['retry_delay'] 以指数退避加随机抖动重试
+
+启用时 ccxt 实例自身的 enableRateLimit 关闭，节流统一由这里负责。
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import random
+import re
+import threading
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+import ccxt
+
+from config import NETWORK_CONFIG, REQUEST_SCHEDULER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 请求通道：数值越小越优先
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar('request_priority', default=BACKGROUND)
+
+
+@contextlib.contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """在 with 块内（当前线程或协程）发出的请求使用指定通道"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def interactive() -> contextlib.AbstractContextManager:
+    """交互式请求：用户正在等待的图表、K线接口"""
+    return request_priority(INTERACTIVE)
+
+
+# ccxt 的错误信息为 "<id> <METHOD> <url> <状态码> <原因>"，状态码是单独的词；URL 查询参数中的数字不算
+_BAN_STATUS = re.compile(r'(?:^|\s)418(?:\s|$)')
+
+
+def _is_ban(error: Exception) -> bool:
+    return _BAN_STATUS.search(str(error)) is not None
+
+
+class ExchangeThrottle:
+    """单个交易所的令牌桶与自适应速率"""
+
+    def __init__(self, name: str, rate_limit_ms: float):
+        self.name = name
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.waited = 0.0
+        self.interactive_waiting = 0
+        self._rebase(rate_limit_ms)
+
+    def _rebase(self, rate_limit_ms: float) -> None:
+        """按 rateLimit（毫秒/单位权重）设置基础速率；0 表示不限速"""
+        self.rate_limit_ms = float(rate_limit_ms or 0)
+        self.base_rate = 1000.0 / self.rate_limit_ms if self.rate_limit_ms > 0 else 0.0
+        self.rate = self.base_rate
+        self.capacity = max(1.0, self.base_rate * float(REQUEST_SCHEDULER_CONFIG.get('burst_seconds', 2)))
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def sync_rate_limit(self, rate_limit_ms: float) -> None:
+        """实例的 rateLimit 被调整（如多进程分担同一交易所）时重新计算"""
+        if float(rate_limit_ms or 0) != self.rate_limit_ms:
+            with self._lock:
+                self._rebase(rate_limit_ms)
+
+    def try_acquire(self, weight: float, priority: int) -> float:
+        """
+        尝试取走 weight 个令牌
+
+        Returns:
+            0 表示已取得；否则为建议等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.base_rate <= 0:
+                self.requests += 1
+                return 0.0
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 后台请求不能动用保留给交互式请求的令牌，也不与正在等待的交互式请求争抢
+            reserve = 0.0
+            if priority != INTERACTIVE:
+                if self.interactive_waiting:
+                    return max(weight / self.rate, 0.01)
+                reserve = self.capacity * float(REQUEST_SCHEDULER_CONFIG.get('interactive_reserve', 0.25))
+            weight = min(weight, self.capacity - reserve)
+            if self.tokens - weight >= reserve:
+                self.tokens -= weight
+                self.requests += 1
+                return 0.0
+            return (weight + reserve - self.tokens) / self.rate
+
+    def join_lane(self, priority: int) -> None:
+        if priority == INTERACTIVE:
+            with self._lock:
+                self.interactive_waiting += 1
+
+    def leave_lane(self, priority: int) -> None:
+        if priority == INTERACTIVE:
+            with self._lock:
+                self.interactive_waiting -= 1
+
+    def penalize(self, retry_after: Optional[float], ban: bool) -> float:
+        """触发限速：降低速率、清空令牌并暂停，返回暂停秒数"""
+        with self._lock:
+            factor = float(REQUEST_SCHEDULER_CONFIG.get('backoff_factor', 0.5))
+            floor = self.base_rate * float(REQUEST_SCHEDULER_CONFIG.get('min_rate_factor', 0.1))
+            self.rate = max(floor, self.rate * factor)
+            self.tokens = 0.0
+            if retry_after is None:
+                retry_after = float(REQUEST_SCHEDULER_CONFIG.get('ban_cooldown' if ban else 'cooldown', 5))
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.throttled += 1
+            return retry_after
+
+    def record_success(self) -> None:
+        if self.rate < self.base_rate:
+            with self._lock:
+                step = self.base_rate * float(REQUEST_SCHEDULER_CONFIG.get('recovery_step', 0.02))
+                self.rate = min(self.base_rate, self.rate + step)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rate': round(self.rate, 3),
+            'base_rate': round(self.base_rate, 3),
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'retries': self.retries,
+            'waited': round(self.waited, 3),
+        }
+
+
+class RequestScheduler:
+    """按交易所节流、分通道排队并重试交易所请求"""
+
+    def __init__(self, retry_count: Optional[int] = None, retry_delay: Optional[float] = None):
+        self.retry_count = int(NETWORK_CONFIG.get('retry_count', 2) if retry_count is None else retry_count)
+        self.retry_delay = float(NETWORK_CONFIG.get('retry_delay', 1) if retry_delay is None else retry_delay)
+        self.max_retry_delay = float(REQUEST_SCHEDULER_CONFIG.get('max_retry_delay', 30))
+        self._lock = threading.Lock()
+        self._throttles: Dict[str, ExchangeThrottle] = {}
+
+    def throttle(self, exchange: str, inst: Any) -> ExchangeThrottle:
+        rate_limit = float(getattr(inst, 'rateLimit', 0) or 0)
+        throttle = self._throttles.get(exchange)
+        if throttle is None:
+            with self._lock:
+                throttle = self._throttles.get(exchange)
+                if throttle is None:
+                    throttle = self._throttles[exchange] = ExchangeThrottle(exchange, rate_limit)
+        throttle.sync_rate_limit(rate_limit)
+        return throttle
+
+    @staticmethod
+    def weight(exchange: str, method: str) -> float:
+        weights = REQUEST_SCHEDULER_CONFIG.get('weights', {})
+        for scope in (weights.get(exchange, {}), weights.get('default', {})):
+            if method in scope:
+                return float(scope[method])
+        return 1.0
+
+    def _backoff(self, attempt: int) -> float:
+        """指数退避加全抖动"""
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(inst: Any) -> Optional[float]:
+        headers = getattr(inst, 'last_response_headers', None) or {}
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def _on_error(self, throttle: ExchangeThrottle, inst: Any, method: str, error: Exception,
+                  attempt: int) -> Optional[float]:
+        """返回重试前的等待秒数；不应重试时返回 None"""
+        if isinstance(error, ccxt.DDoSProtection):
+            # 无论是否还能重试，都先降低该交易所的速率，其他请求随之让行
+            pause = throttle.penalize(self._retry_after(inst), _is_ban(error))
+            logger.warning(f"{throttle.name} 触发限速（{type(error).__name__}），速率降至 {throttle.rate:.2f}/s，"
+                           f"暂停 {pause:.1f}s")
+        elif not isinstance(error, ccxt.NetworkError) or isinstance(error, ccxt.OnMaintenance):
+            return None
+        if attempt >= self.retry_count:
+            return None
+        throttle.retries += 1
+        delay = self._backoff(attempt)
+        logger.debug(f"{throttle.name}.{method} 第 {attempt + 1} 次重试，{delay:.2f}s 后: {error}")
+        return delay
+
+    def run(self, exchange: str, inst: Any, method: str, fn: Callable[[], Any],
+            priority: Optional[int] = None) -> Any:
+        """
+        在令牌桶允许后执行 fn()，失败时按规则重试
+
+        Args:
+            exchange: 交易所名称（令牌桶按名称共享）
+            inst: ccxt 实例，用于读取 rateLimit 和 Retry-After
+            method: 接口名称，用于查找权重
+            fn: 实际发出请求的无参函数
+            priority: INTERACTIVE / BACKGROUND，默认取 request_priority() 设置的通道
+        """
+        throttle = self.throttle(exchange, inst)
+        priority = _priority.get() if priority is None else priority
+        weight = self.weight(exchange, method)
+        attempt = 0
+        while True:
+            self._wait(throttle, weight, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._on_error(throttle, inst, method, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            throttle.record_success()
+            return result
+
+    async def run_async(self, exchange: str, inst: Any, method: str, fn: Callable[[], Awaitable[Any]],
+                        priority: Optional[int] = None) -> Any:
+        """run() 的协程版本"""
+        throttle = self.throttle(exchange, inst)
+        priority = _priority.get() if priority is None else priority
+        weight = self.weight(exchange, method)
+        attempt = 0
+        while True:
+            await self._wait_async(throttle, weight, priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._on_error(throttle, inst, method, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            throttle.record_success()
+            return result
+
+    def _wait(self, throttle: ExchangeThrottle, weight: float, priority: int) -> None:
+        throttle.join_lane(priority)
+        try:
+            while True:
+                delay = throttle.try_acquire(weight, priority)
+                if delay <= 0:
+                    return
+                delay = min(delay, 1.0)
+                throttle.waited += delay
+                time.sleep(delay)
+        finally:
+            throttle.leave_lane(priority)
+
+    async def _wait_async(self, throttle: ExchangeThrottle, weight: float, priority: int) -> None:
+        throttle.join_lane(priority)
+        try:
+            while True:
+                delay = throttle.try_acquire(weight, priority)
+                if delay <= 0:
+                    return
+                delay = min(delay, 1.0)
+                throttle.waited += delay
+                await asyncio.sleep(delay)
+        finally:
+            throttle.leave_lane(priority)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: throttle.stats() for name, throttle in list(self._throttles.items())}
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """进程内共享的调度器（同一交易所的所有请求共用一个令牌桶）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
@@ -0,0 +1,174 @@
+"""
+并发扫描引擎
+
+按交易所划分任务队列，每个交易所拥有独立的并发上限（由 ccxt 实例的
+rateLimit 推算）和请求节流，避免某个交易所的慢请求阻塞其他交易所。
+"""
+
+import math
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from config import REQUEST_SCHEDULER_CONFIG, SCAN_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def exchange_concurrency(inst: Any, expected_latency_ms: Optional[float] = None,
+                         max_per_exchange: Optional[int] = None) -> int:
+    """根据 ccxt 实例的 rateLimit 推算并发度：单次请求耗时内可发出的请求数"""
+    latency = float(expected_latency_ms or SCAN_CONFIG.get('expected_latency_ms', 300))
+    upper = int(max_per_exchange or SCAN_CONFIG.get('max_per_exchange', 8))
+    rate_limit = float(getattr(inst, 'rateLimit', 0) or 0)
+    if rate_limit > 0:
+        concurrency = math.ceil(latency / rate_limit)
+    else:
+        concurrency = upper
+    return max(1, min(int(concurrency), upper))
+
+
+class ExchangeLimiter:
+    """单个交易所的并发与节流控制"""
+
+    def __init__(self, name: str, rate_limit_ms: float, max_concurrency: int):
+        self.name = name
+        self.interval = max(0.0, float(rate_limit_ms or 0) / 1000.0)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    @classmethod
+    def for_exchange(cls, name: str, inst: Any, expected_latency_ms: float,
+                     max_per_exchange: int) -> 'ExchangeLimiter':
+        """按 rateLimit 推算并发度，并以 rateLimit 作为请求间隔（启用请求调度器时由调度器节流）"""
+        concurrency = exchange_concurrency(inst, expected_latency_ms, max_per_exchange)
+        interval = 0.0 if REQUEST_SCHEDULER_CONFIG.get('enabled', True) else float(getattr(inst, 'rateLimit', 0) or 0)
+        return cls(name, interval, concurrency)
+
+    def acquire(self) -> None:
+        self._semaphore.acquire()
+        # 相邻两次请求的发出时间至少间隔 rateLimit
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    def __enter__(self) -> 'ExchangeLimiter':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class ConcurrentScanner:
+    """按交易所分队列的并发调度器"""
+
+    def __init__(self, exchanges: Sequence[Tuple[str, Dict, Any]],
+                 max_workers: Optional[int] = None,
+                 max_per_exchange: Optional[int] = None,
+                 expected_latency_ms: Optional[float] = None):
+        """
+        Args:
+            exchanges: CryptoAnalyzer.exchanges 形式的 (name, conf, inst) 列表
+            max_workers: 全局最大线程数
+            max_per_exchange: 单个交易所最大并发
+            expected_latency_ms: 预估单次请求耗时（毫秒）
+        """
+        self.max_workers = int(max_workers or SCAN_CONFIG.get('max_workers', 32))
+        per_exchange = int(max_per_exchange or SCAN_CONFIG.get('max_per_exchange', 8))
+        latency = float(expected_latency_ms or SCAN_CONFIG.get('expected_latency_ms', 300))
+
+        self.limiters: Dict[str, ExchangeLimiter] = {}
+        for name, _, inst in exchanges:
+            self.limiters[name] = ExchangeLimiter.for_exchange(name, inst, latency, per_exchange)
+        self.default_exchange = exchanges[0][0] if exchanges else None
+
+    def _plan_workers(self, queues: Dict[str, Deque]) -> Dict[str, int]:
+        """
+        为每个有任务的交易所分配并发数（超过 max_workers 时按比例缩小，每个交易所至少 1）
+
+        有任务的交易所多于 max_workers 时合计仍会超过 max_workers；线程池大小由 map() 限制在
+        max_workers 以内，多出的交易所排队等待空闲线程。
+        """
+        plan = {
+            name: min(self.limiters[name].max_concurrency, len(queue))
+            for name, queue in queues.items() if queue
+        }
+        total = sum(plan.values())
+        if total > self.max_workers:
+            scale = self.max_workers / total
+            plan = {name: max(1, int(n * scale)) for name, n in plan.items()}
+        return plan
+
+    def map(self, symbols: Sequence[str], fn: Callable[[str], Any],
+            exchange_of: Callable[[str], Optional[str]]) -> List[Any]:
+        """
+        并发执行 fn(symbol)，结果顺序与 symbols 一致
+
+        Args:
+            symbols: 交易对列表
+            fn: 对单个交易对执行的函数，异常时对应结果为 None
+            exchange_of: 交易对 -> 交易所名称
+        """
+        results: List[Any] = [None] * len(symbols)
+        if not symbols:
+            return results
+
+        queues: Dict[str, Deque[int]] = {name: deque() for name in self.limiters}
+        for index, symbol in enumerate(symbols):
+            name = exchange_of(symbol)
+            if name not in queues:
+                name = self.default_exchange
+            if name is None:
+                continue
+            queues[name].append(index)
+
+        total = len(symbols)
+        done = [0]
+        progress_lock = threading.Lock()
+
+        def drain(name: str) -> None:
+            limiter = self.limiters[name]
+            queue = queues[name]
+            while True:
+                try:
+                    index = queue.popleft()
+                except IndexError:
+                    return
+                symbol = symbols[index]
+                try:
+                    with limiter:
+                        results[index] = fn(symbol)
+                except Exception as e:
+                    logger.error(f"分析 {symbol} 失败: {e}")
+                with progress_lock:
+                    done[0] += 1
+                    count = done[0]
+                if count % 50 == 0 or count == total:
+                    logger.info(f"分析进度: {count}/{total} ({count/total*100:.1f}%)")
+
+        plan = self._plan_workers(queues)
+        if not plan:
+            return results
+
+        # 按轮次提交：先为每个交易所各提交一个任务，线程数受限时每个交易所尽早开始
+        tasks = [name for round_ in range(max(plan.values())) for name, n in plan.items() if round_ < n]
+        workers = min(len(tasks), self.max_workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan') as pool:
+            futures = [pool.submit(drain, name) for name in tasks]
+            for future in futures:
+                future.result()
+
+        return results
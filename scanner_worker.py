@@ -0,0 +1,258 @@
+"""
+扫描进程
+
+ScanLoop 是原先 app.py 中的后台更新循环：定期全量扫描，推送可用时按实时指标重新排序，
+每次结果通过 publish 回调发布。Web 进程可以在内部运行它（SCANNER_CONFIG['mode'] = 'embedded'），
+也可以由独立的扫描进程运行（python cli.py worker），把快照写入 snapshot_file 格式的文件，
+任意数量的 Web 进程（SCANNER_MODE=external）映射同一个文件读取，不再各自扫描交易所。
+
+启用 TIERED_SCAN_CONFIG 时，每个 update_interval 只刷新交易对列表，扫描改为每个 tick 分析
+TieredScheduler 判定到期的交易对，并与其余交易对最近一次的结果合并排序后发布。
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import DATA_CONFIG, SCANNER_CONFIG, STREAM_CONFIG, TIERED_SCAN_CONFIG
+from crypto_analyzer import AnalyzerBase
+from request_scheduler import get_scheduler
+from signal_detector import SignalDetector
+from snapshot import RankingSnapshot, SnapshotPublisher
+from snapshot_file import MappedSnapshot, write_snapshot
+from stream_ingest import StreamIngestor
+from tiered_scan import TieredScheduler
+from transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+PublishCallback = Callable[[List[Dict[str, Any]], Optional[datetime]], RankingSnapshot]
+
+TABLE_ROWS = 20  # 推送重新排序时至少保留的行数（与详细表格一致）
+
+
+class ScanLoop:
+    """后台扫描与重新排序循环"""
+
+    def __init__(self, analyzer: Any, publish: PublishCallback):
+        """
+        Args:
+            analyzer: CryptoAnalyzer 或 SyncCryptoAnalyzer
+            publish: 发布排行的回调，通常是 SnapshotPublisher.publish
+        """
+        self.analyzer = analyzer
+        self.publish = publish
+        self.stream_ingestor: Optional[StreamIngestor] = None
+        self.signal_detector = SignalDetector()
+        self.rank_wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.tiered: Optional[TieredScheduler] = None
+        if TIERED_SCAN_CONFIG.get('enabled', False):
+            self.tiered = TieredScheduler()
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._ranker = AnalyzerBase()
+
+    def start(self) -> None:
+        """在后台线程中运行"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='scan-loop', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.rank_wakeup.set()
+        if self.stream_ingestor is not None:
+            self.stream_ingestor.stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+
+    def _start_stream_ingestor(self, symbols: List[str]) -> None:
+        """启动或更新实时推送订阅"""
+        if not STREAM_CONFIG.get('enabled', True):
+            return
+        try:
+            if self.stream_ingestor is None:
+                self.stream_ingestor = StreamIngestor(self.analyzer)
+                if not self.stream_ingestor.adapters:
+                    logger.info("已启用的交易所均没有实时推送适配器，继续使用 REST 轮询")
+                    return
+                # 信号变化时立即唤醒排序循环，而不是等到下一个 rank_interval
+                self.stream_ingestor.add_listener(self.signal_detector.on_stream_event)
+                self.signal_detector.add_listener(lambda alert: self.rank_wakeup.set())
+                self.stream_ingestor.start(symbols)
+            elif self.stream_ingestor.adapters:
+                self.stream_ingestor.update_symbols(symbols)
+        except Exception as e:
+            logger.error(f"启动实时推送失败: {e}")
+
+    def _log_stats(self) -> None:
+        cache_stats = self.analyzer.cache.stats()
+        logger.info(f"缓存: {cache_stats['entries']} 条 / {cache_stats['bytes'] / 1024:.0f}KB，"
+                    f"命中率 {cache_stats['hit_rate']:.1%}，淘汰 {cache_stats['evictions']} 次")
+        for flight in self.analyzer.get_coalescing_stats().values():
+            logger.info(f"请求合并[{flight['name']}]: 调用 {flight['calls']} 次，"
+                        f"节省上游请求 {flight['coalesced']} 次")
+        for name, throttle in get_scheduler().stats().items():
+            if throttle['throttled'] or throttle['retries']:
+                logger.info(f"请求调度[{name}]: 速率 {throttle['rate']}/{throttle['base_rate']} 每秒，"
+                            f"限速 {throttle['throttled']} 次，重试 {throttle['retries']} 次")
+        if hasattr(self.analyzer, 'get_candle_provider_stats'):
+            for provider, per_exchange in self.analyzer.get_candle_provider_stats().items():
+                requests = sum(s['requests'] for s in per_exchange.values())
+                symbols = sum(s['symbols'] for s in per_exchange.values())
+                logger.info(f"K线获取[{provider}]: {len(per_exchange)} 个交易所，{symbols} 个交易对，请求 {requests} 次")
+        transport = get_transport()
+        if transport.enabled and transport.stats.requests:
+            conn = transport.stats.as_dict()
+            logger.info(f"HTTP 连接: 请求 {conn['requests']} 次，新建连接 {conn['new_connections']} 次"
+                        f"（TLS 握手 {conn['tls_handshakes']} 次），复用率 {conn['reuse_rate']:.1%}")
+        prefilter = getattr(self.analyzer, 'prefilter_stats', None)
+        if prefilter and prefilter['checked']:
+            logger.info(f"ticker 预筛选: 累计检查 {prefilter['checked']} 个交易对，"
+                        f"跳过K线获取 {prefilter['skipped']} 次（{prefilter['skipped'] / prefilter['checked']:.1%}）")
+        if self.tiered is not None:
+            tiered = self.tiered.stats()
+            logger.info(f"分级重扫: {tiered['symbols']} 个交易对，约 {tiered['scans_per_minute']} 次/分钟"
+                        f"（间隔缩放 {tiered['scale']}x），档位 {tiered['tiers']}")
+
+    def _scan_due(self, symbols: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        分级模式：分析到期的交易对，与其余交易对最近一次的结果合并排序
+
+        Returns:
+            排序后的全部结果；本周期没有到期交易对时返回 None
+        """
+        due = self.tiered.due(period=TIERED_SCAN_CONFIG.get('tick', 5))
+        if not due:
+            return None
+        results = self.analyzer.analyze_symbols(due)
+        now = time.time()
+        for symbol, opp in zip(due, results):
+            if opp:
+                self._latest[symbol] = opp
+            else:
+                self._latest.pop(symbol, None)
+        ranked_symbols = [s for s in symbols if s in self._latest]
+        ranked = self._ranker._rank_opportunities(ranked_symbols, [self._latest[s] for s in ranked_symbols],
+                                                  len(ranked_symbols), 'volume_ratio')
+        # 排序时已写入 composite_score，再据此计算下次扫描时间
+        for symbol, opp in zip(due, results):
+            self.tiered.update(symbol, opp, now)
+        logger.debug(f"分级重扫: 本周期扫描 {len(due)} 个交易对")
+        return ranked
+
+    def run(self) -> None:
+        """循环直到 stop()"""
+        update_interval = DATA_CONFIG.get('update_interval', 180)
+        rank_interval = STREAM_CONFIG.get('rank_interval', 5)
+        if self.tiered is not None:
+            rank_interval = min(rank_interval, TIERED_SCAN_CONFIG.get('tick', 5))
+        scan_results: List[Dict[str, Any]] = []
+        symbols: List[str] = []
+        next_scan = 0.0
+
+        while not self._stop.is_set():
+            try:
+                if time.time() >= next_scan:
+                    logger.info("开始扫描交易机会...")
+                    symbols = self.analyzer.get_tradable_symbols()
+                    if symbols and self.tiered is not None:
+                        # 只刷新交易对列表，扫描由下面的分级调度按到期时间进行
+                        self.tiered.sync_universe(symbols)
+                        self._ranker.universe = self.analyzer.universe
+                        universe = set(symbols)
+                        self._latest = {s: opp for s, opp in self._latest.items() if s in universe}
+                        self._log_stats()
+                        self._start_stream_ingestor(symbols)
+                    elif symbols:
+                        # 扫描全部交易对，结果也作为未订阅推送的交易对的排序依据
+                        scan_results = self.analyzer.get_top_opportunities(len(symbols), 'volume_ratio')
+                        self.publish(scan_results, datetime.now())
+                        logger.info(f"找到 {min(len(scan_results), TABLE_ROWS)} 个交易机会")
+                        self._log_stats()
+                        self._start_stream_ingestor(symbols)
+                    else:
+                        logger.warning("未找到符合条件的交易对，请检查网络连接")
+                        scan_results = []
+                        self.publish([], datetime.now())
+
+                    next_scan = time.time() + update_interval
+
+                if self.tiered is not None and symbols:
+                    ranked = self._scan_due(symbols)
+                    if ranked is not None:
+                        scan_results = ranked
+                        if self.stream_ingestor is None or not self.stream_ingestor.connected:
+                            self.publish(scan_results, datetime.now())
+
+                if self.stream_ingestor is not None and self.stream_ingestor.connected:
+                    # 推送可用时按实时指标重新排序，出现新信号时提前排序
+                    self.rank_wakeup.wait(rank_interval)
+                    self.rank_wakeup.clear()
+                    if self._stop.is_set():
+                        break
+                    ranked = self.stream_ingestor.get_top_opportunities(max(len(symbols), TABLE_ROWS),
+                                                                        'volume_ratio', scan_results)
+                    self.publish(ranked, datetime.now())
+                else:
+                    self._stop.wait(min(rank_interval, max(0.0, next_scan - time.time())))
+
+            except Exception as e:
+                logger.error(f"更新数据时出错: {e}", exc_info=True)
+                logger.info("将在60秒后重试...")
+                self._stop.wait(60)
+                next_scan = 0.0
+
+
+def file_publisher(path: str) -> PublishCallback:
+    """
+    返回把排行发布到快照文件的回调
+
+    沿用已有文件的版本号，Web 进程和 SSE 客户端看到的版本在扫描进程重启后保持递增。
+    """
+    publisher = SnapshotPublisher()
+    try:
+        publisher.install(MappedSnapshot.open(path))
+        logger.info(f"沿用快照文件 {path} 的版本 v{publisher.version}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"无法读取已有快照文件 {path}: {e}")
+
+    def publish(opportunities: List[Dict[str, Any]], updated_at: Optional[datetime] = None) -> RankingSnapshot:
+        previous = publisher.version
+        snapshot = publisher.publish(opportunities, updated_at)
+        if snapshot.version != previous:
+            write_snapshot(path, snapshot)
+            logger.info(f"写入排行快照 v{snapshot.version}: {len(snapshot)} 个交易对 -> {path}")
+        return snapshot
+
+    return publish
+
+
+def run_scanner(analyzer: Any = None, snapshot_path: Optional[str] = None) -> None:
+    """
+    独立扫描进程的入口：扫描结果写入快照文件，直到收到 KeyboardInterrupt
+
+    Args:
+        analyzer: 默认由 create_analyzer() 创建
+        snapshot_path: 默认 SCANNER_CONFIG['snapshot_path']
+    """
+    if analyzer is None:
+        from crypto_analyzer import create_analyzer
+        analyzer = create_analyzer()
+    path = snapshot_path or SCANNER_CONFIG.get('snapshot_path', '.cache/ranking.snap')
+
+    loop = ScanLoop(analyzer, file_publisher(path))
+    logger.info(f"扫描进程已启动，快照文件: {path}")
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        logger.info("扫描进程退出")
+    finally:
+        loop.stop()
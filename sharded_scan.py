@@ -0,0 +1,199 @@
+"""
+多进程分片扫描
+
+指标计算和评分在单个分析器内只能使用一个核心。ShardedScanner 把交易对分配给若干常驻工作进程：
+交易所数量不少于进程数时按交易所划分，否则按 (交易所, 交易对) 的哈希划分。
+每个工作进程持有自己的 ccxt 实例、K线存储和缓存，分片与进程的对应关系固定，
+增量K线在后续扫描中继续命中。同一交易所被多个进程分担时，各进程的 rateLimit 按分担数放大，
+合计请求频率与单进程一致。
+
+各分片返回与输入顺序一致的分析结果，主进程按原始顺序拼接后交给 _rank_opportunities
+（_smart_sort_opportunities）统一评分排序，结果与单进程扫描相同。
+"""
+
+import multiprocessing
+import time
+import zlib
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import SCAN_CONFIG
+
+logger = logging.getLogger(__name__)
+
+AnalyzerFactory = Callable[[], Any]
+
+# 工作进程内的分析器及各交易所原始 rateLimit
+_worker_analyzer: Any = None
+_worker_rate_limits: Dict[str, float] = {}
+_worker_from_factory = False
+
+
+def shard_of(exchange: str, symbol: str, shards: int) -> int:
+    """按哈希分片（crc32 跨进程、跨重启稳定）"""
+    return zlib.crc32(f"{exchange}|{symbol}".encode('utf-8')) % shards
+
+
+def plan_shards(symbols: Sequence[str], exchange_by_symbol: Dict[str, str], shards: int,
+                strategy: str = 'auto') -> List[List[int]]:
+    """
+    把交易对分配到各分片
+
+    Args:
+        strategy: 'exchange' 按交易所；'hash' 按哈希；'auto' 交易所数不少于分片数时按交易所
+
+    Returns:
+        每个分片负责的交易对在 symbols 中的下标（保持原顺序）
+    """
+    exchanges = list(dict.fromkeys(exchange_by_symbol.get(s, '') for s in symbols))
+    if strategy == 'auto':
+        strategy = 'exchange' if len(exchanges) >= shards else 'hash'
+
+    plan: List[List[int]] = [[] for _ in range(shards)]
+    if strategy == 'exchange':
+        # 交易对多的交易所优先分配给当前负载最轻的分片
+        counts: Dict[str, int] = {}
+        for s in symbols:
+            name = exchange_by_symbol.get(s, '')
+            counts[name] = counts.get(name, 0) + 1
+        load = [0] * shards
+        owner: Dict[str, int] = {}
+        for name in sorted(exchanges, key=lambda n: -counts[n]):
+            target = load.index(min(load))
+            owner[name] = target
+            load[target] += counts[name]
+        for i, s in enumerate(symbols):
+            plan[owner[exchange_by_symbol.get(s, '')]].append(i)
+    else:
+        for i, s in enumerate(symbols):
+            plan[shard_of(exchange_by_symbol.get(s, ''), s, shards)].append(i)
+    return plan
+
+
+def _init_worker(factory: Optional[AnalyzerFactory]) -> None:
+    global _worker_analyzer, _worker_from_factory
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if factory is not None:
+        _worker_analyzer = factory()
+        _worker_from_factory = True
+    else:
+        from crypto_analyzer import CryptoAnalyzer
+        _worker_analyzer = CryptoAnalyzer(exchanges=[])
+    for name, _, inst in _worker_analyzer.exchanges:
+        _worker_rate_limits[name] = float(getattr(inst, 'rateLimit', 0) or 0)
+
+
+def _ensure_exchanges(names: Sequence[str]) -> None:
+    """按需初始化本进程负责的交易所（优先从磁盘市场缓存恢复）"""
+    analyzer = _worker_analyzer
+    present = {name for name, _, _ in analyzer.exchanges}
+    missing = [name for name in names if name and name not in present]
+    if not missing or _worker_from_factory:
+        return
+    configs = {ex['name']: ex for ex in analyzer._enabled_exchange_configs()}
+    for name in missing:
+        if name not in configs:
+            continue
+        entry = analyzer._init_exchange(configs[name])
+        if entry is not None:
+            analyzer.exchanges.append(entry)
+            _worker_rate_limits[name] = float(getattr(entry[2], 'rateLimit', 0) or 0)
+    analyzer._scanner = None
+
+
+def _apply_rate_share(shares: Dict[str, int]) -> None:
+    """多个进程分担同一交易所时放大各自的请求间隔"""
+    changed = False
+    for name, _, inst in _worker_analyzer.exchanges:
+        base = _worker_rate_limits.get(name)
+        if not base or name not in shares:
+            continue
+        rate_limit = base * max(1, shares[name])
+        if getattr(inst, 'rateLimit', None) != rate_limit:
+            inst.rateLimit = rate_limit
+            changed = True
+    if changed:
+        _worker_analyzer._scanner = None
+
+
+def _analyze_shard(symbols: List[str], exchange_by_symbol: Dict[str, str], shares: Dict[str, int],
+                   concurrent: Optional[bool], batch: Optional[bool]) -> Tuple[List[Optional[Dict]], float]:
+    """工作进程中分析一个分片，返回 (与 symbols 对应的结果, 耗时)"""
+    start = time.perf_counter()
+    _ensure_exchanges(list(dict.fromkeys(exchange_by_symbol.values())))
+    _apply_rate_share(shares)
+    _worker_analyzer.exchange_by_symbol = exchange_by_symbol
+    results = _worker_analyzer.analyze_symbols(symbols, concurrent, batch)
+    return results, time.perf_counter() - start
+
+
+class ShardedScanner:
+    """常驻工作进程的分片扫描器，每个分片固定由同一个进程处理"""
+
+    def __init__(self, processes: int, strategy: Optional[str] = None,
+                 analyzer_factory: Optional[AnalyzerFactory] = None,
+                 start_method: Optional[str] = None):
+        """
+        Args:
+            processes: 工作进程数
+            strategy: 'auto' / 'exchange' / 'hash'，默认读取 SCAN_CONFIG['shard_by']
+            analyzer_factory: 工作进程中创建分析器的可序列化函数，默认按 EXCHANGES 配置按需初始化交易所
+            start_method: multiprocessing 启动方式，默认读取 SCAN_CONFIG['start_method']
+        """
+        self.processes = max(1, int(processes))
+        self.strategy = strategy or SCAN_CONFIG.get('shard_by', 'auto')
+        self.analyzer_factory = analyzer_factory
+        self._context = multiprocessing.get_context(start_method or SCAN_CONFIG.get('start_method', 'spawn'))
+        self._pools: List[Optional[ProcessPoolExecutor]] = [None] * self.processes
+
+    def _pool(self, shard: int) -> ProcessPoolExecutor:
+        pool = self._pools[shard]
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=self._context,
+                                       initializer=_init_worker, initargs=(self.analyzer_factory,))
+            self._pools[shard] = pool
+        return pool
+
+    def analyze(self, symbols: List[str], exchange_by_symbol: Dict[str, str],
+                concurrent: Optional[bool] = None, batch: Optional[bool] = None) -> List[Optional[Dict]]:
+        """
+        分片分析交易对，结果顺序与 symbols 一致；分片失败时对应结果为 None
+        """
+        plan = plan_shards(symbols, exchange_by_symbol, self.processes, self.strategy)
+        shares: Dict[str, int] = {}
+        for indices in plan:
+            for name in {exchange_by_symbol.get(symbols[i], '') for i in indices}:
+                shares[name] = shares.get(name, 0) + 1
+
+        futures: List[Tuple[int, List[int], Future]] = []
+        for shard, indices in enumerate(plan):
+            if not indices:
+                continue
+            shard_symbols = [symbols[i] for i in indices]
+            shard_exchanges = {s: exchange_by_symbol.get(s, '') for s in shard_symbols}
+            futures.append((shard, indices, self._pool(shard).submit(
+                _analyze_shard, shard_symbols, shard_exchanges, shares, concurrent, batch)))
+
+        results: List[Optional[Dict]] = [None] * len(symbols)
+        for shard, indices, future in futures:
+            try:
+                shard_results, elapsed = future.result()
+            except BrokenProcessPool as e:
+                logger.error(f"分片 {shard} 的工作进程异常退出，下次扫描时重建: {e}")
+                self._pools[shard] = None
+                continue
+            except Exception as e:
+                logger.error(f"分片 {shard} 扫描失败: {e}")
+                continue
+            for i, result in zip(indices, shard_results):
+                results[i] = result
+            logger.info(f"分片 {shard}: {len(indices)} 个交易对，耗时 {elapsed:.2f}s")
+        return results
+
+    def close(self) -> None:
+        for pool in self._pools:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        self._pools = [None] * self.processes
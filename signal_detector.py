@@ -0,0 +1,178 @@
+"""
+事件驱动的交易信号检测
+
+每当某个交易对的当前K线（含未收盘K线）成交量或价格更新，就重新评估其信号，
+信号发生变化（进入 long/short/hold）时立即产生事件，并附带交易所时间、接收时间和检测时间。
+同一根K线上同一信号只告警一次；新K线开盘后重新计算。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import INDICATOR_CONFIG, STREAM_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SignalListener = Callable[[Dict[str, Any]], None]
+
+# 放量达到该倍数时无论 MA 排列如何都推荐关注
+RECOMMEND_RATIO = 5.0
+
+
+def classify_signal(volume_ratio: float, ma5: float, ma10: float, ma20: float) -> Tuple[str, bool]:
+    """根据交易量倍数与MA排列生成 (交易信号, 是否推荐)"""
+    # 判断MA排列
+    ma_bullish = (ma5 > ma10 > ma20) and (ma5 > 0 and ma10 > 0 and ma20 > 0)
+    ma_bearish = (ma5 < ma10 < ma20) and (ma5 > 0 and ma10 > 0 and ma20 > 0)
+
+    signal = 'none'
+    is_recommended = False
+
+    # 5倍阈值推荐逻辑
+    if volume_ratio >= RECOMMEND_RATIO:
+        is_recommended = True
+        if ma_bullish:
+            signal = 'long'
+        elif ma_bearish:
+            signal = 'short'
+        else:
+            signal = 'hold'  # 超过5倍但MA不明确
+    elif volume_ratio >= INDICATOR_CONFIG.get('volume_ratio_threshold', 3.0):
+        # 3-5倍之间，根据MA排列判断
+        if ma_bullish:
+            signal = 'long'
+        elif ma_bearish:
+            signal = 'short'
+    return signal, is_recommended
+
+
+class _SymbolSignal:
+    """单个交易对的信号状态"""
+
+    __slots__ = ('bar_timestamp', 'signal', 'alerted')
+
+    def __init__(self):
+        self.bar_timestamp = -1
+        self.signal = 'none'
+        self.alerted = ()
+
+
+class SignalDetector:
+    """接收K线更新事件，在信号变化时产生告警事件"""
+
+    def __init__(self, history: Optional[int] = None):
+        """
+        Args:
+            history: 保留的最近告警数量
+        """
+        self._states: Dict[Tuple[str, str], _SymbolSignal] = {}
+        self._listeners: List[SignalListener] = []
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=int(history or STREAM_CONFIG.get('signal_history', 200)))
+        self.evaluations = 0
+        self.signals = 0
+        self.duplicates = 0
+
+    def add_listener(self, listener: SignalListener) -> None:
+        self._listeners.append(listener)
+
+    def on_stream_event(self, event: Dict[str, Any]) -> None:
+        """StreamIngestor 事件回调"""
+        if event.get('type') != 'kline':
+            return
+        self.evaluate(event['exchange'], event['symbol'], int(event['bar'][0]), event['state'].values(),
+                      event.get('event_time'), event.get('received_at'))
+
+    def evaluate(self, exchange: str, symbol: str, bar_timestamp: int, values: Dict[str, Any],
+                 event_time: Optional[float] = None, received_at: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        重新评估一个交易对的信号
+
+        Args:
+            bar_timestamp: 当前K线开盘时间（毫秒），用于按K线去重
+            values: StreamingIndicators.values() 形式的指标值
+            event_time: 交易所推送时间（毫秒）
+            received_at: 本地接收时间（time.time()）
+
+        Returns:
+            产生的告警事件，无变化或重复时返回 None
+        """
+        if values.get('valid'):
+            signal, is_recommended = classify_signal(values['volume_ratio'], values['ma5'],
+                                                     values['ma10'], values['ma20'])
+        else:
+            signal, is_recommended = 'none', False
+
+        key = (exchange, symbol)
+        with self._lock:
+            self.evaluations += 1
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _SymbolSignal()
+            if bar_timestamp > state.bar_timestamp:
+                # 新K线开盘，按新K线重新告警
+                state.bar_timestamp = bar_timestamp
+                state.signal = 'none'
+                state.alerted = ()
+            elif bar_timestamp < state.bar_timestamp:
+                return None
+
+            previous = state.signal
+            if signal == previous:
+                return None
+            state.signal = signal
+            if signal == 'none':
+                return None
+            if signal in state.alerted:
+                self.duplicates += 1
+                return None
+            state.alerted = state.alerted + (signal,)
+            self.signals += 1
+
+            detected_at = time.time()
+            alert = {
+                'exchange': exchange,
+                'symbol': symbol,
+                'signal': signal,
+                'previous_signal': previous,
+                'is_recommended': is_recommended,
+                'bar_timestamp': bar_timestamp,
+                'volume_ratio': float(values['volume_ratio']),
+                'current_price': float(values['close']),
+                'event_time': event_time,
+                'received_at': received_at,
+                'detected_at': detected_at,
+                # 交易所推送时间 -> 检测完成
+                'latency_ms': detected_at * 1000 - event_time if event_time else None,
+            }
+            self._recent.append(alert)
+
+        logger.info(f"🚨 {exchange} {symbol} 信号 {previous} → {signal}，交易量比率 {alert['volume_ratio']:.2f}x")
+        for listener in self._listeners:
+            try:
+                listener(alert)
+            except Exception as e:
+                logger.error(f"信号事件回调失败: {e}")
+        return alert
+
+    def current_signals(self) -> Dict[Tuple[str, str], str]:
+        """当前处于 long/short/hold 的交易对"""
+        with self._lock:
+            return {key: state.signal for key, state in self._states.items() if state.signal != 'none'}
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近的告警事件（新的在前）"""
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'symbols': len(self._states),
+                'evaluations': self.evaluations,
+                'signals': self.signals,
+                'duplicates': self.duplicates,
+            }
@@ -0,0 +1,134 @@
+"""
+并发请求合并（single-flight）
+
+同一键的请求在前一次加载完成前到达时，不再重复请求上游，而是等待并共享这次加载的结果（或异常）。
+加载完成后立即从在途表中移除，之后的请求会重新加载（结果的复用交给 cache.TTLCache）。
+SingleFlight 用于多线程（Dash 的 threaded 服务器、扫描线程池），AsyncSingleFlight 用于同一事件循环内的协程。
+"""
+
+import asyncio
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次在途加载"""
+
+    __slots__ = ('done', 'value', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _FlightStats:
+    """调用统计：executions 为实际发出的上游请求数，coalesced 为被合并（节省）的请求数"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _stats(self, in_flight: int) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'in_flight': in_flight,
+            'saved_ratio': self.coalesced / self.calls if self.calls else 0.0,
+        }
+
+
+class SingleFlight(_FlightStats):
+    """线程间的请求合并"""
+
+    def __init__(self, name: str = 'flight'):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        执行 fn() 并返回结果；同一 key 已有在途调用时等待并共享其结果
+
+        fn 抛出的异常会同样抛给所有等待者。
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"{self.name} {key} 合并了 {call.waiters} 个并发请求")
+        return call.value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._stats(len(self._calls))
+
+
+class AsyncSingleFlight(_FlightStats):
+    """同一事件循环内协程间的请求合并"""
+
+    def __init__(self, name: str = 'flight'):
+        super().__init__(name)
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        等待 fn() 的结果；同一 key 已有在途任务时共享该任务
+
+        等待者被取消不会取消共享的任务，其余等待者仍能拿到结果。
+        """
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return self._stats(len(self._tasks))
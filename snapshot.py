@@ -0,0 +1,222 @@
+"""
+交易机会排行快照
+
+后台更新线程每次扫描（或按推送重新排序）后发布一个不可变、带版本号的快照；
+版本号未变化时界面回调可以直接返回 no_update。
+to_columns() 生成发往浏览器的列式 JSON，供 assets/ranking.js 在客户端筛选和排序；
+indices() / view() 供 api.py 的 /opportunities 在服务端排序，某个 (排序字段, 方向) 第一次被请求时
+才计算排序索引并保存在快照上（响应本身也按版本号缓存），没有请求的排序方式不做任何计算。
+发布时同时计算与上一版本的差异（delta），供 api.py 的 SSE 推送只发送变化的行。
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 界面可选的排序字段
+SORT_KEYS = ('volume_ratio', 'composite_score', 'current_volume', 'price_change_24h', 'current_price')
+# 列式 JSON 中的数值列（表格与排行图表用到的字段）
+NUMERIC_COLUMNS = SORT_KEYS + ('avg_volume_30',)
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+def row_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    """行的唯一标识 (交易所, 交易对)"""
+    return row.get('exchange', ''), row.get('symbol', '')
+
+
+def diff_rows(old: Sequence[Dict[str, Any]], new: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]],
+                                                                                     List[Tuple[str, str]]]:
+    """
+    比较两个版本的行
+
+    Returns:
+        (新增或内容变化的行, 被移除的行标识)
+    """
+    previous = {row_key(row): row for row in old}
+    upserts = []
+    for row in new:
+        key = row_key(row)
+        if previous.pop(key, None) != row:
+            upserts.append(row)
+    return upserts, list(previous)
+
+
+class RankingSnapshot:
+    """
+    不可变的排行快照
+
+    rows 中的字典由快照独占，调用方只读不写。
+    """
+
+    def __init__(self, opportunities: Iterable[Dict[str, Any]], version: int = 0,
+                 updated_at: Optional[datetime] = None):
+        """
+        Args:
+            opportunities: 按分析器排序规则排好的交易机会
+            version: 快照版本号
+            updated_at: 数据更新时间
+        """
+        self.version = version
+        self.updated_at = updated_at
+        self.created_at = time.time()
+        self.rows: Tuple[Dict[str, Any], ...] = tuple(dict(o) for o in opportunities)
+        self._size = len(self.rows)
+        self._columns_payload: Optional[Dict[str, Any]] = None
+        # 相对上一版本的差异，由 SnapshotPublisher 发布时填入
+        self.delta: Optional[Dict[str, Any]] = None
+
+        exchange_names = [o.get('exchange', '') for o in self.rows]
+        self.exchanges: Tuple[str, ...] = tuple(dict.fromkeys(exchange_names))
+        codes = {name: i for i, name in enumerate(self.exchanges)}
+        # 每行所属交易所在 exchanges 中的下标
+        self.exchange_codes: np.ndarray = _readonly(np.fromiter(
+            (codes[name] for name in exchange_names), dtype=np.int32, count=len(self.rows)))
+
+        # 排序字段 -> 列数组（缺失值按 0 处理，与原先 o.get(key, 0) 的排序一致）
+        self.columns: Dict[str, np.ndarray] = {}
+        for key in SORT_KEYS:
+            values = np.fromiter((o.get(key, 0) or 0 for o in self.rows), dtype=np.float64, count=len(self.rows))
+            self.columns[key] = _readonly(np.nan_to_num(values, nan=0.0))
+        # (排序字段, 是否升序) -> 全部行的排序索引，首次使用时计算
+        self._order: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _row(self, index: int) -> Dict[str, Any]:
+        return self.rows[index]
+
+    def _sorted(self, order_key: Tuple[str, bool]) -> np.ndarray:
+        order = self._order.get(order_key)
+        if order is None:
+            key, ascending = order_key
+            values = self.columns[key]
+            # 稳定排序：相同值保持分析器给出的原始顺序，与 sorted() 结果一致
+            order = _readonly(np.argsort(values if ascending else -values, kind='stable').astype(np.int32))
+            # 并发请求可能重复计算，结果相同，后写入的覆盖即可
+            self._order[order_key] = order
+        return order
+
+    def indices(self, sort_by: str = 'volume_ratio', limit: Optional[int] = None,
+                exchanges: Optional[Sequence[str]] = None, ascending: bool = False) -> np.ndarray:
+        """
+        排序后前 limit 行的索引
+
+        Args:
+            sort_by: 排序字段，不在 SORT_KEYS 中时按 volume_ratio
+            limit: 返回数量，None 表示全部
+            exchanges: 只保留这些交易所（空表示全部）
+            ascending: 是否升序
+        """
+        order = self._sorted((sort_by if sort_by in SORT_KEYS else 'volume_ratio', bool(ascending)))
+        end = None if limit is None else max(0, int(limit))
+        if exchanges:
+            wanted = set(exchanges)
+            codes = [i for i, name in enumerate(self.exchanges) if name in wanted]
+            order = order[np.isin(self.exchange_codes[order], codes)]
+        return order[:end]
+
+    def to_columns(self) -> Dict[str, Any]:
+        """
+        列式 JSON（每个版本只生成一次，所有客户端共用）
+
+        交易所列为 exchanges 中的下标；除价格外的数值列保留 6 位有效数字以压缩体积。
+        """
+        if self._columns_payload is None:
+            codes = {name: i for i, name in enumerate(self.exchanges)}
+            columns: Dict[str, List[Any]] = {
+                'symbol': [o.get('symbol', '') for o in self.rows],
+                'exchange': [codes[o.get('exchange', '')] for o in self.rows],
+                'signal': [o.get('signal', 'none') for o in self.rows],
+            }
+            for key in NUMERIC_COLUMNS:
+                values = self.columns[key] if key in self.columns else np.nan_to_num(np.fromiter(
+                    (o.get(key, 0) or 0 for o in self.rows), dtype=np.float64, count=len(self.rows)))
+                values = values.tolist()
+                columns[key] = values if key == 'current_price' else [float(f"{v:.6g}") for v in values]
+            self._columns_payload = {
+                'version': self.version,
+                'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
+                'exchanges': list(self.exchanges),
+                'columns': columns,
+            }
+        return self._columns_payload
+
+    def view(self, sort_by: str = 'volume_ratio', limit: Optional[int] = None,
+             exchanges: Optional[Sequence[str]] = None, ascending: bool = False) -> List[Dict[str, Any]]:
+        """按 indices() 取出对应的交易机会"""
+        return [self._row(i) for i in self.indices(sort_by, limit, exchanges, ascending).tolist()]
+
+
+class SnapshotPublisher:
+    """持有当前快照，后台线程发布、回调线程读取"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+        self._current = RankingSnapshot((), 0)
+
+    @property
+    def current(self) -> RankingSnapshot:
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def publish(self, opportunities: List[Dict[str, Any]], updated_at: Optional[datetime] = None) -> RankingSnapshot:
+        """
+        发布新快照；内容与当前快照相同时不升级版本，返回当前快照
+        """
+        current = self._current
+        if current.version and list(current.rows) == opportunities:
+            return current
+        # 在锁外构建，读取方始终拿到完整的旧快照或新快照
+        snapshot = RankingSnapshot(opportunities, 0, updated_at)
+        upserts, removed = diff_rows(current.rows, snapshot.rows)
+        with self._lock:
+            base = self._current
+            snapshot.version = base.version + 1
+            if base is current:
+                snapshot.delta = {
+                    'version': snapshot.version,
+                    'base_version': base.version,
+                    'upserts': upserts,
+                    'removed': [list(key) for key in removed],
+                }
+            self._current = snapshot
+            self._updated.notify_all()
+        logger.debug(f"发布排行快照 v{snapshot.version}: {len(snapshot)} 个交易对")
+        return snapshot
+
+    def install(self, snapshot: RankingSnapshot) -> bool:
+        """
+        直接替换为外部构建的快照（如扫描进程写入的快照文件），版本号沿用快照自身
+
+        Returns:
+            版本号不高于当前快照时不替换，返回 False
+        """
+        with self._lock:
+            if snapshot.version <= self._current.version:
+                return False
+            self._current = snapshot
+            self._updated.notify_all()
+        logger.debug(f"载入排行快照 v{snapshot.version}: {len(snapshot)} 个交易对")
+        return True
+
+    def wait_for_update(self, version: int, timeout: Optional[float] = None) -> RankingSnapshot:
+        """等待版本号超过 version 的快照，超时返回当前快照"""
+        with self._lock:
+            self._updated.wait_for(lambda: self._current.version > version, timeout)
+            return self._current
@@ -0,0 +1,242 @@
+"""
+排行快照文件
+
+扫描进程（scanner_worker.py）把每个版本的 RankingSnapshot 写成一个二进制文件，
+任意数量的 Web 进程以只读 mmap 打开：数值列和交易所列都是文件上的 NumPy 视图，不需要复制；
+排序索引与内存中的快照一样在首次请求时计算。行内容按需解码，取前 k 行只解析这 k 行。
+
+写入时先写临时文件再 os.replace，新打开的总是完整的新版本。POSIX 上读取方已映射的旧文件不受影响；
+Windows 不允许替换被其他进程映射的文件，因此 Windows 上读取方把文件整体读入内存后立即关闭（MAP_FILES），
+写入方遇到读取方恰好打开文件的短暂窗口时重试替换。
+
+文件布局（小端，每段按 8 字节对齐）：
+    头部                 magic, version, updated_at, 行数, 交易所数, meta 长度, 行数据长度
+    meta                 JSON：交易所列表、排序字段、相对上一版本的 delta
+    columns              float64[排序字段数, 行数]
+    exchange_codes       int32[行数]，每行所属交易所在交易所列表中的下标
+    row_offsets          int64[行数 + 1]
+    rows                 每行一个 JSON
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from snapshot import SORT_KEYS, RankingSnapshot, SnapshotPublisher
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CRSNAP02'
+# 是否以 mmap 打开快照文件；Windows 上映射中的文件无法被 os.replace 替换，改为读入内存
+MAP_FILES = os.name != 'nt'
+# 替换文件时遇到 PermissionError（Windows 上读取方正打开文件）的重试次数与间隔（秒）
+REPLACE_RETRIES = 20
+REPLACE_RETRY_DELAY = 0.05
+_HEADER = struct.Struct('<8sQdIIQQ')
+
+SnapshotListener = Callable[[RankingSnapshot], None]
+
+
+def _pad(length: int) -> int:
+    return (-length) % 8
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def write_snapshot(path: str, snapshot: RankingSnapshot) -> None:
+    """把快照原子地写入 path"""
+    n = len(snapshot)
+    exchanges = list(snapshot.exchanges)
+
+    encoded_rows = [json.dumps(row, ensure_ascii=False, separators=(',', ':'),
+                               default=_json_default).encode('utf-8') for row in snapshot.rows]
+    row_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded_rows], out=row_offsets[1:])
+    blob = b''.join(encoded_rows)
+
+    meta = json.dumps({
+        'exchanges': exchanges,
+        'sort_keys': list(SORT_KEYS),
+        'delta': snapshot.delta,
+    }, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+    updated_at = snapshot.updated_at.timestamp() if snapshot.updated_at else float('nan')
+    sections = [
+        meta,
+        np.array([snapshot.columns[key] for key in SORT_KEYS], dtype=np.float64).reshape(len(SORT_KEYS), n).tobytes(),
+        np.asarray(snapshot.exchange_codes, dtype=np.int32).tobytes(),
+        row_offsets.tobytes(),
+        blob,
+    ]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, snapshot.version, updated_at, n, len(exchanges), len(meta), len(blob)))
+        for section in sections:
+            f.write(section)
+            f.write(b'\0' * _pad(len(section)))
+    for attempt in range(REPLACE_RETRIES + 1):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_RETRIES:
+                os.remove(tmp_path)
+                raise
+            time.sleep(REPLACE_RETRY_DELAY)
+
+
+def read_version(path: str) -> Optional[int]:
+    """只读取头部中的版本号，文件不存在或格式不符时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size or header[:8] != MAGIC:
+        return None
+    return _HEADER.unpack(header)[1]
+
+
+class MappedSnapshot(RankingSnapshot):
+    """以只读 mmap 打开（Windows 上读入内存）的快照文件，接口与 RankingSnapshot 相同"""
+
+    @classmethod
+    def open(cls, path: str) -> 'MappedSnapshot':
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if MAP_FILES else f.read()
+        magic, version, updated_at, n, exchange_count, meta_len, blob_len = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是排行快照文件")
+
+        offset = _HEADER.size
+        meta = json.loads(bytes(buffer[offset:offset + meta_len]))
+        if tuple(meta.get('sort_keys', ())) != SORT_KEYS:
+            raise ValueError(f"{path} 的排序字段与当前版本不一致")
+        offset += meta_len + _pad(meta_len)
+
+        def take(dtype: Any, count: int) -> np.ndarray:
+            nonlocal offset
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes + _pad(array.nbytes)
+            return array
+
+        columns = take(np.float64, len(SORT_KEYS) * n).reshape(len(SORT_KEYS), n)
+        exchange_codes = take(np.int32, n)
+        row_offsets = take(np.int64, n + 1)
+
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.updated_at = None if updated_at != updated_at else datetime.fromtimestamp(updated_at)
+        snapshot.created_at = time.time()
+        snapshot.delta = meta.get('delta')
+        snapshot._columns_payload = None
+        snapshot._size = n
+        snapshot.exchanges = tuple(meta['exchanges'])
+        snapshot.columns = {key: columns[i] for i, key in enumerate(SORT_KEYS)}
+        snapshot.exchange_codes = exchange_codes
+        snapshot._order = {}
+        snapshot._buffer = buffer
+        snapshot._row_offsets = row_offsets
+        snapshot._blob_offset = offset
+        snapshot._decoded: Dict[int, Dict[str, Any]] = {}
+        snapshot._all_rows: Optional[Tuple[Dict[str, Any], ...]] = None
+        snapshot.path = path
+        return snapshot
+
+    def _row(self, index: int) -> Dict[str, Any]:
+        row = self._decoded.get(index)
+        if row is None:
+            start = self._blob_offset + int(self._row_offsets[index])
+            end = self._blob_offset + int(self._row_offsets[index + 1])
+            row = self._decoded[index] = json.loads(self._buffer[start:end])
+        return row
+
+    @property
+    def rows(self) -> Tuple[Dict[str, Any], ...]:
+        """全部行（首次访问时解码）"""
+        if self._all_rows is None:
+            self._all_rows = tuple(self._row(i) for i in range(self._size))
+        return self._all_rows
+
+
+class SnapshotFollower:
+    """Web 进程中跟踪快照文件，出现新版本时载入到 SnapshotPublisher"""
+
+    def __init__(self, path: str, publisher: SnapshotPublisher, poll_interval: float = 1.0):
+        """
+        Args:
+            path: 扫描进程写入的快照文件
+            publisher: 界面回调和 API 读取的发布器
+            poll_interval: 检查文件的间隔（秒）
+        """
+        self.path = path
+        self.publisher = publisher
+        self.poll_interval = float(poll_interval)
+        self._listeners: List[SnapshotListener] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self.loads = 0
+
+    def add_listener(self, listener: SnapshotListener) -> None:
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='snapshot-follower', daemon=True)
+        self._thread.start()
+        logger.info(f"从 {self.path} 读取扫描进程发布的排行快照")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def poll(self) -> bool:
+        """检查一次文件，载入了新版本时返回 True"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return False
+        self._stat = stat
+        version = read_version(self.path)
+        if version is None or version <= self.publisher.version:
+            return False
+        snapshot = MappedSnapshot.open(self.path)
+        if not self.publisher.install(snapshot):
+            return False
+        self.loads += 1
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"快照回调失败: {e}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"读取排行快照失败: {e}")
+            self._stop.wait(self.poll_interval)
@@ -2,21 +2,43 @@
 # -*- coding: utf-8 -*-
 """
 启动交易系统
+
+    python start.py                      # Web 进程内扫描（默认）
+    python start.py --external-scanner   # 另起扫描进程写入快照文件，Web 进程只读取
 """
 
+import argparse
+import subprocess
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="启动加密货币交易分析系统")
+    parser.add_argument('--external-scanner', action='store_true',
+                        help='在独立进程中运行扫描 (python cli.py worker)，Web 进程通过快照文件读取结果')
+    args = parser.parse_args()
+
     print("🚀 启动加密货币交易分析系统")
     print("🌐 Dash应用访问地址: http://localhost:8050")
     print("💡 React前端访问地址: http://localhost:5173")
-    
+
+    scanner = None
     try:
+        if args.external_scanner:
+            # 必须在导入 app 之前设置，config.SCANNER_CONFIG 读取该环境变量
+            os.environ['SCANNER_MODE'] = 'external'
+            cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+            scanner = subprocess.Popen([sys.executable, cli, 'worker'])
+            print(f"🔍 扫描进程已启动 (pid {scanner.pid})")
+
         from app import app
         app.run_server(debug=False, host='0.0.0.0', port=8050)
     except Exception as e:
         print(f"❌ 启动失败: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if scanner is not None:
+            scanner.terminate()
+            scanner.wait(timeout=10)
@@ -0,0 +1,472 @@
+"""
+WebSocket 实时行情接入
+
+按交易所订阅K线与 ticker 推送，实时写入分析器的K线存储（CandleStore），并维护每个交易对的
+流式指标状态（StreamingIndicators）。放量在推送到达时即可发现，不必等待下一次 REST 轮询。
+
+连接断开后按指数退避（带随机抖动）重连；每次连接建立、以及推送中出现K线缺口时，
+通过 REST 增量补齐K线并重建该交易对的指标状态。
+推送的 ticker 每隔 ticker_flush_interval 秒批量并入分析器的 ticker 缓存（merge_streamed_tickers），
+交易对筛选和 ticker 预筛选在 ticker_ttl 内直接使用，不再通过 REST 轮询。
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import aiohttp
+
+from config import STREAM_CONFIG
+from streaming_indicators import StreamingIndicators
+
+logger = logging.getLogger(__name__)
+
+StreamKey = Tuple[str, str]
+Listener = Callable[[Dict[str, Any]], None]
+
+
+class StreamAdapter:
+    """交易所推送协议适配器：生成订阅消息，并把推送解析为统一的事件字典"""
+
+    name = 'base'
+    urls: Dict[str, str] = {}
+    streams_per_symbol = 2
+
+    def __init__(self, url: Optional[str] = None, timeframe: str = '1h',
+                 market_type: str = 'spot', max_streams: Optional[int] = None):
+        self.url = url or self.urls.get(market_type) or self.urls.get('spot', '')
+        self.timeframe = timeframe
+        self.market_type = market_type
+        self.max_streams = int(max_streams or STREAM_CONFIG.get('max_streams_per_connection', 200))
+
+    @property
+    def symbols_per_connection(self) -> int:
+        return max(1, self.max_streams // self.streams_per_symbol)
+
+    def market_id(self, inst: Any, symbol: str) -> str:
+        market = (getattr(inst, 'markets', None) or {}).get(symbol) or {}
+        return str(market.get('id') or symbol.replace('/', '')).upper()
+
+    def subscribe_messages(self, market_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def parse(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        解析一条推送
+
+        Returns:
+            事件列表：{'type': 'kline', 'id', 'bar': [ts, o, h, l, c, v], 'closed', 'event_time'}
+            或 {'type': 'ticker', 'id', 'ticker': {...}, 'event_time'}
+        """
+        raise NotImplementedError
+
+
+class BinanceStreamAdapter(StreamAdapter):
+    """币安组合流（<symbol>@kline_<interval> 与 <symbol>@ticker）"""
+
+    name = 'binance'
+    urls = {
+        'spot': 'wss://stream.binance.com:9443/stream',
+        'future': 'wss://fstream.binance.com/stream',
+        'swap': 'wss://fstream.binance.com/stream',
+    }
+    # 单条 SUBSCRIBE 消息的参数数量上限
+    params_per_message = 100
+
+    def subscribe_messages(self, market_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        params = []
+        for market_id in market_ids:
+            stream_id = market_id.lower()
+            params.append(f"{stream_id}@kline_{self.timeframe}")
+            params.append(f"{stream_id}@ticker")
+        step = self.params_per_message
+        return [
+            {'method': 'SUBSCRIBE', 'params': params[i:i + step], 'id': i // step + 1}
+            for i in range(0, len(params), step)
+        ]
+
+    def parse(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        data = message.get('data', message)
+        event = data.get('e')
+        if event == 'kline':
+            k = data['k']
+            if k.get('i') != self.timeframe:
+                return []
+            return [{
+                'type': 'kline',
+                'id': str(data['s']).upper(),
+                'event_time': data.get('E'),
+                'closed': bool(k.get('x')),
+                'bar': [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])],
+            }]
+        if event == '24hrTicker':
+            last = float(data['c'])
+            base_volume = float(data['v'])
+            return [{
+                'type': 'ticker',
+                'id': str(data['s']).upper(),
+                'event_time': data.get('E'),
+                'ticker': {
+                    'timestamp': data.get('E'),
+                    'last': last,
+                    'close': last,
+                    'open': float(data.get('o', 0) or 0),
+                    'high': float(data.get('h', 0) or 0),
+                    'low': float(data.get('l', 0) or 0),
+                    'baseVolume': base_volume,
+                    'quoteVolume': float(data.get('q', 0) or 0),
+                    'percentage': float(data.get('P', 0) or 0),
+                },
+            }]
+        return []
+
+
+# 交易所名称 -> 推送适配器
+STREAM_ADAPTERS: Dict[str, type] = {
+    'binance': BinanceStreamAdapter,
+}
+
+
+class StreamIngestor:
+    """在后台事件循环中维护推送连接，把K线与 ticker 写入分析器状态"""
+
+    def __init__(self, analyzer: Any, timeframe: Optional[str] = None,
+                 adapters: Optional[Dict[str, StreamAdapter]] = None):
+        """
+        Args:
+            analyzer: CryptoAnalyzer 或 SyncCryptoAnalyzer（需提供 exchanges / exchange_by_symbol /
+                      fetch_ohlcv_many / get_streaming_opportunities）
+            timeframe: 订阅的K线周期
+            adapters: 交易所名称 -> 适配器，默认按 STREAM_ADAPTERS 和交易所配置创建
+        """
+        self.analyzer = analyzer
+        self.timeframe = timeframe or STREAM_CONFIG.get('timeframe', '1h')
+        self.backfill_limit = int(STREAM_CONFIG.get('backfill_limit', 100))
+        self.reconnect_min_delay = float(STREAM_CONFIG.get('reconnect_min_delay', 1))
+        self.reconnect_max_delay = float(STREAM_CONFIG.get('reconnect_max_delay', 60))
+        self.heartbeat = float(STREAM_CONFIG.get('heartbeat', 30))
+        self.ticker_flush_interval = float(STREAM_CONFIG.get('ticker_flush_interval', 1))
+        self.adapters = adapters if adapters is not None else self._default_adapters()
+
+        self.states: Dict[StreamKey, StreamingIndicators] = {}
+        self.tickers: Dict[StreamKey, Dict[str, Any]] = {}
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+        self._instances = {name: inst for name, _, inst in analyzer.exchanges}
+        self._timeframe_ms = self._parse_timeframe_ms()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._backfill_tasks: Set[asyncio.Task] = set()
+        self._pending_backfill: Set[StreamKey] = set()
+        # 交易所 -> 交易对 -> 尚未并入分析器 ticker 缓存的最新推送
+        self._pending_tickers: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._symbols: List[str] = []
+
+        self.active_connections = 0
+        self.reconnects = 0
+        self.frames = 0
+        self.kline_updates = 0
+        self.ticker_updates = 0
+        self.tickers_merged = 0
+        self.backfilled_symbols = 0
+        self.gaps = 0
+        self.last_message_at = 0.0
+
+    def _default_adapters(self) -> Dict[str, StreamAdapter]:
+        urls = STREAM_CONFIG.get('urls') or {}
+        adapters = {}
+        for name, conf, _ in self.analyzer.exchanges:
+            adapter_cls = STREAM_ADAPTERS.get(name)
+            if adapter_cls is None:
+                continue
+            market_type = conf.get('options', {}).get('defaultType', 'spot')
+            adapters[name] = adapter_cls(urls.get(name), self.timeframe, market_type)
+        return adapters
+
+    def _parse_timeframe_ms(self) -> int:
+        for inst in self._instances.values():
+            try:
+                return int(inst.parse_timeframe(self.timeframe)) * 1000
+            except Exception:
+                continue
+        units = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+        return int(self.timeframe[:-1]) * units[self.timeframe[-1]] * 1000
+
+    @property
+    def connected(self) -> bool:
+        return self.active_connections > 0
+
+    def add_listener(self, listener: Listener) -> None:
+        """注册事件回调（在推送线程中调用），事件字典含 type/exchange/symbol 以及 state 或 ticker"""
+        self._listeners.append(listener)
+
+    # ---- 生命周期 ----
+
+    def start(self, symbols: Optional[Sequence[str]] = None) -> None:
+        """启动后台事件循环并订阅交易对（默认 analyzer.symbols）"""
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='stream-ingest', daemon=True)
+            self._thread.start()
+        self.update_symbols(symbols if symbols is not None else self.analyzer.symbols)
+
+    def update_symbols(self, symbols: Sequence[str]) -> None:
+        """交易对列表变化时重建订阅"""
+        symbols = list(symbols)
+        if self._loop is None or symbols == self._symbols:
+            return
+        self._symbols = symbols
+        asyncio.run_coroutine_threadsafe(self._resubscribe(symbols), self._loop).result()
+
+    def stop(self) -> None:
+        """关闭全部连接并停止事件循环"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+        self._symbols = []
+
+    async def _shutdown(self) -> None:
+        await self._cancel_tasks()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _cancel_tasks(self) -> None:
+        tasks = self._tasks + list(self._backfill_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._backfill_tasks.clear()
+
+    async def _resubscribe(self, symbols: List[str]) -> None:
+        await self._cancel_tasks()
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+
+        by_exchange: Dict[str, List[str]] = {}
+        for symbol in symbols:
+            name = self.analyzer.exchange_by_symbol.get(symbol)
+            if name in self.adapters and name in self._instances:
+                by_exchange.setdefault(name, []).append(symbol)
+
+        wanted = {(name, symbol) for name, group in by_exchange.items() for symbol in group}
+        with self._lock:
+            for key in list(self.states):
+                if key not in wanted:
+                    del self.states[key]
+                    self.tickers.pop(key, None)
+
+        for name, group in by_exchange.items():
+            adapter = self.adapters[name]
+            step = adapter.symbols_per_connection
+            for i in range(0, len(group), step):
+                chunk = group[i:i + step]
+                self._tasks.append(asyncio.ensure_future(self._connection_loop(name, adapter, chunk)))
+            logger.info(f"📡 {name} 订阅 {len(group)} 个交易对的实时推送，"
+                        f"共 {(len(group) + step - 1) // step} 个连接")
+        if by_exchange and hasattr(self.analyzer, 'merge_streamed_tickers'):
+            self._tasks.append(asyncio.ensure_future(self._ticker_flush_loop()))
+
+    # ---- 连接 ----
+
+    async def _connection_loop(self, name: str, adapter: StreamAdapter, symbols: List[str]) -> None:
+        inst = self._instances[name]
+        ids = {adapter.market_id(inst, symbol): symbol for symbol in symbols}
+        delay = self.reconnect_min_delay
+        while True:
+            try:
+                async with self._session.ws_connect(adapter.url, heartbeat=self.heartbeat) as ws:
+                    for message in adapter.subscribe_messages(list(ids)):
+                        await ws.send_json(message)
+                    self.active_connections += 1
+                    try:
+                        # 先订阅再补齐：补齐期间到达的推送暂存在连接缓冲区中，补齐后按时间戳合并
+                        await self._backfill(name, symbols)
+                        delay = self.reconnect_min_delay
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._handle(name, adapter, ids, msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                    finally:
+                        self.active_connections -= 1
+                logger.warning(f"{name} 推送连接已断开")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{name} 推送连接失败: {e}")
+
+            self.reconnects += 1
+            wait = delay * random.uniform(0.5, 1.0)
+            logger.info(f"{name} 将在 {wait:.1f} 秒后重连推送")
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    def _handle(self, name: str, adapter: StreamAdapter, ids: Dict[str, str], raw: str) -> None:
+        try:
+            events = adapter.parse(json.loads(raw))
+        except Exception as e:
+            logger.debug(f"{name} 推送解析失败: {e}")
+            return
+        self.frames += 1
+        self.last_message_at = time.time()
+
+        for event in events:
+            symbol = ids.get(event['id'])
+            if symbol is None:
+                continue
+            key = (name, symbol)
+            if event['type'] == 'kline':
+                self._on_kline(key, event)
+            elif event['type'] == 'ticker':
+                with self._lock:
+                    self.tickers[key] = event['ticker']
+                    self._pending_tickers.setdefault(name, {})[symbol] = event['ticker']
+                self.ticker_updates += 1
+                self._notify({'type': 'ticker', 'exchange': name, 'symbol': symbol,
+                              'ticker': event['ticker'], 'event_time': event.get('event_time'),
+                              'received_at': self.last_message_at})
+
+    def _on_kline(self, key: StreamKey, event: Dict[str, Any]) -> None:
+        name, symbol = key
+        bar = event['bar']
+        with self._lock:
+            state = self.states.get(key)
+            if state is None or key in self._pending_backfill:
+                state = None
+            else:
+                last_ts = state.last_timestamp
+                if last_ts is not None and bar[0] > last_ts + self._timeframe_ms:
+                    # 中间缺少K线（推送丢失），交给 REST 补齐
+                    self.gaps += 1
+                    state = None
+                else:
+                    state.update(bar[0], bar[4], bar[5])
+        if state is None:
+            self._schedule_backfill(key)
+            return
+
+        store = getattr(self.analyzer, 'candle_store', None)
+        if store is not None:
+            store.upsert((name, symbol, self.timeframe), bar)
+        self.kline_updates += 1
+        self._notify({'type': 'kline', 'exchange': name, 'symbol': symbol, 'state': state,
+                      'bar': bar, 'closed': event.get('closed', False),
+                      'event_time': event.get('event_time'), 'received_at': self.last_message_at})
+
+    def _notify(self, event: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"推送事件回调失败: {e}")
+
+    async def _ticker_flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ticker_flush_interval)
+            self.flush_tickers()
+
+    def flush_tickers(self) -> int:
+        """把累积的推送 ticker 并入分析器的 ticker 缓存，返回合并的数量"""
+        with self._lock:
+            pending, self._pending_tickers = self._pending_tickers, {}
+        merged = 0
+        for name, tickers in pending.items():
+            try:
+                self.analyzer.merge_streamed_tickers(name, tickers)
+                merged += len(tickers)
+            except Exception as e:
+                logger.error(f"{name} 推送 ticker 并入缓存失败: {e}")
+        self.tickers_merged += merged
+        return merged
+
+    # ---- REST 补齐 ----
+
+    def _schedule_backfill(self, key: StreamKey) -> None:
+        with self._lock:
+            if key in self._pending_backfill:
+                return
+            self._pending_backfill.add(key)
+        # 保留任务引用，避免运行中被回收；停止或重新订阅时与连接任务一起取消
+        task = asyncio.ensure_future(self._backfill(key[0], [key[1]]))
+        self._backfill_tasks.add(task)
+        task.add_done_callback(self._backfill_done)
+
+    def _backfill_done(self, task: asyncio.Task) -> None:
+        self._backfill_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"REST 补齐任务异常: {task.exception()}")
+
+    async def _backfill(self, name: str, symbols: List[str]) -> None:
+        """通过 REST 补齐K线并重建指标状态"""
+        store = getattr(self.analyzer, 'candle_store', None)
+        if store is not None:
+            # 推送写入会刷新存储的获取时间，补齐前先置为过期，确保实际发起请求
+            for symbol in symbols:
+                store.expire((name, symbol, self.timeframe))
+
+        loop = asyncio.get_running_loop()
+        try:
+            bars_list = await loop.run_in_executor(
+                None, self.analyzer.fetch_ohlcv_many, symbols, self.timeframe, self.backfill_limit)
+        except asyncio.CancelledError:
+            # 被取消时解除待补齐标记，重新订阅后的推送可以再次触发补齐
+            with self._lock:
+                self._pending_backfill.difference_update((name, symbol) for symbol in symbols)
+            raise
+        except Exception as e:
+            logger.error(f"{name} REST 补齐K线失败: {e}")
+            bars_list = [None] * len(symbols)
+
+        restored = 0
+        with self._lock:
+            for symbol, bars in zip(symbols, bars_list):
+                key = (name, symbol)
+                self._pending_backfill.discard(key)
+                if bars is None or not len(bars):
+                    continue
+                self.states[key] = StreamingIndicators.from_bars(bars.tolist())
+                restored += 1
+        self.backfilled_symbols += restored
+        logger.debug(f"{name} REST 补齐 {restored}/{len(symbols)} 个交易对")
+
+    # ---- 查询 ----
+
+    def get_top_opportunities(self, top_n: int = 20, sort_by: str = 'volume_ratio',
+                              fallback: Optional[List[Dict]] = None) -> List[Dict]:
+        """按推送维护的最新指标排序；未订阅推送的交易对使用 fallback（最近一次全量扫描）中的结果"""
+        # 锁内只复制状态，排序在锁外进行，不阻塞推送回调
+        with self._lock:
+            states = [(symbol, state.copy()) for (_, symbol), state in self.states.items()]
+        return self.analyzer.get_streaming_opportunities(states, top_n, sort_by, fallback)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            streamed = len(self.states)
+        return {
+            'connections': self.active_connections,
+            'connection_tasks': len(self._tasks),
+            'streamed_symbols': streamed,
+            'reconnects': self.reconnects,
+            'frames': self.frames,
+            'kline_updates': self.kline_updates,
+            'ticker_updates': self.ticker_updates,
+            'tickers_merged': self.tickers_merged,
+            'backfilled_symbols': self.backfilled_symbols,
+            'gaps': self.gaps,
+            'last_message_at': self.last_message_at,
+        }
@@ -0,0 +1,216 @@
+"""
+流式指标状态
+
+每个交易对一个 StreamingIndicators 对象，维护 MA5/MA10/MA20 的滑动和、前30根均量的滑动和
+以及收益率窗口的 Welford 均值/方差。新K线开盘（push）或当前K线跳动（tick）时以 O(1) 更新，
+无需在整段历史上重新计算 rolling 窗口。
+
+所有环形缓冲和累计量存放在同一个 array('d') 中，对象只有三个槽位，
+几万个交易对也只占用数十 MB 内存。指标口径与 _analyze_dataframe / batch_indicators 一致：
+最后一根K线视为当前（可能仍在形成中的）K线，均量取不含当前K线的前30根。
+"""
+
+import math
+from array import array
+from typing import Dict, Optional, Sequence
+
+from batch_indicators import MA_WINDOWS, PRICE_CHANGE_24H_BARS, VOLUME_AVG_WINDOW
+from config import INDICATOR_CONFIG
+
+VOLATILITY_WINDOW = int(INDICATOR_CONFIG.get('price_volatility_period', 10))
+
+# 缓冲区布局：[收盘价环 | 成交量环 | 收益率环 | 累计量]
+_CLOSE_RING = max(max(MA_WINDOWS), PRICE_CHANGE_24H_BARS)
+_VOLUME_RING = VOLUME_AVG_WINDOW + 1
+_RETURN_RING = VOLATILITY_WINDOW
+_CLOSE_OFF = 0
+_VOLUME_OFF = _CLOSE_OFF + _CLOSE_RING
+_RETURN_OFF = _VOLUME_OFF + _VOLUME_RING
+_MA_SUM_OFF = _RETURN_OFF + _RETURN_RING
+_VOLUME_SUM = _MA_SUM_OFF + len(MA_WINDOWS)
+_RETURN_MEAN = _VOLUME_SUM + 1
+_RETURN_M2 = _RETURN_MEAN + 1
+_LAST_TS = _RETURN_M2 + 1
+_BUFFER_SIZE = _LAST_TS + 1
+
+# 累计量每更新这么多次后按缓冲区重新求和，消除浮点误差累积（均摊仍为 O(1)）
+_RESYNC_INTERVAL = 4096
+
+_EMPTY = array('d', [0.0]) * _BUFFER_SIZE
+
+
+class StreamingIndicators:
+    """单个交易对的增量指标状态"""
+
+    __slots__ = ('_buf', '_count', '_updates')
+
+    def __init__(self):
+        self._buf = array('d', _EMPTY)
+        self._buf[_LAST_TS] = -1.0
+        self._count = 0
+        self._updates = 0
+
+    @classmethod
+    def from_bars(cls, ohlcv: Sequence[Sequence[float]]) -> 'StreamingIndicators':
+        """用已有K线（ccxt fetch_ohlcv 行格式）初始化，最后一根视为当前K线"""
+        state = cls()
+        for bar in ohlcv:
+            state.update(bar[0], bar[4], bar[5])
+        return state
+
+    def copy(self) -> 'StreamingIndicators':
+        """状态快照（只复制定长缓冲区），供其他线程在锁外读取"""
+        state = StreamingIndicators.__new__(StreamingIndicators)
+        state._buf = array('d', self._buf)
+        state._count = self._count
+        state._updates = self._updates
+        return state
+
+    @property
+    def count(self) -> int:
+        """已接收的K线数量"""
+        return self._count
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        ts = self._buf[_LAST_TS]
+        return None if ts < 0 else int(ts)
+
+    def update(self, timestamp: float, close: float, volume: float) -> bool:
+        """
+        按时间戳分派：与当前K线相同则 tick，更新则 push，更早的数据忽略
+
+        Returns:
+            是否有新K线开盘
+        """
+        last_ts = self._buf[_LAST_TS]
+        if timestamp == last_ts:
+            self.tick(close, volume)
+            return False
+        if timestamp < last_ts:
+            return False
+        self.push(close, volume)
+        self._buf[_LAST_TS] = timestamp
+        return True
+
+    def push(self, close: float, volume: float) -> None:
+        """新K线开盘：上一根K线收盘进入历史窗口"""
+        buf = self._buf
+        n = self._count
+
+        # 收盘价滑动和：先读出将离开窗口的值，再覆盖环形槽位
+        for i, window in enumerate(MA_WINDOWS):
+            leaving = buf[_CLOSE_OFF + (n - window) % _CLOSE_RING] if n >= window else 0.0
+            buf[_MA_SUM_OFF + i] += close - leaving
+        prev_close = buf[_CLOSE_OFF + (n - 1) % _CLOSE_RING] if n else 0.0
+        buf[_CLOSE_OFF + n % _CLOSE_RING] = close
+
+        # 前30根均量：上一根K线进入窗口，第 n-31 根离开
+        if n:
+            buf[_VOLUME_SUM] += buf[_VOLUME_OFF + (n - 1) % _VOLUME_RING]
+            if n > VOLUME_AVG_WINDOW:
+                buf[_VOLUME_SUM] -= buf[_VOLUME_OFF + (n - 1 - VOLUME_AVG_WINDOW) % _VOLUME_RING]
+        buf[_VOLUME_OFF + n % _VOLUME_RING] = volume
+
+        # 收益率窗口（第 0 根K线没有收益率）
+        if n:
+            ret = close / prev_close - 1.0 if prev_close > 0 else 0.0
+            slot = _RETURN_OFF + n % _RETURN_RING
+            returns = n - 1  # 加入前窗口中的收益率数量（未截断）
+            if returns < _RETURN_RING:
+                k = returns + 1
+                delta = ret - buf[_RETURN_MEAN]
+                buf[_RETURN_MEAN] += delta / k
+                buf[_RETURN_M2] += delta * (ret - buf[_RETURN_MEAN])
+            else:
+                self._replace_return(buf[slot], ret, _RETURN_RING)
+            buf[slot] = ret
+
+        self._count = n + 1
+        self._after_update()
+
+    def tick(self, close: float, volume: float) -> None:
+        """当前K线跳动：替换最后一根K线的收盘价与成交量"""
+        n = self._count
+        if not n:
+            self.push(close, volume)
+            return
+        buf = self._buf
+        slot = _CLOSE_OFF + (n - 1) % _CLOSE_RING
+        delta = close - buf[slot]
+        for i in range(len(MA_WINDOWS)):
+            buf[_MA_SUM_OFF + i] += delta
+        buf[slot] = close
+        buf[_VOLUME_OFF + (n - 1) % _VOLUME_RING] = volume
+
+        if n > 1:
+            prev_close = buf[_CLOSE_OFF + (n - 2) % _CLOSE_RING]
+            ret = close / prev_close - 1.0 if prev_close > 0 else 0.0
+            ret_slot = _RETURN_OFF + (n - 1) % _RETURN_RING
+            self._replace_return(buf[ret_slot], ret, min(n - 1, _RETURN_RING))
+            buf[ret_slot] = ret
+        self._after_update()
+
+    def _replace_return(self, old: float, new: float, k: int) -> None:
+        """Welford 窗口替换：k 个样本中的 old 换成 new"""
+        buf = self._buf
+        old_mean = buf[_RETURN_MEAN]
+        delta = new - old
+        new_mean = old_mean + delta / k
+        buf[_RETURN_MEAN] = new_mean
+        buf[_RETURN_M2] += delta * (new - new_mean + old - old_mean)
+
+    def _after_update(self) -> None:
+        self._updates += 1
+        if self._updates >= _RESYNC_INTERVAL:
+            self._resync()
+
+    def _resync(self) -> None:
+        """按环形缓冲重新计算全部累计量"""
+        buf = self._buf
+        n = self._count
+        self._updates = 0
+        for i, window in enumerate(MA_WINDOWS):
+            buf[_MA_SUM_OFF + i] = math.fsum(buf[_CLOSE_OFF + (n - 1 - j) % _CLOSE_RING]
+                                             for j in range(min(n, window)))
+        closed = min(max(n - 1, 0), VOLUME_AVG_WINDOW)
+        buf[_VOLUME_SUM] = math.fsum(buf[_VOLUME_OFF + (n - 2 - j) % _VOLUME_RING] for j in range(closed))
+        k = min(max(n - 1, 0), _RETURN_RING)
+        returns = [buf[_RETURN_OFF + (n - 1 - j) % _RETURN_RING] for j in range(k)]
+        mean = math.fsum(returns) / k if k else 0.0
+        buf[_RETURN_MEAN] = mean
+        buf[_RETURN_M2] = math.fsum((r - mean) ** 2 for r in returns)
+
+    @property
+    def ready(self) -> bool:
+        """K线数量是否足以计算全部指标（与批量/逐个分析的最少31根一致）"""
+        return self._count > VOLUME_AVG_WINDOW
+
+    def values(self) -> Dict[str, float]:
+        """当前指标值，字段与 batch_indicators.latest_indicators 一致（单个交易对）"""
+        buf = self._buf
+        n = self._count
+        close = buf[_CLOSE_OFF + (n - 1) % _CLOSE_RING] if n else 0.0
+        volume = buf[_VOLUME_OFF + (n - 1) % _VOLUME_RING] if n else 0.0
+        closed = min(max(n - 1, 0), VOLUME_AVG_WINDOW)
+        avg_volume = buf[_VOLUME_SUM] / closed if closed else 0.0
+
+        result = {
+            'valid': n > VOLUME_AVG_WINDOW and close > 0 and volume > 0 and avg_volume > 0,
+            'close': close,
+            'volume': volume,
+            'avg_volume_30': avg_volume,
+            'volume_ratio': volume / avg_volume if avg_volume > 0 else 0.0,
+            'price_change_24h': 0.0,
+            'volatility': 0.0,
+        }
+        for i, window in enumerate(MA_WINDOWS):
+            result[f'ma{window}'] = buf[_MA_SUM_OFF + i] / window if n >= window else 0.0
+
+        if n >= PRICE_CHANGE_24H_BARS:
+            price_24h_ago = buf[_CLOSE_OFF + (n - PRICE_CHANGE_24H_BARS) % _CLOSE_RING]
+            if price_24h_ago > 0:
+                result['price_change_24h'] = (close - price_24h_ago) / price_24h_ago
+        if n - 1 >= _RETURN_RING and _RETURN_RING > 1:
+            result['volatility'] = math.sqrt(max(buf[_RETURN_M2], 0.0) / (_RETURN_RING - 1))
+        return result
@@ -0,0 +1,100 @@
+"""
+交易对全集索引
+
+同一交易对常在多个交易所上市。get_tradable_symbols 把每个交易所通过成交额筛选的交易对
+记录到 SymbolUniverse（交易所、24小时成交额、配置的 priority），每个交易对只选一个交易所
+获取K线和分析：
+  - 'volume': 成交额最高的交易所（成交额相同时取 priority 数字小的）
+  - 'priority': priority 数字最小的交易所（相同时取成交额高的）
+其余交易所不再为该交易对请求K线。
+
+可选的跨交易所汇总直接使用筛选时批量获取的 ticker，不额外请求：交易对在所有交易所的
+24小时成交额合计，以及被选中交易所占合计的比例。
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import SYMBOL_FILTER
+
+logger = logging.getLogger(__name__)
+
+
+class Venue(NamedTuple):
+    """交易对在某个交易所的上市信息"""
+    exchange: str
+    quote_volume: float
+    priority: int
+
+
+class SymbolUniverse:
+    """交易对 -> 全部上市交易所，以及选中的交易所"""
+
+    SELECTIONS = ('volume', 'priority')
+
+    def __init__(self, selection: Optional[str] = None):
+        self.selection = selection or SYMBOL_FILTER.get('venue_selection', 'volume')
+        if self.selection not in self.SELECTIONS:
+            logger.warning(f"未知的交易所选择方式 {self.selection}，改用 'volume'")
+            self.selection = 'volume'
+        self._venues: Dict[str, List[Venue]] = {}
+        self._best: Dict[str, Venue] = {}
+
+    def add(self, symbol: str, exchange: str, quote_volume: float, priority: int = 999) -> None:
+        """记录交易对在一个交易所上市（同一交易所重复记录时以最后一次为准）"""
+        venue = Venue(exchange, float(quote_volume or 0), int(priority))
+        venues = [v for v in self._venues.get(symbol, []) if v.exchange != exchange]
+        venues.append(venue)
+        self._venues[symbol] = venues
+        self._best[symbol] = min(venues, key=self._rank)
+
+    def _rank(self, venue: Venue):
+        if self.selection == 'priority':
+            return venue.priority, -venue.quote_volume
+        return -venue.quote_volume, venue.priority
+
+    def __len__(self) -> int:
+        return len(self._venues)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._venues
+
+    def symbols(self) -> List[str]:
+        return sorted(self._venues)
+
+    def venues(self, symbol: str) -> List[Venue]:
+        """交易对的全部上市交易所，按选择顺序排列"""
+        return sorted(self._venues.get(symbol, []), key=self._rank)
+
+    def best_venue(self, symbol: str) -> Optional[str]:
+        venue = self._best.get(symbol)
+        return venue.exchange if venue is not None else None
+
+    def exchange_by_symbol(self) -> Dict[str, str]:
+        """交易对 -> 选中的交易所"""
+        return {symbol: venue.exchange for symbol, venue in self._best.items()}
+
+    def aggregate(self, symbol: str) -> Dict[str, Any]:
+        """跨交易所汇总：上市交易所数量、24小时成交额合计、选中交易所的成交额占比"""
+        venues = self._venues.get(symbol)
+        if not venues:
+            return {}
+        total = sum(v.quote_volume for v in venues)
+        best = self._best[symbol]
+        return {
+            'venue_count': len(venues),
+            'total_quote_volume_24h': total,
+            'venue_volume_share': best.quote_volume / total if total > 0 else 1.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """交易对数量、上市记录数、多交易所上市的交易对数量，以及各交易所被选中的交易对数量"""
+        selected: Dict[str, int] = {}
+        for venue in self._best.values():
+            selected[venue.exchange] = selected.get(venue.exchange, 0) + 1
+        return {
+            'symbols': len(self._venues),
+            'listings': sum(len(v) for v in self._venues.values()),
+            'multi_venue': sum(1 for v in self._venues.values() if len(v) > 1),
+            'selected': selected,
+        }
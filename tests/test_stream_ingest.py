@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+StreamIngestor 回放测试
+
+用 benchmarks/ws_replay_server.py 回放币安格式的推送，中途跨越K线收盘点断开连接：
+必须重连、通过 REST 补齐断线期间错过的收盘K线，回放结束后的流式指标与 REST 全量分析一致，
+推送的 ticker 并入 ticker 缓存后筛选交易对不再请求 REST tickers，停止后不遗留补齐任务。
+"""
+
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_batch_indicators import same_results
+from bench_stream_ingest import ClockedFakeExchange
+from cache import TTLCache
+from crypto_analyzer import CryptoAnalyzer
+from fake_exchange import FakeExchange
+from stream_ingest import BinanceStreamAdapter, StreamIngestor
+from ws_replay_server import ReplayServer, record_frames
+
+TIMEFRAME = '1h'
+TF_MS = 3_600_000
+START_MS = 1_700_000_000_000 // TF_MS * TF_MS
+
+
+def test_replay_reconnect_backfill_and_indicators():
+    logging.disable(logging.INFO)
+    num_symbols, bars, bar_seconds = 5, 8, 0.5
+
+    recorder = FakeExchange('fake0', num_symbols=num_symbols, latency=0, now_ms=START_MS)
+    frames = record_frames(recorder, recorder.symbols, TIMEFRAME, START_MS, bars, ticks_per_bar=4)
+    # 在第 4 根K线收盘前断开，重连时已错过收盘帧
+    server = ReplayServer(frames, speed=3600 / bar_seconds, drop_at=[3.95 * 3600])
+    url = server.start()
+    ingestor = None
+    try:
+        inst = ClockedFakeExchange('fake0', num_symbols=num_symbols, latency=0, now_ms=START_MS,
+                                   clock=server.elapsed)
+        conf = {'name': 'fake0', 'enabled': True, 'quote_currency': 'USDT', 'min_volume_usd': 0, 'priority': 1}
+        analyzer = CryptoAnalyzer(exchanges=[('fake0', conf, inst)], cache=TTLCache())
+        analyzer.candle_archive = None
+        symbols = analyzer.get_tradable_symbols(min_volume=0)
+        assert len(symbols) == num_symbols
+        # 之后 ticker 缓存中只有推送并入的 ticker
+        analyzer.cache.clear()
+
+        ingestor = StreamIngestor(analyzer, TIMEFRAME, adapters={'fake0': BinanceStreamAdapter(url, TIMEFRAME)})
+        ingestor.reconnect_min_delay = 0.1
+        ingestor.start(symbols)
+        time.sleep(server.duration - (time.monotonic() - server.started_at) + 1.0)
+
+        stats = ingestor.stats()
+        streamed = ingestor.get_top_opportunities(len(symbols))
+
+        # 推送的 ticker 已并入 ticker 缓存，重新筛选交易对不再通过 REST 请求 tickers
+        bulk_calls = []
+        fetch_tickers = inst.fetch_tickers
+        inst.fetch_tickers = lambda *args, **kwargs: bulk_calls.append(args) or fetch_tickers(*args, **kwargs)
+        assert analyzer.get_tradable_symbols(min_volume=0) == symbols
+        assert not bulk_calls
+        expected = analyzer._rank_opportunities(symbols, [
+            analyzer._analyze_dataframe(s, analyzer._ohlcv_to_dataframe(s, inst.fetch_ohlcv(s, TIMEFRAME, limit=100)))
+            for s in symbols], len(symbols), 'volume_ratio')
+    finally:
+        if ingestor is not None:
+            ingestor.stop()
+        server.stop()
+
+    assert server.connections >= 2
+    assert stats['reconnects'] >= 1
+    # 每次建立连接都先通过 REST 补齐：首次连接与重连各补齐一遍全部交易对
+    assert stats['backfilled_symbols'] >= 2 * num_symbols
+    assert stats['tickers_merged'] >= num_symbols
+    assert len(streamed) == num_symbols
+    for opp in streamed + expected:
+        opp.pop('composite_score', None)
+    assert same_results(streamed, expected)
+    assert not ingestor._backfill_tasks
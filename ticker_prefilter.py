@@ -0,0 +1,59 @@
+"""
+批量 ticker 预筛选
+
+当前K线交易量不超过 24 小时成交量减去窗口内已收盘K线成交量之和，配合K线存储中
+前 30 根K线的均量，可以在不拉取K线的情况下得到交易量比率的上界。上界达不到
+volume_ratio_threshold 的交易对不可能产生信号，扫描时跳过其K线获取。
+
+存储中的最后一根已收盘K线可能是上次拉取时仍在形成中的K线，其交易量偏小，
+只会让均量偏低、扣减偏少，上界因此更宽松，不会误筛掉可能产生信号的交易对。
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+
+
+def volume_ratio_bound(ticker: Optional[Dict[str, Any]], bars: Optional[np.ndarray], timeframe_ms: int,
+                       now_ms: float, period: int = 30) -> Optional[float]:
+    """
+    当前K线交易量比率的上界
+
+    Args:
+        ticker: 批量获取的 ticker，需包含 baseVolume（24 小时滚动成交量）
+        bars: K线存储中的 (n, 6) K线
+        timeframe_ms: K线周期（毫秒），需小于一天
+        now_ms: 当前时间（毫秒），用于确定当前K线
+        period: 均量K线数量，与 _analyze_dataframe 一致
+
+    Returns:
+        上界；数据不足以确定时返回 None（应按候选处理）
+    """
+    if not ticker or bars is None or len(bars) < period or timeframe_ms >= DAY_MS:
+        return None
+    base_volume = ticker.get('baseVolume')
+    if base_volume is None:
+        return None
+    current_open = int(now_ms) // timeframe_ms * timeframe_ms
+    ticker_ms = ticker.get('timestamp') or now_ms
+    if ticker_ms < current_open:
+        # ticker 早于当前K线开始，不包含当前K线的任何成交
+        return None
+
+    closed = bars[bars[:, 0] < current_open]
+    # 前 period 根K线必须连续且紧接当前K线，否则均量与实际分析不一致
+    if (len(closed) < period or closed[-1, 0] != current_open - timeframe_ms
+            or closed[-period, 0] != current_open - period * timeframe_ms):
+        return None
+    avg_volume = float(closed[-period:, 5].mean())
+    if not avg_volume > 0:
+        return None
+
+    inside = (closed[:, 0] >= ticker_ms - DAY_MS) & (closed[:, 0] + timeframe_ms <= ticker_ms)
+    current_bound = max(0.0, float(base_volume) - float(closed[inside, 5].sum()))
+    return current_bound / avg_volume
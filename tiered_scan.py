@@ -0,0 +1,140 @@
+"""
+分级重扫调度
+
+按每个交易对最近一次的分析结果计算优先级 p ∈ [0, 1]：
+    交易量比率越接近（或超过）volume_ratio_threshold、波动率越高、综合评分越高，p 越大。
+重扫间隔在 [min_interval, max_interval] 之间按 p 几何插值：p = 1 时每 min_interval 秒扫描一次，
+p = 0 时每 max_interval 秒一次。所有交易对的扫描频率之和超过 budget_per_minute 时整体按比例拉长间隔，
+每个调度周期扫描的数量也不超过预算，API 配额集中用在可能产生信号的交易对上。
+
+新加入的交易对立即扫描（不计入单周期上限），之后按优先级分级重扫。
+"""
+
+import math
+import time
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import INDICATOR_CONFIG, TIERED_SCAN_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('priority', 'interval', 'last_scan')
+
+    def __init__(self, interval: float):
+        self.priority = 0.5
+        self.interval = interval
+        self.last_scan: Optional[float] = None
+
+
+class TieredScheduler:
+    """按优先级为每个交易对安排重扫时间，受全局请求预算约束"""
+
+    def __init__(self, min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 budget_per_minute: Optional[float] = None, threshold: Optional[float] = None):
+        """
+        Args:
+            min_interval: 最热交易对的重扫间隔（秒）
+            max_interval: 最冷交易对的重扫间隔（秒）
+            budget_per_minute: 每分钟最多扫描的交易对数量
+            threshold: 交易量比率阈值，默认 INDICATOR_CONFIG['volume_ratio_threshold']
+        """
+        self.min_interval = float(min_interval or TIERED_SCAN_CONFIG.get('min_interval', 30))
+        self.max_interval = float(max_interval or TIERED_SCAN_CONFIG.get('max_interval', 900))
+        self.budget_per_minute = float(budget_per_minute or TIERED_SCAN_CONFIG.get('budget_per_minute', 600))
+        self.threshold = float(threshold or INDICATOR_CONFIG.get('volume_ratio_threshold', 3.0))
+        self.weights: Dict[str, float] = TIERED_SCAN_CONFIG.get(
+            'weights', {'volume_ratio': 0.6, 'volatility': 0.2, 'composite_score': 0.2})
+        self.volatility_ref = float(TIERED_SCAN_CONFIG.get('volatility_ref', 0.03))
+        self._entries: Dict[str, _Entry] = {}
+        self.scale = 1.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def priority(self, opp: Optional[Dict[str, Any]]) -> float:
+        """由分析结果计算优先级；无结果时为中间值"""
+        if not opp:
+            return 0.5
+        volume_ratio = float(opp.get('volume_ratio', 0) or 0)
+        proximity = 1.0 if volume_ratio >= self.threshold else (max(volume_ratio, 0.0) / self.threshold) ** 2
+        volatility = min(1.0, float(opp.get('volatility', 0) or 0) / self.volatility_ref)
+        score = min(1.0, float(opp.get('composite_score', 0) or 0) / 100.0)
+        total = sum(self.weights.values()) or 1.0
+        p = (self.weights.get('volume_ratio', 0) * proximity
+             + self.weights.get('volatility', 0) * volatility
+             + self.weights.get('composite_score', 0) * score) / total
+        return min(1.0, max(0.0, p))
+
+    def interval_for(self, priority: float) -> float:
+        """优先级 -> 基础重扫间隔（未按预算缩放）"""
+        return self.max_interval * (self.min_interval / self.max_interval) ** priority
+
+    def sync_universe(self, symbols: Sequence[str]) -> None:
+        """同步交易对集合：新交易对立即待扫描，已移除的不再调度"""
+        current = set(symbols)
+        for symbol in [s for s in self._entries if s not in current]:
+            del self._entries[symbol]
+        for symbol in symbols:
+            if symbol not in self._entries:
+                self._entries[symbol] = _Entry(self.interval_for(0.5))
+        self._rescale()
+
+    def update(self, symbol: str, result: Optional[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """记录一次扫描结果并重新计算该交易对的间隔"""
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return
+        entry.priority = self.priority(result)
+        entry.interval = self.interval_for(entry.priority)
+        entry.last_scan = time.time() if now is None else now
+
+    def _rescale(self) -> None:
+        """所有交易对的扫描频率之和超过预算时，按比例拉长全部间隔"""
+        demand = sum(60.0 / e.interval for e in self._entries.values())
+        self.scale = max(1.0, demand / self.budget_per_minute) if self.budget_per_minute > 0 else 1.0
+
+    def due(self, now: Optional[float] = None, period: Optional[float] = None) -> List[str]:
+        """
+        当前应扫描的交易对
+
+        Args:
+            period: 调度周期（秒），用于计算本周期的预算上限
+
+        Returns:
+            从未扫描过的交易对，加上到期交易对中逾期比例最高的若干个
+        """
+        now = time.time() if now is None else now
+        self._rescale()
+        fresh: List[str] = []
+        overdue: List[tuple] = []
+        for symbol, entry in self._entries.items():
+            if entry.last_scan is None:
+                fresh.append(symbol)
+                continue
+            lateness = (now - entry.last_scan) / (entry.interval * self.scale)
+            if lateness >= 1.0:
+                overdue.append((-lateness, -entry.priority, symbol))
+        overdue.sort()
+        period = float(period or TIERED_SCAN_CONFIG.get('tick', 5))
+        cap = max(1, int(math.ceil(self.budget_per_minute * period / 60.0)))
+        return fresh + [symbol for _, _, symbol in overdue[:cap]]
+
+    def stats(self) -> Dict[str, Any]:
+        """各档位的交易对数量（按实际间隔划分）"""
+        tiers = {'hot': 0, 'warm': 0, 'normal': 0, 'cold': 0}
+        for entry in self._entries.values():
+            interval = entry.interval * self.scale
+            if interval <= 60:
+                tiers['hot'] += 1
+            elif interval <= 180:
+                tiers['warm'] += 1
+            elif interval <= 450:
+                tiers['normal'] += 1
+            else:
+                tiers['cold'] += 1
+        demand = sum(60.0 / (e.interval * self.scale) for e in self._entries.values())
+        return {'symbols': len(self._entries), 'scale': round(self.scale, 2),
+                'scans_per_minute': round(demand, 1), 'tiers': tiers}
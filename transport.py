@@ -0,0 +1,198 @@
+"""
+HTTP 传输层
+
+同步 ccxt 实例默认各自创建一个未调优的 requests.Session。这里按 NETWORK_CONFIG['transport']
+创建进程内共享的会话并注入到每个实例（ccxt 参数 'session'）：
+  - 每个主机的连接池大小按扫描并发度推算（pool_maxsize），池满时不再丢弃连接
+  - TCP_NODELAY，以及可选的 SO_KEEPALIVE 探测，让空闲连接不被中间设备静默断开
+  - 所有交易所共用同一个 PoolManager，同一主机的连接（和 TLS 会话）在实例之间复用
+  - session_factory 可注入任意与 requests.Session 接口兼容的会话（例如基于 HTTP/2 客户端的实现）
+
+计数器记录请求数与新建连接数（HTTPS 新建连接即一次 TLS 握手），复用率 = 1 - 新建连接 / 请求数。
+"""
+
+import importlib
+import socket
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import NETWORK_CONFIG, SCAN_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """请求数与新建连接数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    def on_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def on_connection(self, tls: bool) -> None:
+        with self._lock:
+            self.new_connections += 1
+            if tls:
+                self.tls_handshakes += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.requests - self.new_connections)
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': reused,
+                'tls_handshakes': self.tls_handshakes,
+                'reuse_rate': reused / self.requests if self.requests else 0.0,
+            }
+
+
+def _socket_options(conf: Dict[str, Any]) -> List[Tuple[int, int, int]]:
+    options = list(HTTPConnection.default_socket_options)
+    if not conf.get('tcp_nodelay', True):
+        options = [o for o in options if o[:2] != (socket.IPPROTO_TCP, socket.TCP_NODELAY)]
+    idle = conf.get('keepalive_idle')
+    if idle:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # 各平台支持的 TCP keepalive 参数不同，只设置存在的项
+        for name, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', conf.get('keepalive_interval', 15)),
+                            ('TCP_KEEPCNT', conf.get('keepalive_count', 4))):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), int(value)))
+    return options
+
+
+class PooledAdapter(HTTPAdapter):
+    """按配置调整连接池并统计新建连接的 HTTPAdapter"""
+
+    def __init__(self, stats: ConnectionStats, pool_connections: int, pool_maxsize: int,
+                 socket_options: List[Tuple[int, int, int]]):
+        self.stats = stats
+        self.socket_options = socket_options
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+
+    def init_poolmanager(self, connections: int, maxsize: int, block: bool = False, **pool_kwargs: Any) -> None:
+        pool_kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        stats = self.stats
+
+        class CountingHTTPPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.on_connection(False)
+                return super()._new_conn()
+
+        class CountingHTTPSPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.on_connection(True)
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {'http': CountingHTTPPool, 'https': CountingHTTPSPool}
+
+    def send(self, request, **kwargs: Any):
+        self.stats.on_request()
+        return super().send(request, **kwargs)
+
+
+class SharedSession(requests.Session):
+    """
+    共享会话：ccxt 实例析构时会调用 session.close()，共享的连接池不能因此被清空，
+    只有 Transport.close() 才真正关闭
+    """
+
+    def close(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        super().close()
+
+
+def _default_pool_maxsize() -> int:
+    # 扫描时单个交易所的最大并发，加上图表等交互式请求的余量
+    return int(SCAN_CONFIG.get('max_per_exchange', 8)) + 4
+
+
+class Transport:
+    """进程内共享的 HTTP 会话"""
+
+    def __init__(self, conf: Optional[Dict[str, Any]] = None):
+        self.conf = dict(NETWORK_CONFIG.get('transport', {}) if conf is None else conf)
+        self.stats = ConnectionStats()
+        self._lock = threading.Lock()
+        self._session: Optional[Any] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.conf.get('enabled', True))
+
+    def _build_session(self) -> Any:
+        factory = self.conf.get('session_factory')
+        if factory:
+            session = _load_factory(factory)()
+            logger.info(f"使用注入的 HTTP 会话: {factory}")
+            return session
+        if self.conf.get('http2'):
+            logger.warning("requests 不支持 HTTP/2，需要通过 session_factory 注入支持 HTTP/2 的会话，继续使用 HTTP/1.1")
+
+        session = SharedSession()
+        session.trust_env = bool(self.conf.get('trust_env', False))
+        adapter = PooledAdapter(
+            self.stats,
+            pool_connections=int(self.conf.get('pool_hosts', 32)),
+            pool_maxsize=int(self.conf.get('pool_maxsize') or _default_pool_maxsize()),
+            socket_options=_socket_options(self.conf),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.conf.get('keepalive', True):
+            session.headers['Connection'] = 'close'
+        return session
+
+    @property
+    def session(self) -> Any:
+        """共享会话（首次使用时创建）"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def exchange_params(self) -> Dict[str, Any]:
+        """注入同步 ccxt 实例的参数"""
+        return {'session': self.session} if self.enabled else {}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                getattr(self._session, 'shutdown', self._session.close)()
+                self._session = None
+
+
+def _load_factory(path: str) -> Callable[[], Any]:
+    """'package.module:callable' -> callable"""
+    module, _, attr = path.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """进程内共享的传输层（所有同步 ccxt 实例共用连接池）"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = Transport()
+    return _transport
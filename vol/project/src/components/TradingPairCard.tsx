@@ -1,8 +1,9 @@
-import React, { useState } from 'react';
-import { TradingPair } from '../types/trading';
+import React, { useEffect, useState } from 'react';
+import { KlineData, TradingPair } from '../types/trading';
 import { TrendingUp, TrendingDown, Minus, BarChart3 } from 'lucide-react';
 import VolumeChart from './VolumeChart';
 import { formatVolume } from '../utils/tradingAnalysis';
+import { fetchCandles } from '../utils/api';
 
 interface TradingPairCardProps {
   pair: TradingPair;
@@ -11,6 +12,17 @@ interface TradingPairCardProps {
 
 const TradingPairCard: React.FC<TradingPairCardProps> = ({ pair, onTrade }) => {
   const [showChart, setShowChart] = useState(false);
+  const [candles, setCandles] = useState<KlineData[]>([]);
+
+  // 后端数据不附带K线，打开图表时再从 API 获取
+  useEffect(() => {
+    if (!showChart || pair.klineData.length > 0) return;
+    let cancelled = false;
+    fetchCandles(pair.symbol)
+      .then(data => { if (!cancelled) setCandles(data); })
+      .catch(() => { if (!cancelled) setCandles([]); });
+    return () => { cancelled = true; };
+  }, [showChart, pair.symbol, pair.klineData.length]);
 
   const getSignalColor = (signal: string) => {
     switch (signal) {
@@ -113,7 +125,7 @@ const TradingPairCard: React.FC<TradingPairCardProps> = ({ pair, onTrade }) => {
             <BarChart3 className="w-4 h-4 text-crypto-blue" />
             <h4 className="text-sm font-medium text-white">{pair.symbol} 图表分析</h4>
           </div>
-          <VolumeChart data={pair.klineData} />
+          <VolumeChart data={pair.klineData.length > 0 ? pair.klineData : candles} />
         </div>
       )}
     </div>
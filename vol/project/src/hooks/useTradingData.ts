@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import { TradingPair, Exchange, Portfolio, Trade, MarketType } from '../types/trading';
 import { generateMockTradingPairs, getExchanges, updateExchangeStatus } from '../utils/mockData';
+import { Opportunity, subscribeOpportunities, toTradingPair } from '../utils/api';
 
 export const useTradingData = () => {
   const [tradingPairs, setTradingPairs] = useState<TradingPair[]>([]);
@@ -16,29 +17,48 @@ export const useTradingData = () => {
   const [autoTrading, setAutoTrading] = useState(false);
   const [signalFilter, setSignalFilter] = useState<'ALL' | 'BUY' | 'SELL' | 'HOLD'>('ALL');
   const [marketType, setMarketType] = useState<MarketType>('future'); // 默认合约市场
+  // 后端 API 推送的最新交易机会；为 null 时使用模拟数据
+  const [liveRows, setLiveRows] = useState<Opportunity[] | null>(null);
+  const [mockTick, setMockTick] = useState(0);
 
   // 更新交易数据
   const updateTradingData = useCallback(() => {
+    if (liveRows) {
+      // 后端只扫描一种市场类型，行上没有 marketType，统一标记为当前选择
+      setTradingPairs(liveRows.map(row => toTradingPair(row, marketType)));
+      return;
+    }
     const newPairs = generateMockTradingPairs();
     // 根据marketType过滤数据
     const filteredPairs = newPairs.filter(pair => pair.marketType === marketType);
     setTradingPairs(filteredPairs);
-  }, [marketType]);
+  }, [marketType, liveRows]);
 
-  // 初始化数据
+  // 订阅后端推送（每次扫描后只推送变化的行），后端不可用时回退到每30秒生成模拟数据
   useEffect(() => {
     setExchanges(getExchanges());
-    updateTradingData();
-    
-    // 每30秒更新一次数据
-    const interval = setInterval(updateTradingData, 30000);
-    return () => clearInterval(interval);
-  }, [updateTradingData]);
+    let connected = false;
+    let fallback: ReturnType<typeof setInterval> | undefined;
+    const unsubscribe = subscribeOpportunities(rows => {
+      connected = true;
+      setLiveRows(rows);
+    }, () => {
+      // 连接成功过的断线交给 EventSource 自动重连
+      if (!connected && fallback === undefined) {
+        unsubscribe();
+        fallback = setInterval(() => setMockTick(tick => tick + 1), 30000);
+      }
+    });
+    return () => {
+      unsubscribe();
+      if (fallback !== undefined) clearInterval(fallback);
+    };
+  }, []);
 
-  // 市场类型变化时更新数据
+  // 数据或市场类型变化时更新
   useEffect(() => {
     updateTradingData();
-  }, [marketType]);
+  }, [updateTradingData, mockTick]);
 
   // 自动交易逻辑
   useEffect(() => {
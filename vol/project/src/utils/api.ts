@@ -0,0 +1,99 @@
+import { TradingPair, KlineData } from '../types/trading';
+
+// Python 服务（app.py）提供的 HTTP API，开发时由 vite.config.ts 代理到 http://localhost:8050
+const API_BASE = '/api';
+
+// 与后端 /api/opportunities 返回的行一致
+export interface Opportunity {
+  symbol: string;
+  exchange: string;
+  current_price: number;
+  volume_ratio: number;
+  current_volume: number;
+  avg_volume_30: number;
+  ma5: number;
+  ma10: number;
+  ma20: number;
+  signal: 'long' | 'short' | 'hold' | 'none';
+  is_recommended: boolean;
+  price_change_24h: number;
+  composite_score?: number;
+}
+
+interface SnapshotEvent {
+  version: number;
+  rows: Opportunity[];
+}
+
+interface DeltaEvent {
+  version: number;
+  base_version: number;
+  upserts: Opportunity[];
+  removed: [string, string][];
+}
+
+const rowKey = (exchange: string, symbol: string) => `${exchange}|${symbol}`;
+
+function maAlignment(o: Opportunity): TradingPair['maAlignment'] {
+  if (!o.ma5 || !o.ma10 || !o.ma20) return 'NEUTRAL';
+  if (o.ma5 > o.ma10 && o.ma10 > o.ma20) return 'BULLISH';
+  if (o.ma5 < o.ma10 && o.ma10 < o.ma20) return 'BEARISH';
+  return 'NEUTRAL';
+}
+
+export function toTradingPair(o: Opportunity, marketType: TradingPair['marketType']): TradingPair {
+  return {
+    symbol: o.symbol,
+    exchange: o.exchange,
+    marketType,
+    price: o.current_price,
+    change24h: o.price_change_24h * 100,
+    volume24h: o.current_volume,
+    volumeRatio: o.volume_ratio,
+    signal: o.signal === 'long' ? 'BUY' : o.signal === 'short' ? 'SELL' : 'HOLD',
+    maAlignment: maAlignment(o),
+    klineData: [],
+  };
+}
+
+export async function fetchCandles(symbol: string, timeframe = '1h', limit = 100): Promise<KlineData[]> {
+  const response = await fetch(`${API_BASE}/symbols/${symbol.replace('/', '-')}/candles?timeframe=${timeframe}&limit=${limit}`);
+  if (!response.ok) throw new Error(`获取 ${symbol} K线失败: ${response.status}`);
+  const body = await response.json();
+  return body.candles.map((c: KlineData & { ma5: number | null; ma10: number | null; ma20: number | null }) => ({
+    ...c,
+    ma5: c.ma5 ?? undefined,
+    ma10: c.ma10 ?? undefined,
+    ma20: c.ma20 ?? undefined,
+  }));
+}
+
+/**
+ * 订阅交易机会：首次收到完整快照，之后每次扫描只收到变化的行。
+ * EventSource 断线后自动重连并携带 Last-Event-ID，服务器据此决定补发增量还是完整快照。
+ * 返回取消订阅函数。
+ */
+export function subscribeOpportunities(
+  onChange: (rows: Opportunity[]) => void,
+  onError?: () => void,
+): () => void {
+  const rows = new Map<string, Opportunity>();
+  const source = new EventSource(`${API_BASE}/stream`);
+  const emit = () => onChange(Array.from(rows.values()).sort((a, b) => b.volume_ratio - a.volume_ratio));
+
+  source.addEventListener('snapshot', (event) => {
+    const snapshot: SnapshotEvent = JSON.parse((event as MessageEvent).data);
+    rows.clear();
+    snapshot.rows.forEach(row => rows.set(rowKey(row.exchange, row.symbol), row));
+    emit();
+  });
+  source.addEventListener('delta', (event) => {
+    const delta: DeltaEvent = JSON.parse((event as MessageEvent).data);
+    delta.removed.forEach(([exchange, symbol]) => rows.delete(rowKey(exchange, symbol)));
+    delta.upserts.forEach(row => rows.set(rowKey(row.exchange, row.symbol), row));
+    emit();
+  });
+  if (onError) source.onerror = onError;
+
+  return () => source.close();
+}
@@ -4,4 +4,10 @@ import react from '@vitejs/plugin-react'
 // https://vitejs.dev/config/
 export default defineConfig({
   plugins: [react()],
+  server: {
+    // Python 服务（app.py）提供的 /api 接口
+    proxy: {
+      '/api': 'http://localhost:8050',
+    },
+  },
 })
\ No newline at end of file